@@ -46,7 +46,7 @@ def _check_service():
 async def tare_loadcell():
     """Zero/Tare the load cell - DB2.DBX60.0"""
     _check_service()
-    result = command_service.tare_loadcell()
+    result = await command_service.atare_loadcell()
     return CommandResponse(
         success=result["success"],
         message=result["message"]
@@ -57,7 +57,7 @@ async def tare_loadcell():
 async def zero_position():
     """Zero the position display - DB4.DBX59.7"""
     _check_service()
-    result = command_service.zero_position()
+    result = await command_service.azero_position()
     return CommandResponse(
         success=result["success"],
         message=result["message"]
@@ -70,7 +70,7 @@ async def zero_position():
 async def get_safety_status():
     """Get all safety status bits"""
     _check_service()
-    return command_service.get_safety_status()
+    return await command_service.aget_safety_status()
 
 
 # ========== Test Control ==========
@@ -79,7 +79,7 @@ async def get_safety_status():
 async def start_test():
     """Start automated test"""
     _check_service()
-    result = command_service.start_test()
+    result = await command_service.astart_test()
     return CommandResponse(
         success=result["success"],
         message=result["message"]
@@ -90,7 +90,7 @@ async def start_test():
 async def emergency_stop():
     """Emergency stop - stops all movement"""
     _check_service()
-    success = command_service.stop()
+    success = await command_service.astop()
     return CommandResponse(
         success=success,
         message="Emergency stop executed" if success else "Failed to execute stop"
@@ -101,7 +101,7 @@ async def emergency_stop():
 async def go_home():
     """Move to home position"""
     _check_service()
-    result = command_service.home()
+    result = await command_service.ahome()
     return CommandResponse(
         success=result["success"],
         message=result["message"]
@@ -114,7 +114,7 @@ async def go_home():
 async def enable_servo():
     """Enable servo motor"""
     _check_service()
-    success = command_service.enable_servo()
+    success = await command_service.aenable_servo()
     return CommandResponse(
         success=success,
         message="Servo enabled" if success else "Failed to enable servo"
@@ -125,7 +125,7 @@ async def enable_servo():
 async def disable_servo():
     """Disable servo motor"""
     _check_service()
-    success = command_service.disable_servo()
+    success = await command_service.adisable_servo()
     return CommandResponse(
         success=success,
         message="Servo disabled" if success else "Failed to disable servo"
@@ -136,7 +136,7 @@ async def disable_servo():
 async def reset_servo_alarm():
     """Reset servo alarm"""
     _check_service()
-    success = command_service.reset_alarm()
+    success = await command_service.areset_alarm()
     return CommandResponse(
         success=success,
         message="Alarm reset" if success else "Failed to reset alarm"
@@ -152,7 +152,7 @@ async def set_jog_speed(request: JogSpeedRequest):
     if request.velocity < 1.2 or request.velocity > 6000:
         raise HTTPException(status_code=400, detail="Velocity must be between 1.2 and 6000 mm/min")
 
-    success = command_service.set_jog_velocity(request.velocity)
+    success = await command_service.aset_jog_velocity(request.velocity)
     return CommandResponse(
         success=success,
         message=f"Jog speed set to {request.velocity} mm/min" if success else "Failed to set jog speed"
@@ -163,7 +163,7 @@ async def set_jog_speed(request: JogSpeedRequest):
 async def jog_forward_start():
     """Start jog forward (down)"""
     _check_service()
-    result = command_service.jog_forward(True)
+    result = await command_service.ajog_forward(True)
     return CommandResponse(
         success=result.get("success", False),
         message=result.get("message", "Jog forward started") if result.get("success") else result.get("message", "Failed")
@@ -174,7 +174,7 @@ async def jog_forward_start():
 async def jog_forward_stop():
     """Stop jog forward"""
     _check_service()
-    result = command_service.jog_forward(False)
+    result = await command_service.ajog_forward(False)
     return CommandResponse(
         success=result.get("success", False),
         message="Jog forward stopped"
@@ -185,7 +185,7 @@ async def jog_forward_stop():
 async def jog_backward_start():
     """Start jog backward (up)"""
     _check_service()
-    result = command_service.jog_backward(True)
+    result = await command_service.ajog_backward(True)
     return CommandResponse(
         success=result.get("success", False),
         message=result.get("message", "Jog backward started") if result.get("success") else result.get("message", "Failed")
@@ -196,7 +196,7 @@ async def jog_backward_start():
 async def jog_backward_stop():
     """Stop jog backward"""
     _check_service()
-    result = command_service.jog_backward(False)
+    result = await command_service.ajog_backward(False)
     return CommandResponse(
         success=result.get("success", False),
         message="Jog backward stopped"
@@ -209,7 +209,7 @@ async def jog_backward_stop():
 async def lock_upper_clamp():
     """Lock upper clamp"""
     _check_service()
-    success = command_service.lock_upper()
+    success = await command_service.alock_upper()
     return CommandResponse(
         success=success,
         message="Upper clamp locked" if success else "Failed to lock upper clamp"
@@ -220,7 +220,7 @@ async def lock_upper_clamp():
 async def lock_lower_clamp():
     """Lock lower clamp"""
     _check_service()
-    success = command_service.lock_lower()
+    success = await command_service.alock_lower()
     return CommandResponse(
         success=success,
         message="Lower clamp locked" if success else "Failed to lock lower clamp"
@@ -231,7 +231,7 @@ async def lock_lower_clamp():
 async def unlock_all_clamps():
     """Unlock all clamps"""
     _check_service()
-    success = command_service.unlock_all()
+    success = await command_service.aunlock_all()
     return CommandResponse(
         success=success,
         message="All clamps unlocked" if success else "Failed to unlock clamps"
@@ -244,7 +244,7 @@ async def unlock_all_clamps():
 async def get_mode():
     """Get current control mode"""
     _check_service()
-    remote_mode = command_service.get_remote_mode()
+    remote_mode = await command_service.aget_remote_mode()
     return ModeResponse(
         remote_mode=remote_mode,
         mode="remote" if remote_mode else "local"
@@ -255,7 +255,7 @@ async def get_mode():
 async def set_local_mode():
     """Switch to Local mode (Physical buttons)"""
     _check_service()
-    result = command_service.set_remote_mode(False)
+    result = await command_service.aset_remote_mode(False)
     return CommandResponse(
         success=result["success"],
         message=result["message"]
@@ -266,7 +266,7 @@ async def set_local_mode():
 async def set_remote_mode():
     """Switch to Remote mode (Web interface)"""
     _check_service()
-    result = command_service.set_remote_mode(True)
+    result = await command_service.aset_remote_mode(True)
     return CommandResponse(
         success=result["success"],
         message=result["message"]
@@ -292,7 +292,7 @@ async def set_step_distance(request: StepDistanceRequest):
     if request.distance < 0.1 or request.distance > 100:
         raise HTTPException(status_code=400, detail="Distance must be between 0.1 and 100 mm")
     
-    result = command_service.set_step_distance(request.distance)
+    result = await command_service.aset_step_distance(request.distance)
     return CommandResponse(
         success=result["success"],
         message=f"Step distance set to {result.get('distance', request.distance)} mm" if result["success"] else result.get("message", "Failed")
@@ -303,7 +303,7 @@ async def set_step_distance(request: StepDistanceRequest):
 async def step_forward():
     """Execute one step down (toward sample)"""
     _check_service()
-    result = command_service.step_forward()
+    result = await command_service.astep_forward()
     return CommandResponse(
         success=result["success"],
         message="Step forward" if result["success"] else result.get("error", "Failed")
@@ -314,7 +314,7 @@ async def step_forward():
 async def step_backward():
     """Execute one step up (away from sample)"""
     _check_service()
-    result = command_service.step_backward()
+    result = await command_service.astep_backward()
     return CommandResponse(
         success=result["success"],
         message="Step backward" if result["success"] else result.get("error", "Failed")
@@ -325,4 +325,4 @@ async def step_backward():
 async def get_step_status():
     """Get current step movement status"""
     _check_service()
-    return command_service.get_step_status()
+    return await command_service.aget_step_status()
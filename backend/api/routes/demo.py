@@ -5,7 +5,8 @@ from datetime import datetime, timedelta
 import random
 
 from db.database import get_db
-from db.models import Test, TestDataPoint, Alarm
+from db.models import Test, TestCurve, TestDataPoint, Alarm
+from db.curves import save_curve
 
 router = APIRouter(prefix="/demo", tags=["Demo"])
 
@@ -49,19 +50,17 @@ async def generate_demo_tests(count: int = 5, db: AsyncSession = Depends(get_db)
 
         # Generate data points for chart
         num_points = random.randint(50, 150)
+        curve = {"timestamp": [], "force": [], "deflection": [], "position": []}
         for j in range(num_points):
             deflection = (target_deflection * j) / num_points
             # Simulated force curve (approximately linear with some noise)
             force = (force_at_target * j / num_points) + random.uniform(-0.5, 0.5)
 
-            data_point = TestDataPoint(
-                test_id=test.id,
-                timestamp=j * 0.1,  # 100ms intervals
-                force=max(0, force),
-                deflection=deflection,
-                position=deflection,
-            )
-            db.add(data_point)
+            curve["timestamp"].append(j * 0.1)  # 100ms intervals
+            curve["force"].append(max(0, force))
+            curve["deflection"].append(deflection)
+            curve["position"].append(deflection)
+        save_curve(db, test.id, curve)
 
         tests_created.append({
             "id": test.id,
@@ -121,6 +120,7 @@ async def clear_demo_data(db: AsyncSession = Depends(get_db)):
     """Clear all demo data"""
     from sqlalchemy import delete
 
+    await db.execute(delete(TestCurve))
     await db.execute(delete(TestDataPoint))
     await db.execute(delete(Test))
     await db.execute(delete(Alarm))
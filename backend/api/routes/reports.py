@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func, or_, and_
 from sqlalchemy.orm import selectinload
 from typing import Optional, List
 from datetime import datetime
@@ -13,7 +13,8 @@ import logging
 import zipfile
 
 from db.database import get_db
-from db.models import Test, TestDataPoint, Alarm, TestGroup
+from db.models import Test, Alarm, TestGroup
+from db.curves import aload_curve, curve_columns
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,57 @@ def set_services(pdf_gen, excel_exp):
     excel_exporter = excel_exp
 
 
+def _data_points(test_id: int, curve) -> List[dict]:
+    """Curve columns in the per-sample layout of the API (id = sample index)"""
+    return [
+        {"id": index, "test_id": test_id, "timestamp": t, "force": f, "deflection": d, "position": p}
+        for index, (t, f, d, p) in enumerate(
+            zip(curve["timestamp"], curve["force"], curve["deflection"], curve["position"])
+        )
+    ]
+
+
+def _before(model, before_date: Optional[datetime], before_id: Optional[int]):
+    """Keyset condition: rows after the cursor in (test_date, id) descending order"""
+    if before_date is None:
+        return None
+    if before_id is None:
+        return model.test_date < before_date
+    # The bare `date < d OR (date = d AND id < i)` scans the whole index in
+    # SQLite with bound parameters, the `date <= d` term lets it seek
+    return and_(
+        model.test_date <= before_date,
+        or_(model.test_date < before_date, model.id < before_id),
+    )
+
+
+def _prefix(column, prefix: str):
+    """`column` starts with `prefix` (case-sensitive), as a range the
+    (column, test_date) indexes can seek: SQLite's LIKE is case-insensitive
+    and cannot use them"""
+    if ord(prefix[-1]) == 0x10FFFF:
+        return column >= prefix
+    return and_(column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+def _page(model, filters: list, page: int, page_size: int,
+          before_date: Optional[datetime], before_id: Optional[int]):
+    """Page query newest first: keyset when a cursor is given, else OFFSET"""
+    query = select(model).where(*filters).order_by(desc(model.test_date), desc(model.id)).limit(page_size)
+    after = _before(model, before_date, before_id)
+    if after is not None:
+        return query.where(after)
+    return query.offset((page - 1) * page_size)
+
+
+def _next_cursor(rows: list, page_size: int) -> Optional[dict]:
+    """Cursor of the page after `rows` (None on the last page)"""
+    if len(rows) < page_size:
+        return None
+    last = rows[-1]
+    return {"before_date": last.test_date.isoformat() if last.test_date else None, "before_id": last.id}
+
+
 # ========== Test History ==========
 
 @router.get("/tests")
@@ -39,36 +91,27 @@ async def get_tests(
     sample_id: Optional[str] = None,
     operator: Optional[str] = None,
     passed: Optional[bool] = None,
+    before_date: Optional[datetime] = None,
+    before_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get test history with pagination and filters"""
-    query = select(Test).order_by(desc(Test.test_date))
-
-    # Apply filters
-    if sample_id:
-        query = query.where(Test.sample_id.contains(sample_id))
-    if operator:
-        query = query.where(Test.operator.contains(operator))
-    if passed is not None:
-        query = query.where(Test.passed == passed)
+    """Get test history with pagination and filters
 
-    # Count total
-    count_query = select(Test)
+    `sample_id` / `operator` match the start of the value (case-sensitive).
+    `before_date` / `before_id` (the `next_cursor` of the previous page)
+    continue after that test instead of skipping `page` rows.
+    """
+    filters = []
     if sample_id:
-        count_query = count_query.where(Test.sample_id.contains(sample_id))
+        filters.append(_prefix(Test.sample_id, sample_id))
     if operator:
-        count_query = count_query.where(Test.operator.contains(operator))
+        filters.append(_prefix(Test.operator, operator))
     if passed is not None:
-        count_query = count_query.where(Test.passed == passed)
-
-    result = await db.execute(count_query)
-    total = len(result.scalars().all())
+        filters.append(Test.passed == passed)
 
-    # Apply pagination
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
+    total = await db.scalar(select(func.count()).select_from(Test).where(*filters))
 
-    result = await db.execute(query)
+    result = await db.execute(_page(Test, filters, page, page_size, before_date, before_id))
     tests = result.scalars().all()
 
     return {
@@ -76,22 +119,24 @@ async def get_tests(
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size
+        "total_pages": (total + page_size - 1) // page_size,
+        "next_cursor": _next_cursor(tests, page_size),
     }
 
 
 @router.get("/tests/{test_id}")
 async def get_test(test_id: int, db: AsyncSession = Depends(get_db)):
     """Get single test details with data points"""
-    query = select(Test).options(selectinload(Test.data_points)).where(Test.id == test_id)
+    query = select(Test).where(Test.id == test_id)
     result = await db.execute(query)
     test = result.scalar_one_or_none()
 
     if not test:
         raise HTTPException(status_code=404, detail="Test not found")
 
+    curve = await aload_curve(db, test_id)
     test_dict = test.to_dict()
-    test_dict["data_points"] = [dp.to_dict() for dp in test.data_points]
+    test_dict["data_points"] = _data_points(test_id, curve) if curve is not None else []
     return test_dict
 
 
@@ -123,7 +168,7 @@ async def download_pdf_report(
     if pdf_generator is None:
         raise HTTPException(status_code=503, detail="PDF generator not initialized")
 
-    query = select(Test).options(selectinload(Test.data_points)).where(Test.id == test_id)
+    query = select(Test).options(selectinload(Test.curve)).where(Test.id == test_id)
     result = await db.execute(query)
     test = result.scalar_one_or_none()
 
@@ -193,7 +238,7 @@ async def download_excel_report(
     if excel_exporter is None:
         raise HTTPException(status_code=503, detail="Excel exporter not initialized")
 
-    query = select(Test).options(selectinload(Test.data_points)).where(Test.id == test_id)
+    query = select(Test).options(selectinload(Test.curve)).where(Test.id == test_id)
     result = await db.execute(query)
     test = result.scalar_one_or_none()
 
@@ -232,7 +277,7 @@ async def bulk_download(
 
     with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
         for test_id in req.test_ids:
-            query = select(Test).options(selectinload(Test.data_points)).where(Test.id == test_id)
+            query = select(Test).options(selectinload(Test.curve)).where(Test.id == test_id)
             result = await db.execute(query)
             test = result.scalar_one_or_none()
 
@@ -272,24 +317,22 @@ async def bulk_download(
 async def get_groups(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    before_date: Optional[datetime] = None,
+    before_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get test groups with pagination"""
-    query = select(TestGroup).order_by(desc(TestGroup.test_date))
-    
-    result = await db.execute(select(TestGroup))
-    total = len(result.scalars().all())
-    
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-    result = await db.execute(query)
+    """Get test groups with pagination (keyset with `before_date` / `before_id`, as /tests)"""
+    total = await db.scalar(select(func.count()).select_from(TestGroup))
+
+    result = await db.execute(_page(TestGroup, [], page, page_size, before_date, before_id))
     groups = result.scalars().all()
-    
+
     return {
         "groups": [g.to_dict() for g in groups],
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": _next_cursor(groups, page_size),
     }
 
 
@@ -318,7 +361,7 @@ async def get_group(group_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Group not found")
     
     # Get tests in this group
-    tests_query = select(Test).options(selectinload(Test.data_points)).where(Test.group_id == group_id).order_by(Test.position)
+    tests_query = select(Test).options(selectinload(Test.curve)).where(Test.group_id == group_id).order_by(Test.position)
     tests_result = await db.execute(tests_query)
     tests = tests_result.scalars().all()
     
@@ -326,7 +369,7 @@ async def get_group(group_id: int, db: AsyncSession = Depends(get_db)):
     group_dict["tests"] = []
     for t in tests:
         td = t.to_dict()
-        td["data_points"] = [dp.to_dict() for dp in t.data_points]
+        td["data_points"] = _data_points(t.id, curve_columns(t))
         group_dict["tests"].append(td)
     
     return group_dict
@@ -491,7 +534,7 @@ async def export_to_usb(
     errors = []
 
     for test_id in req.test_ids:
-        query = select(Test).options(selectinload(Test.data_points)).where(Test.id == test_id)
+        query = select(Test).options(selectinload(Test.curve)).where(Test.id == test_id)
         result = await db.execute(query)
         test = result.scalar_one_or_none()
 
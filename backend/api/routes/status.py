@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import time
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 from typing import Optional
 
@@ -7,12 +9,16 @@ router = APIRouter(tags=["Status"])
 # These will be set from main.py
 plc = None
 data_service = None
+supervisor = None
+live_bus = None
 
 
-def set_services(plc_instance, data_service_instance):
-    global plc, data_service
+def set_services(plc_instance, data_service_instance, supervisor_instance=None, live_bus_instance=None):
+    global plc, data_service, supervisor, live_bus
     plc = plc_instance
     data_service = data_service_instance
+    supervisor = supervisor_instance
+    live_bus = live_bus_instance
 
 
 class ParametersRequest(BaseModel):
@@ -54,7 +60,12 @@ async def get_status():
     """Get all live data (force, position, status, indicators)"""
     if data_service is None:
         raise HTTPException(status_code=503, detail="Service not initialized")
-    return data_service.get_live_data()
+    if live_bus is not None:
+        data = await live_bus.aget_live_data()
+    else:
+        data = await data_service.aget_live_data()
+    # Cached encoding of the snapshot, shared with the websocket broadcast
+    return Response(content=data.to_json(), media_type="application/json")
 
 
 @router.get("/status/connection", response_model=ConnectionResponse)
@@ -73,26 +84,94 @@ async def get_connection_status():
     )
 
 
+@router.get("/status/io")
+async def get_io_stats():
+    """PLC I/O thread latency stats (queue wait / snap7 execution per call)"""
+    if plc is None:
+        raise HTTPException(status_code=503, detail="PLC service not initialized")
+    stats = plc.get_io_stats()
+    if data_service is not None:
+        stats["slow_tier"] = data_service.slow.get_stats()
+        stats["live_data"] = data_service.get_live_stats()
+        if data_service.curve is not None:
+            stats["curve_buffer"] = data_service.curve.get_stats()
+    if live_bus is not None:
+        stats["live_bus"] = live_bus.get_stats()
+    from api.websocket import persistence
+    stats["persistence"] = persistence.get_stats()
+    if supervisor is not None:
+        stats["links"] = supervisor.get_status()
+    return stats
+
+
 @router.post("/status/reconnect")
 async def reconnect_plc():
     """Reconnect to PLC"""
     if plc is None:
         raise HTTPException(status_code=503, detail="PLC service not initialized")
 
-    success = plc.reconnect()
+    if supervisor is not None:
+        # Bounded wait; on failure the supervisor keeps retrying with backoff
+        success = await supervisor.reconnect()
+    else:
+        success = await asyncio.to_thread(plc.reconnect)
     return {
         "success": success,
         "connected": plc.connected,
-        "message": "Reconnected successfully" if success else "Reconnection failed"
+        "message": "Reconnected successfully" if success else "Reconnection failed",
+        "links": supervisor.get_status() if supervisor else {},
     }
 
 
+@router.get("/status/blackbox")
+async def get_blackbox_stats():
+    """Black box recorder state (ring capacity, records, oldest timestamp)"""
+    if data_service is None or data_service.blackbox is None:
+        raise HTTPException(status_code=404, detail="Black box recorder disabled")
+    return data_service.blackbox.get_stats()
+
+
+@router.get("/status/blackbox/dump")
+async def dump_blackbox(
+    seconds: Optional[float] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    format: str = "bin",
+):
+    """Export a window of raw live cycles
+
+    Window is `seconds` before now, or [since, until] as Unix timestamps.
+    format=bin returns the ring file format (octet-stream), format=json
+    decodes every record into tag values.
+    """
+    recorder = data_service.blackbox if data_service is not None else None
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Black box recorder disabled")
+    if seconds is not None:
+        since = time.time() - seconds
+    if format == "bin":
+        raw = await asyncio.to_thread(recorder.dump, since, until)
+        return Response(
+            content=raw,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="blackbox_{int(time.time())}.bin"'},
+        )
+    if format == "json":
+        def decode_window():
+            return [
+                {"seq": seq, "timestamp": wall, **recorder.decode(raw)}
+                for seq, _, wall, raw in recorder.records(since, until)
+            ]
+        return {"records": await asyncio.to_thread(decode_window)}
+    raise HTTPException(status_code=400, detail="format must be 'bin' or 'json'")
+
+
 @router.get("/parameters")
 async def get_parameters():
     """Get current test parameters from PLC"""
     if data_service is None:
         raise HTTPException(status_code=503, detail="Service not initialized")
-    return data_service.get_parameters()
+    return await data_service.aget_parameters()
 
 
 @router.post("/parameters")
@@ -101,7 +180,7 @@ async def set_parameters(params: ParametersRequest):
     if data_service is None:
         raise HTTPException(status_code=503, detail="Service not initialized")
 
-    success = data_service.set_parameters(
+    success = await data_service.aset_parameters(
         pipe_diameter=params.pipe_diameter,
         pipe_length=params.pipe_length,
         deflection_percent=params.deflection_percent,
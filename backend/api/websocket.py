@@ -1,43 +1,86 @@
 import socketio
 import asyncio
+import glob
+import json
 import logging
-from typing import Optional
+import os
+from typing import NamedTuple, Optional, Tuple
 from config import settings
+from plc.capture_buffer import CaptureBuffer
+from plc.ticker import Ticker
+from services.persistence import PersistenceWorker
 from datetime import datetime, timezone, timedelta
 import time
 
 logger = logging.getLogger(__name__)
 
+class _LiveFrame(str):
+    """Pre-encoded live_data payload (JSON text)"""
+
+
+class _FrameJSON:
+    """json module for Socket.IO: live frames are spliced in as encoded
+
+    The snapshot is encoded once (LiveData.to_json) no matter how many
+    times it is emitted - keep-alives, new subscribers - or how many
+    clients are in the room.
+    """
+    loads = staticmethod(json.loads)
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        if type(obj) is list and len(obj) == 2 and isinstance(obj[1], _LiveFrame):
+            return f'[{json.dumps(obj[0])},{obj[1]}]'
+        return json.dumps(obj, **kwargs)
+
+
 # Create Socket.IO server
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins='*',
     logger=False,
-    engineio_logger=False
+    engineio_logger=False,
+    json=_FrameJSON,
 )
 
 # Services - will be set from main.py
 data_service = None
 command_service = None
-plc_connector = None  # PLC connector for reconnection
+plc_connector = None  # PLC connector (connection state)
+live_bus = None  # LiveBus - single live data poller (broadcast follows its cycles)
+clock = None  # test timing source instead of the ticker (replay: the trace clock)
 
 # Background task handle
 broadcast_task: Optional[asyncio.Task] = None
+_last_live: Optional[_LiveFrame] = None  # last emitted live_data (sent to new subscribers)
 
 # Calculated deflection state
 _test_start_time: Optional[float] = None
 _test_speed: float = 0.0
-_test_data_points: list = []
+_test_curve: CaptureBuffer = CaptureBuffer()  # curve samples of the running test
 _test_duration: Optional[float] = None  # seconds from start to target deflection
+_resume: Optional[CaptureBuffer] = None  # journal of a test interrupted by a restart (see recover_tests)
 
 # Pending test metadata
 _pending_metadata: dict = {}
 
+
+class TestCapture(NamedTuple):
+    """A completed test as seen by the live loop, saved by the persistence worker"""
+    results: dict
+    test: dict
+    params: dict
+    duration: Optional[float]
+    curve: CaptureBuffer  # frozen, closed by the worker once saved
+    metadata: dict  # the _pending_metadata dict itself (replaced, never mutated)
+    completed_at: datetime
+
 # Active test group state
 _active_group_id: int = None
 _group_num_positions: int = 1
 _group_current_position: int = 1
 _group_angles: list = [0, 40, 80]
+_group_version: int = 0  # bumped on reconfiguration (a save in flight keeps its own state)
 
 SAUDI_TZ = timezone(timedelta(hours=3))
 
@@ -54,7 +97,8 @@ _GROUP_FIELDS = ['num_positions', 'angles']
 
 def set_group_config(data: dict):
     """Set multi-position group config from frontend"""
-    global _active_group_id, _group_num_positions, _group_current_position, _group_angles
+    global _active_group_id, _group_num_positions, _group_current_position, _group_angles, _group_version
+    _group_version += 1
     _group_num_positions = int(data.get('num_positions', 1))
     _group_angles = data.get('angles', [0, 40, 80])
     _group_current_position = 1
@@ -75,7 +119,8 @@ def get_active_group():
 
 def reset_group():
     """Reset group state after completion or cancel"""
-    global _active_group_id, _group_num_positions, _group_current_position
+    global _active_group_id, _group_num_positions, _group_current_position, _group_version
+    _group_version += 1
     _active_group_id = None
     _group_num_positions = 1
     _group_current_position = 1
@@ -90,12 +135,29 @@ def get_pending_metadata() -> dict:
     return dict(_pending_metadata)
 
 
-def set_services(data_svc, cmd_svc, plc=None):
+def set_services(data_svc, cmd_svc, plc=None, supervisor=None, bus=None):
     """Set service instances from main.py"""
-    global data_service, command_service, plc_connector
+    global data_service, command_service, plc_connector, live_bus
     data_service = data_svc
     command_service = cmd_svc
     plc_connector = plc
+    live_bus = bus
+    if supervisor is not None:
+        supervisor.add_listener(_on_link_state)
+
+
+def set_clock(fn):
+    """Use fn(), read after each live read, instead of the ticker for test timing (trace replay)"""
+    global clock
+    clock = fn
+
+
+async def _on_link_state(link: str, old, new):
+    """Connection supervisor event -> connection_status to clients (poll link)"""
+    if plc_connector is None or link != plc_connector.name:
+        return
+    if new == "connected" or old == "connected":
+        await emit_connection_status(new == "connected")
 
 
 @sio.event
@@ -111,7 +173,7 @@ async def disconnect(sid):
     logger.info(f"Client disconnected: {sid}")
     if command_service:
         # Safety: stop all jog movements when client disconnects
-        command_service.stop_all_jog()
+        await command_service.astop_all_jog()
         logger.warning(f"Safety stop executed for disconnected client: {sid}")
 
 
@@ -120,6 +182,9 @@ async def subscribe(sid, data):
     """Subscribe to live data updates"""
     await sio.enter_room(sid, 'live_data')
     logger.info(f"Client {sid} subscribed to live_data")
+    # Unchanged data is not re-sent every cycle: give the new client the current state
+    if _last_live is not None:
+        await sio.emit('live_data', _last_live, to=sid)
 
 
 @sio.event
@@ -134,7 +199,7 @@ async def jog_forward(sid, data):
     """Handle jog forward command from client"""
     if command_service:
         state = data.get('state', False)
-        result = command_service.jog_forward(state)
+        result = await command_service.ajog_forward(state)
 
         # Check if jog was rejected due to LOCAL mode
         if not result.get('success') and result.get('reason') == 'LOCAL_MODE':
@@ -156,7 +221,7 @@ async def jog_backward(sid, data):
     """Handle jog backward command from client"""
     if command_service:
         state = data.get('state', False)
-        result = command_service.jog_backward(state)
+        result = await command_service.ajog_backward(state)
 
         # Check if jog was rejected due to LOCAL mode
         if not result.get('success') and result.get('reason') == 'LOCAL_MODE':
@@ -178,249 +243,297 @@ async def set_jog_speed(sid, data):
     """Set jog velocity"""
     if command_service:
         velocity = data.get('velocity', 50)
-        success = command_service.set_jog_velocity(velocity)
+        success = await command_service.aset_jog_velocity(velocity)
         await sio.emit('jog_speed_response', {
             'velocity': velocity,
             'success': success
         }, room=sid)
 
 
-async def _save_test_result(data: dict):
-    """Save completed test result to database"""
-    global _pending_metadata, _test_data_points, _test_duration
+async def _save_test_result(capture: TestCapture):
+    """Save completed test result to database (on a worker thread)"""
+    global _pending_metadata
     global _active_group_id, _group_current_position
-    from db.database import AsyncSessionLocal
-    from db.models import Test, TestDataPoint, TestGroup
-
+    version = _group_version
     try:
-        params = data_service.get_parameters() if data_service else {}
-        results = data.get('results', {})
-        test_info = data.get('test', {})
-
-        test_record = Test(
-            pipe_diameter=params.get('pipe_diameter', 0),
-            pipe_length=params.get('pipe_length', 300),
-            deflection_percent=params.get('deflection_percent', 3),
-            force_at_target=results.get('force_at_target', 0),
-            ring_stiffness=results.get('ring_stiffness', 0),
-            sn_class=results.get('sn_class', 0),
-            passed=test_info.get('passed', False),
-            test_speed=params.get('test_speed', 12),
-            max_force=results.get('force_at_target', 0),
-            duration=_test_duration,
+        test_id, group_id, position = await asyncio.to_thread(
+            _write_test_result, capture,
+            _active_group_id, _group_num_positions, _group_current_position, list(_group_angles),
         )
-
-        # Apply pending metadata
-        if _pending_metadata.get('sample_id'):
-            test_record.sample_id = _pending_metadata.get('sample_id')
-        if _pending_metadata.get('operator'):
-            test_record.operator = _pending_metadata.get('operator')
-        if _pending_metadata.get('notes'):
-            test_record.notes = _pending_metadata.get('notes')
-
-        # Apply new product/project metadata
-        if _pending_metadata.get('lot_number'):
-            test_record.lot_number = _pending_metadata.get('lot_number')
-        if _pending_metadata.get('nominal_diameter'):
-            test_record.nominal_diameter = _pending_metadata.get('nominal_diameter')
-        if _pending_metadata.get('pressure_class'):
-            test_record.pressure_class = _pending_metadata.get('pressure_class')
-        if _pending_metadata.get('stiffness_class'):
-            test_record.stiffness_class = _pending_metadata.get('stiffness_class')
-        if _pending_metadata.get('product_id'):
-            test_record.product_id = _pending_metadata.get('product_id')
-        if _pending_metadata.get('thickness'):
-            test_record.thickness = _pending_metadata.get('thickness')
-        if _pending_metadata.get('nominal_weight'):
-            test_record.nominal_weight = _pending_metadata.get('nominal_weight')
-        if _pending_metadata.get('project_name'):
-            test_record.project_name = _pending_metadata.get('project_name')
-        if _pending_metadata.get('customer_name'):
-            test_record.customer_name = _pending_metadata.get('customer_name')
-        if _pending_metadata.get('po_number'):
-            test_record.po_number = _pending_metadata.get('po_number')
-
-        test_record.test_date = datetime.now(SAUDI_TZ)
-
-        # Set position/angle for multi-position tests
-        if _group_num_positions > 1:
-            current_angle = _group_angles[_group_current_position - 1] if _group_current_position <= len(_group_angles) else 0
-            test_record.position = _group_current_position
-            test_record.angle = current_angle
-
-        async with AsyncSessionLocal() as session:
-            # Create or link test group
-            if _group_num_positions > 1:
-                if _active_group_id is None:
-                    # First position - create group
-                    group = TestGroup(
-                        sample_id=_pending_metadata.get('sample_id', ''),
-                        operator=_pending_metadata.get('operator', ''),
-                        pipe_diameter=params.get('pipe_diameter', 0),
-                        pipe_length=params.get('pipe_length', 300),
-                        deflection_percent=params.get('deflection_percent', 3),
-                        test_speed=params.get('test_speed', 12),
-                        num_positions=_group_num_positions,
-                        angles=_group_angles,
-                        current_position=1,
-                        status='in_progress',
-                        lot_number=_pending_metadata.get('lot_number', ''),
-                        nominal_diameter=_pending_metadata.get('nominal_diameter'),
-                        pressure_class=_pending_metadata.get('pressure_class', ''),
-                        stiffness_class=_pending_metadata.get('stiffness_class', ''),
-                        product_id=_pending_metadata.get('product_id', ''),
-                        thickness=_pending_metadata.get('thickness'),
-                        nominal_weight=_pending_metadata.get('nominal_weight'),
-                        project_name=_pending_metadata.get('project_name', ''),
-                        customer_name=_pending_metadata.get('customer_name', ''),
-                        po_number=_pending_metadata.get('po_number', ''),
-                    )
-                    session.add(group)
-                    await session.flush()
-                    _active_group_id = group.id
-                    logger.info(f"Created test group {group.id} with {_group_num_positions} positions")
-
-                test_record.group_id = _active_group_id
-
-            session.add(test_record)
-            await session.flush()  # Get the test ID
-
-            # Save data points
-            if _test_data_points:
-                for dp in _test_data_points:
-                    point = TestDataPoint(
-                        test_id=test_record.id,
-                        timestamp=dp['timestamp'],
-                        force=dp['force'],
-                        deflection=dp['deflection'],
-                        position=dp.get('position', 0),
-                    )
-                    session.add(point)
-                logger.info(f"Saving {len(_test_data_points)} data points")
-
-            await session.commit()
-            logger.info(f"Test result saved: Ø{test_record.pipe_diameter}mm, "
-                        f"RS={test_record.ring_stiffness:.1f} kN/m², "
-                        f"SN{test_record.sn_class}, {'PASS' if test_record.passed else 'FAIL'}")
-            # Update group progress
-            if _active_group_id and _group_num_positions > 1:
-                group = await session.get(TestGroup, _active_group_id)
-                if group:
-                    _group_current_position += 1
-                    group.current_position = _group_current_position
-
-                    # Check if all positions complete
-                    if _group_current_position > _group_num_positions:
-                        # Calculate average ring stiffness
-                        from sqlalchemy import select as sa_select
-                        result = await session.execute(
-                            sa_select(Test).where(Test.group_id == _active_group_id)
-                        )
-                        group_tests = result.scalars().all()
-                        stiffness_values = [t.ring_stiffness for t in group_tests if t.ring_stiffness]
-                        if stiffness_values:
-                            group.avg_ring_stiffness = sum(stiffness_values) / len(stiffness_values)
-                            group.sn_class = test_record.sn_class
-                            group.passed = all(t.passed for t in group_tests)
-                        group.status = 'completed'
-                        logger.info(f"Test group {_active_group_id} completed: avg RS={group.avg_ring_stiffness}")
-                    await session.commit()
-            
-            if _group_num_positions <= 1 or _group_current_position > _group_num_positions:
-                _pending_metadata = {}
-            return test_record.id
     except Exception as e:
         logger.error(f"Failed to save test result: {e}")
         return None
 
+    # Group progress, unless the operator reconfigured the group meanwhile
+    if version == _group_version and _group_num_positions > 1:
+        _active_group_id = group_id
+        _group_current_position = position
+    # Unless the operator already entered metadata for the next test
+    if (_group_num_positions <= 1 or _group_current_position > _group_num_positions) \
+            and _pending_metadata is capture.metadata:
+        _pending_metadata = {}
+    return test_id
+
+
+def _write_test_result(capture: TestCapture, group_id: Optional[int], num_positions: int,
+                       position: int, angles: list) -> Tuple[int, Optional[int], int]:
+    """Write the test row and its data points, then the group progress
+
+    Runs on a worker thread with the sync session, so encoding the curve
+    and the database writes never stall the event loop. Returns
+    (test id, group id, next group position).
+    """
+    from db.database import SessionLocal
+    from db.models import Test, TestGroup
+    from db.curves import save_curve
+
+    params = capture.params
+    results = capture.results
+    test_info = capture.test
+    metadata = capture.metadata
+
+    test_record = Test(
+        pipe_diameter=params.get('pipe_diameter', 0),
+        pipe_length=params.get('pipe_length', 300),
+        deflection_percent=params.get('deflection_percent', 3),
+        force_at_target=results.get('force_at_target', 0),
+        ring_stiffness=results.get('ring_stiffness', 0),
+        sn_class=results.get('sn_class', 0),
+        passed=test_info.get('passed', False),
+        test_speed=params.get('test_speed', 12),
+        max_force=results.get('force_at_target', 0),
+        duration=capture.duration,
+    )
+
+    # Apply pending metadata
+    if metadata.get('sample_id'):
+        test_record.sample_id = metadata.get('sample_id')
+    if metadata.get('operator'):
+        test_record.operator = metadata.get('operator')
+    if metadata.get('notes'):
+        test_record.notes = metadata.get('notes')
+
+    # Apply new product/project metadata
+    if metadata.get('lot_number'):
+        test_record.lot_number = metadata.get('lot_number')
+    if metadata.get('nominal_diameter'):
+        test_record.nominal_diameter = metadata.get('nominal_diameter')
+    if metadata.get('pressure_class'):
+        test_record.pressure_class = metadata.get('pressure_class')
+    if metadata.get('stiffness_class'):
+        test_record.stiffness_class = metadata.get('stiffness_class')
+    if metadata.get('product_id'):
+        test_record.product_id = metadata.get('product_id')
+    if metadata.get('thickness'):
+        test_record.thickness = metadata.get('thickness')
+    if metadata.get('nominal_weight'):
+        test_record.nominal_weight = metadata.get('nominal_weight')
+    if metadata.get('project_name'):
+        test_record.project_name = metadata.get('project_name')
+    if metadata.get('customer_name'):
+        test_record.customer_name = metadata.get('customer_name')
+    if metadata.get('po_number'):
+        test_record.po_number = metadata.get('po_number')
+
+    test_record.test_date = capture.completed_at
+
+    # Set position/angle for multi-position tests
+    if num_positions > 1:
+        current_angle = angles[position - 1] if position <= len(angles) else 0
+        test_record.position = position
+        test_record.angle = current_angle
+
+    with SessionLocal() as session:
+        # Create or link test group
+        if num_positions > 1:
+            if group_id is None:
+                # First position - create group
+                group = TestGroup(
+                    sample_id=metadata.get('sample_id', ''),
+                    operator=metadata.get('operator', ''),
+                    pipe_diameter=params.get('pipe_diameter', 0),
+                    pipe_length=params.get('pipe_length', 300),
+                    deflection_percent=params.get('deflection_percent', 3),
+                    test_speed=params.get('test_speed', 12),
+                    num_positions=num_positions,
+                    angles=angles,
+                    current_position=1,
+                    status='in_progress',
+                    lot_number=metadata.get('lot_number', ''),
+                    nominal_diameter=metadata.get('nominal_diameter'),
+                    pressure_class=metadata.get('pressure_class', ''),
+                    stiffness_class=metadata.get('stiffness_class', ''),
+                    product_id=metadata.get('product_id', ''),
+                    thickness=metadata.get('thickness'),
+                    nominal_weight=metadata.get('nominal_weight'),
+                    project_name=metadata.get('project_name', ''),
+                    customer_name=metadata.get('customer_name', ''),
+                    po_number=metadata.get('po_number', ''),
+                )
+                session.add(group)
+                session.flush()
+                group_id = group.id
+                logger.info(f"Created test group {group.id} with {num_positions} positions")
+
+            test_record.group_id = group_id
+
+        session.add(test_record)
+        session.flush()  # Get the test ID
+
+        # Save data points
+        if capture.curve:
+            save_curve(session, test_record.id, capture.curve.columns())
+            logger.info(f"Saving {len(capture.curve)} data points")
+
+        session.commit()
+        logger.info(f"Test result saved: Ø{test_record.pipe_diameter}mm, "
+                    f"RS={test_record.ring_stiffness:.1f} kN/m², "
+                    f"SN{test_record.sn_class}, {'PASS' if test_record.passed else 'FAIL'}")
+        # Update group progress
+        if group_id and num_positions > 1:
+            group = session.get(TestGroup, group_id)
+            if group:
+                position += 1
+                group.current_position = position
+
+                # Check if all positions complete
+                if position > num_positions:
+                    # Calculate average ring stiffness
+                    from sqlalchemy import select as sa_select
+                    result = session.execute(
+                        sa_select(Test).where(Test.group_id == group_id)
+                    )
+                    group_tests = result.scalars().all()
+                    stiffness_values = [t.ring_stiffness for t in group_tests if t.ring_stiffness]
+                    if stiffness_values:
+                        group.avg_ring_stiffness = sum(stiffness_values) / len(stiffness_values)
+                        group.sn_class = test_record.sn_class
+                        group.passed = all(t.passed for t in group_tests)
+                    group.status = 'completed'
+                    logger.info(f"Test group {group_id} completed: avg RS={group.avg_ring_stiffness}")
+                session.commit()
+        return test_record.id, group_id, position
+
 
 async def broadcast_live_data():
     """Background task to broadcast live data every 100ms"""
-    global _test_start_time, _test_speed, _test_data_points, _test_duration
+    global _test_start_time, _test_speed, _test_curve, _test_duration, _last_live
 
     logger.info("Starting live data broadcast task")
-    reconnect_interval = 0
-    last_connected = False
     last_test_status = 0
     last_test_stage = 0
-
+    # Without the live bus, poll on our own fixed-rate ticker
+    ticker = Ticker(settings.WS_UPDATE_INTERVAL, "broadcast")
+    # Change detection: emit only new snapshots, plus a keep-alive when idle
+    last_sent = None
+    last_deflection = None
+    last_emit = 0.0
+
+    # Reconnection is handled by the ConnectionSupervisor, which also emits
+    # connection_status; this loop only reads (fast fail when disconnected)
     while True:
         try:
-            # Try to reconnect if disconnected (every 5 seconds)
-            if plc_connector and not plc_connector.connected:
-                reconnect_interval += 1
-                if reconnect_interval >= 50:
-                    reconnect_interval = 0
-                    logger.info("Attempting to reconnect to PLC...")
-                    if plc_connector.connect():
-                        logger.info("Reconnected to PLC successfully!")
-                        await emit_connection_status(True)
-                        last_connected = True
-                    else:
-                        if last_connected:
-                            await emit_connection_status(False)
-                            last_connected = False
-            else:
-                reconnect_interval = 0
-                if plc_connector and plc_connector.connected and not last_connected:
-                    last_connected = True
-                    await emit_connection_status(True)
-
             if data_service:
-                data = data_service.get_live_data()
+                # tick: scheduled poll time, the time base of test timing and curve samples
+                if live_bus is not None:
+                    snapshot = await live_bus.wait()
+                    data, tick = snapshot.data, snapshot.tick  # shared snapshot: read only
+                else:
+                    tick = await ticker.wait()
+                    data = await data_service.aget_live_data()
+                    if clock is not None:
+                        tick = clock()  # recorded time of the cycle just read
 
                 current_test_status = data.get('test_status', 0)
                 current_test_stage = data.get('test', {}).get('stage', 0)
 
+                # First connected cycle after a restart with an interrupted test
+                if _resume is not None and data.get('connected'):
+                    if await _resume_test(current_test_status, tick):
+                        last_test_status = 2  # already running: no start edge
+
                 # Detect test start: start deflection timer when test_status becomes 2 (testing)
                 if current_test_status == 2 and last_test_status != 2:
-                    _test_start_time = time.monotonic()
+                    _test_start_time = tick
                     _test_duration = None
-                    params = data_service.get_parameters()
+                    params = await data_service.aget_parameters()
                     _test_speed = params.get('test_speed', 12.0) or 12.0
-                    _test_data_points = []
+                    _test_curve.close()  # not handed over: the previous test was abandoned
+                    _test_curve = await _new_capture(params)
+                    if data_service.curve is not None:
+                        data_service.curve.reset()
                     logger.info(f"Test started, deflection timer started, speed={_test_speed} mm/min")
+                    if settings.TRACE_CAPTURE:
+                        await data_service.astart_trace()
 
                 # Detect reaching target: status transitions from 2 (testing) to 3+ (at target)
                 if last_test_status == 2 and current_test_status > 2 and _test_start_time is not None and _test_duration is None:
-                    _test_duration = time.monotonic() - _test_start_time
+                    _test_duration = tick - _test_start_time
                     logger.info(f"Target reached, duration: {_test_duration:.1f}s")
+                    await _test_curve.arecord({'duration': _test_duration})
 
                 # Calculate deflection ONLY during testing (test_status == 2)
                 calculated_deflection = 0.0
                 if _test_start_time is not None and current_test_status == 2:
-                    elapsed = time.monotonic() - _test_start_time
+                    elapsed = tick - _test_start_time
                     calculated_deflection = (_test_speed / 60.0) * elapsed
 
                 # Accumulate data points during full active test (force from load cell always)
+                curve = data_service.curve
+                sample_count = data.get('results', {}).get('data_points', 0)
                 if 2 <= current_test_status <= 5:
-                    force_kn = data.get('actual_force', 0) or 0.0
-                    _test_data_points.append({
-                        'timestamp': time.monotonic() - (_test_start_time or time.monotonic()),
-                        'force': force_kn,
-                        'deflection': calculated_deflection,
-                        'position': data.get('actual_position', 0) or 0.0,
-                    })
-
-                # Inject calculated_deflection into broadcast
-                data['calculated_deflection'] = calculated_deflection
-
-                await sio.emit('live_data', data, room='live_data')
+                    if curve is not None:
+                        # Samples logged by the PLC at scan rate, drained in blocks
+                        if curve.due(sample_count):
+                            await curve.adrain(sample_count, _test_curve)
+                    else:
+                        _test_curve.append(
+                            tick - (_test_start_time or tick),
+                            data.get('actual_force', 0) or 0.0,
+                            calculated_deflection,
+                            data.get('actual_position', 0) or 0.0,
+                        )
+                    # Crash safety: the samples so far go to the journal every few seconds
+                    if _test_curve.checkpoint_due():
+                        await _test_curve.acheckpoint()
+
+                now = time.monotonic()
+                # An unchanged snapshot is the same object as the one already sent
+                if (data is not last_sent or calculated_deflection != last_deflection
+                        or now - last_emit >= settings.WS_KEEPALIVE_INTERVAL):
+                    # Inject calculated_deflection into the cached encoding of the snapshot
+                    _last_live = _LiveFrame(
+                        f'{data.to_json()[:-1]},"calculated_deflection":{json.dumps(calculated_deflection)}}}'
+                    )
+                    await sio.emit('live_data', _last_live, room='live_data')
+                    last_sent = data
+                    last_deflection = calculated_deflection
+                    last_emit = now
 
                 # Detect test completion: active -> complete/idle
                 if last_test_status >= 2 and last_test_status <= 5 and (current_test_status == 0 or current_test_status >= 5):
                     if last_test_status != current_test_status:
                         logger.info(f"Test completed (status {last_test_status} -> {current_test_status}) - saving results")
-                        saved_test_id = await _save_test_result(data)
-                        await emit_test_complete({
-                            'results': data.get('results', {}),
-                            'test': data.get('test', {}),
-                            'test_id': saved_test_id,
-                            'group': get_active_group(),
-                        })
+                        if curve is not None:
+                            await curve.adrain(sample_count, _test_curve)
+                        capture = TestCapture(
+                            results=dict(data.get('results', {})),
+                            test=dict(data.get('test', {})),
+                            params=await data_service.aget_parameters(),
+                            duration=_test_duration,
+                            curve=_test_curve.freeze(),
+                            metadata=_pending_metadata,
+                            completed_at=datetime.now(SAUDI_TZ),
+                        )
+                        # Journaled first: a crash before the save still has the results
+                        await _test_curve.arecord({'completed': _completion_record(capture)})
+                        # Saved by the persistence worker, the stream keeps running
+                        await persistence.submit(capture)
+                        if data_service.trace is not None:
+                            await data_service.astop_trace()
                         # Reset calculated deflection state
                         _test_start_time = None
-                        _test_data_points = []
+                        _test_curve = CaptureBuffer()
                         _test_duration = None
 
                 last_test_status = current_test_status
@@ -428,8 +541,152 @@ async def broadcast_live_data():
 
         except Exception as e:
             logger.error(f"Error broadcasting live data: {e}")
+            if live_bus is not None:
+                await asyncio.sleep(settings.WS_UPDATE_INTERVAL)
 
-        await asyncio.sleep(settings.WS_UPDATE_INTERVAL)
+
+async def _persist_test(capture: TestCapture):
+    """Persistence worker handler: save, then tell the clients"""
+    saved_test_id = None
+    try:
+        saved_test_id = await _save_test_result(capture)
+    finally:
+        if saved_test_id is not None:
+            capture.curve.close()
+        else:
+            capture.curve.release()  # a journal is retried at the next start
+    await emit_test_complete({
+        'results': capture.results,
+        'test': capture.test,
+        'test_id': saved_test_id,
+        'group': get_active_group(),
+    })
+
+
+# Completed tests are written off the broadcast loop, in completion order
+persistence = PersistenceWorker(_persist_test)
+
+
+# ══════════════════════════════════════════════════════════════════════
+# CAPTURE JOURNAL (crash recovery)
+# ══════════════════════════════════════════════════════════════════════
+
+async def _new_capture(params: dict) -> CaptureBuffer:
+    """Curve buffer of a starting test, journaled to disk unless disabled"""
+    if not settings.CAPTURE_JOURNAL:
+        return CaptureBuffer()
+    started = datetime.now(SAUDI_TZ)
+    path = os.path.join(settings.CAPTURE_JOURNAL_DIR, f"test_{started:%Y%m%d_%H%M%S_%f}.jnl")
+    context = {
+        'started_at': started.isoformat(),
+        'params': params,
+        'metadata': _pending_metadata,
+        'test_speed': _test_speed,
+    }
+    try:
+        return await asyncio.to_thread(CaptureBuffer, journal=path, context=context)
+    except OSError as e:
+        logger.error(f"Capture journal unavailable ({e}), test curve kept in memory only")
+        return CaptureBuffer()
+
+
+def _completion_record(capture: TestCapture) -> dict:
+    return {
+        'results': capture.results,
+        'test': capture.test,
+        'params': capture.params,
+        'duration': capture.duration,
+        'metadata': capture.metadata,
+        'completed_at': capture.completed_at.isoformat(),
+    }
+
+
+def _recovered_capture(buffer: CaptureBuffer) -> TestCapture:
+    """TestCapture of a journal: its completion record, or an incomplete test"""
+    context = buffer.context
+    completed = context.get('completed')
+    if completed is not None:
+        return TestCapture(
+            results=completed['results'],
+            test=completed['test'],
+            params=completed['params'],
+            duration=completed['duration'],
+            curve=buffer.freeze(),
+            metadata=completed['metadata'],
+            completed_at=datetime.fromisoformat(completed['completed_at']),
+        )
+    metadata = dict(context.get('metadata') or {})
+    note = f"Incomplete: interrupted after {len(buffer)} samples, recovered at restart"
+    metadata['notes'] = f"{metadata['notes']} - {note}" if metadata.get('notes') else note
+    return TestCapture(
+        results={},
+        test={'passed': False},
+        params=context.get('params') or {},
+        duration=context.get('duration'),
+        curve=buffer.freeze(),
+        metadata=metadata,
+        completed_at=datetime.fromtimestamp(os.path.getmtime(buffer.journal), SAUDI_TZ),
+    )
+
+
+async def recover_tests() -> int:
+    """Pick up the journals of tests interrupted by a crash or power cut
+
+    Called at startup, before the broadcast starts. A journal with a
+    completion record is a finished test that was never saved: it is saved
+    now. The newest unfinished one is left to the broadcast loop, which
+    resumes it if the PLC is still running that test (_resume_test); older
+    unfinished ones are saved as incomplete tests. Returns the number of
+    journals found.
+    """
+    global _resume
+    if not settings.CAPTURE_JOURNAL:
+        return 0
+    paths = sorted(glob.glob(os.path.join(settings.CAPTURE_JOURNAL_DIR, "*.jnl")))
+    unfinished = []
+    for path in paths:
+        try:
+            buffer = await asyncio.to_thread(CaptureBuffer.open_journal, path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable capture journal {path}: {e}")
+            try:
+                os.replace(path, f"{path}.bad")
+            except OSError:
+                pass
+            continue
+        logger.warning(f"Recovering test from {path}: {len(buffer)} samples, "
+                       f"{'completed' if 'completed' in buffer.context else 'interrupted'}")
+        if 'completed' in buffer.context:
+            await persistence.submit(_recovered_capture(buffer))
+        else:
+            unfinished.append(buffer)
+    if unfinished:
+        _resume = unfinished.pop()
+    for buffer in unfinished:
+        await persistence.submit(_recovered_capture(buffer))
+    return len(paths)
+
+
+async def _resume_test(status: int, tick: float) -> bool:
+    """Continue the interrupted test if the PLC is still running it, else save it as incomplete"""
+    global _resume, _test_curve, _test_start_time, _test_speed, _test_duration, _pending_metadata
+    buffer, _resume = _resume, None
+    if not 2 <= status <= 5:
+        logger.warning(f"Interrupted test is not running on the PLC (status {status}), saving it as incomplete")
+        await persistence.submit(_recovered_capture(buffer))
+        return False
+    context = buffer.context
+    started = datetime.fromisoformat(context['started_at'])
+    # Same time base as before the restart: timestamps continue where the journal stops
+    _test_start_time = tick - (datetime.now(SAUDI_TZ) - started).total_seconds()
+    _test_speed = context.get('test_speed') or 12.0
+    _test_duration = context.get('duration')
+    if not _pending_metadata:
+        _pending_metadata = context.get('metadata') or {}
+    _test_curve.close()
+    _test_curve = buffer
+    logger.warning(f"Resuming test started {started:%H:%M:%S}: {len(buffer)} samples journaled")
+    return True
 
 
 async def emit_test_complete(test_data: dict):
@@ -453,6 +710,7 @@ async def emit_connection_status(connected: bool):
 def start_broadcast_task():
     """Start the background broadcast task"""
     global broadcast_task
+    persistence.start()
     if broadcast_task is None or broadcast_task.done():
         broadcast_task = asyncio.create_task(broadcast_live_data())
         logger.info("Broadcast task started")
@@ -7,11 +7,44 @@ class Settings(BaseSettings):
     PLC_IP: str = "192.168.0.100"
     PLC_RACK: int = 0
     PLC_SLOT: int = 1
+    PLC_PORT: int = 102  # ISO-on-TCP
+    PLC_CONNECT_TIMEOUT: float = 2.0  # s - TCP connect to a dead/unreachable PLC fails after this
+    PLC_RECV_TIMEOUT: float = 1.0  # s - a request without reply marks the link down after this
+    PLC_RECONNECT_MIN: float = 0.5  # s - first reconnect delay (doubles per failure, with jitter)
+    PLC_RECONNECT_MAX: float = 30.0  # s - reconnect delay ceiling
+    PLC_SLOW_POLL_INTERVAL: float = 1.0  # s - CPU state / DB1 parameters refresh (also after writes)
+    PLC_CURVE_BUFFER: bool = False  # PLC logs curve samples to the DB5 ring (plc/curve_buffer.py)
+    PLC_CURVE_DRAIN_INTERVAL: float = 0.5  # s - DB5 drain period during a test
+    PLC_HEARTBEAT_INTERVAL: float = 2.0  # s - probe a link after this long without successful I/O
+    PLC_READ_GAP: int = 16  # bytes - merge tag ranges closer than this into one block read
+    PLC_SHADOW_MAX_AGE: float = 0.05  # s - trust shadowed command bytes for bit writes up to this age
+    PLC_SNAPSHOT_MAX_AGE: float = 0.1  # s - serve reads / command prechecks from the live bus up to this age
+    PLC_COMMAND_CONNECTION: bool = True  # second S7 connection for commands (jog/stop never wait for polling)
 
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./grp_test.db"
     DATABASE_SYNC_URL: str = "sqlite:///./grp_test.db"
 
+    # Black box recorder (raw DB2/DB3/DB4 of every live cycle, ring file)
+    BLACKBOX_ENABLED: bool = False  # enabled on the machine (.env): preallocates BLACKBOX_SIZE_MB on disk
+    BLACKBOX_PATH: str = "./blackbox.bin"
+    BLACKBOX_SIZE_MB: int = 256
+
+    # Completed tests are saved by a background worker (services/persistence.py)
+    PERSIST_QUEUE_SIZE: int = 16  # completed tests waiting for the DB writer
+    CAPTURE_MAX_MEMORY_MB: int = 32  # test curve kept in memory, longer tests spill to a temp file
+
+    # Running tests are journaled to disk and recovered after a crash (plc/capture_buffer.py)
+    CAPTURE_JOURNAL: bool = True
+    CAPTURE_JOURNAL_DIR: str = "./journal"
+    CAPTURE_CHECKPOINT_SAMPLES: int = 500  # journal the new samples after this many ...
+    CAPTURE_CHECKPOINT_INTERVAL: float = 2.0  # s - ... or this long after the last checkpoint
+
+    # Trace capture (one replayable file per test, see plc/replay.py)
+    TRACE_CAPTURE: bool = False
+    TRACE_DIR: str = "./traces"
+    TRACE_MAX_MB: int = 64
+
     # Server
     HOST: str = "0.0.0.0"
     PORT: int = 8000
@@ -19,6 +52,7 @@ class Settings(BaseSettings):
 
     # WebSocket
     WS_UPDATE_INTERVAL: float = 0.02  # 20ms (50Hz)
+    WS_KEEPALIVE_INTERVAL: float = 1.0  # s - resend unchanged live data at least this often
 
     # Safety Limits
     MAX_FORCE: float = 200.0  # kN
@@ -0,0 +1,140 @@
+"""
+Curve storage benchmark - per-sample rows vs. one compressed curve row
+
+Saves synthetic curves of each size into a throwaway SQLite database, each
+in a single transaction: as one TestDataPoint object per sample, as the
+same rows with a bulk Core insert, and with save_curve() (test_curves).
+Then loads each back (ORM rows vs. load_curve()):
+    python -m db.bench_curve
+    python -m db.bench_curve --points 1000 10000 100000 --database /tmp/bench.db
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from itertools import islice
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from plc.capture_buffer import CaptureBuffer
+from .curves import load_curve, save_curve
+from .database import Base
+from .models import Test, TestDataPoint
+
+ROW_BATCH = 10000
+
+
+def make_curve(points: int) -> CaptureBuffer:
+    """Ramp curve sampled every 10 ms"""
+    curve = CaptureBuffer()
+    for i in range(points):
+        t = i * 0.01
+        curve.append(t, t * 0.8, t * 0.2, t * 0.2)
+    return curve.freeze()
+
+
+def insert_orm(session: Session, test_id: int, curve: CaptureBuffer) -> None:
+    for timestamp, force, deflection, position in curve.rows():
+        session.add(TestDataPoint(
+            test_id=test_id, timestamp=timestamp, force=force, deflection=deflection, position=position,
+        ))
+
+
+def insert_rows(session: Session, test_id: int, curve: CaptureBuffer) -> None:
+    statement = insert(TestDataPoint.__table__)
+    rows = curve.rows()
+    while True:
+        params = [
+            {"test_id": test_id, "timestamp": t, "force": f, "deflection": d, "position": p}
+            for t, f, d, p in islice(rows, ROW_BATCH)
+        ]
+        if not params:
+            return
+        session.execute(statement, params)
+
+
+def insert_blob(session: Session, test_id: int, curve: CaptureBuffer) -> None:
+    save_curve(session, test_id, curve.columns())
+
+
+def load_rows(session: Session, test_id: int) -> int:
+    points = session.execute(select(TestDataPoint).where(TestDataPoint.test_id == test_id)).scalars().all()
+    return len(points)
+
+
+def load_blob(session: Session, test_id: int) -> int:
+    return len(load_curve(session, test_id)["force"])
+
+
+METHODS: Dict[str, Callable[[Session, int, CaptureBuffer], None]] = {
+    "orm": insert_orm,
+    "rows": insert_rows,
+    "blob": insert_blob,
+}
+LOADERS: Dict[str, Callable[[Session, int], int]] = {
+    "orm": load_rows,
+    "blob": load_blob,
+}
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def run(points: List[int], database: str) -> List[Dict[str, float]]:
+    engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(engine)
+    sessions = sessionmaker(bind=engine)
+    results = []
+    for count in points:
+        curve = make_curve(count)
+        row: Dict[str, float] = {"points": count}
+        test_ids = {}
+        for name, method in METHODS.items():
+            with sessions() as session:
+                test = Test(pipe_diameter=300.0, pipe_length=300.0, deflection_percent=3.0)
+                session.add(test)
+                session.flush()
+                test_ids[name] = test.id
+                started = time.perf_counter()
+                method(session, test.id, curve)
+                session.commit()
+                row[f"save_{name}_ms"] = _ms(started)
+        for name, loader in LOADERS.items():
+            with sessions() as session:
+                started = time.perf_counter()
+                loaded = loader(session, test_ids[name])
+                row[f"load_{name}_ms"] = _ms(started)
+                assert loaded == count, f"{name}: loaded {loaded} of {count} samples"
+        results.append(row)
+        curve.close()
+    engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark test curve storage (per-sample rows vs. curve row)")
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="curve sizes to save")
+    parser.add_argument("--database", help="SQLite file to write (default: throwaway)")
+    args = parser.parse_args()
+
+    database = args.database
+    if database is None:
+        fd, database = tempfile.mkstemp(prefix="bench_curve_", suffix=".db")
+        os.close(fd)
+    try:
+        columns = [f"save_{name}_ms" for name in METHODS] + [f"load_{name}_ms" for name in LOADERS]
+        print(f"{'points':>8}" + "".join(f"{column[:-3]:>12}" for column in columns) + "  (ms)")
+        for row in run(args.points, database):
+            print(f"{row['points']:>8}" + "".join(f"{row[column]:>12}" for column in columns))
+    finally:
+        if args.database is None:
+            os.remove(database)
+
+
+if __name__ == "__main__":
+    main()
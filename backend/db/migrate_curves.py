@@ -0,0 +1,117 @@
+"""
+Legacy curve migration - test_data_points rows to test_curves
+
+Databases from older versions hold one test_data_points row per sample.
+This one-shot command encodes the rows of every test without a curve as
+its test_curves row (one transaction per test) and keeps the rows. Run it
+with the backend stopped:
+    python -m db.migrate_curves
+    python -m db.migrate_curves --database /path/to/grp_test.db
+
+--purge then deletes the rows of the tests whose curve matches them
+sample for sample; rows that do not match are kept and reported. Copy the
+database file before purging, there is no undo.
+"""
+
+import argparse
+import logging
+import sys
+from array import array
+from typing import Dict, List, Tuple
+
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.engine import Connection, Engine
+
+from .curves import COLUMNS, decode_curve, encode_curve
+from .database import Base
+from .models import TestCurve, TestDataPoint
+
+logger = logging.getLogger(__name__)
+
+points = TestDataPoint.__table__
+curves = TestCurve.__table__
+
+
+def legacy_tests(conn: Connection) -> Tuple[List[int], List[int]]:
+    """Test ids with data point rows: (without a curve, with a curve)"""
+    test_ids = conn.execute(select(points.c.test_id).distinct().order_by(points.c.test_id)).scalars().all()
+    converted = set(conn.execute(select(curves.c.test_id)).scalars())
+    return [i for i in test_ids if i not in converted], [i for i in test_ids if i in converted]
+
+
+def read_points(conn: Connection, test_id: int) -> Dict[str, array]:
+    """Data point rows of a test as curve columns (in id = capture order)"""
+    rows = conn.execute(
+        select(points.c.timestamp, points.c.force, points.c.deflection, points.c.position)
+        .where(points.c.test_id == test_id)
+        .order_by(points.c.id)
+    ).all()
+    return {name: array("d", (row[index] or 0.0 for row in rows)) for index, (name, _) in enumerate(COLUMNS)}
+
+
+def convert(engine: Engine) -> int:
+    """Add the test_curves row of every test that only has data points
+
+    The data point rows are kept. Returns the number of tests converted.
+    """
+    with engine.connect() as conn:
+        pending, _ = legacy_tests(conn)
+    for test_id in pending:
+        with engine.begin() as conn:
+            columns = read_points(conn, test_id)
+            conn.execute(insert(curves).values(
+                test_id=test_id, samples=len(columns["timestamp"]), data=encode_curve(columns),
+            ))
+    return len(pending)
+
+
+def verify(engine: Engine) -> Tuple[List[int], List[int]]:
+    """Compare the curve of every test with data points: (matching, mismatched) ids"""
+    matching, mismatched = [], []
+    with engine.connect() as conn:
+        _, test_ids = legacy_tests(conn)
+        for test_id in test_ids:
+            blob = conn.execute(select(curves.c.data).where(curves.c.test_id == test_id)).scalar_one()
+            curve, columns = decode_curve(blob), read_points(conn, test_id)
+            same = all(curve.get(name) == columns[name] for name, _ in COLUMNS)
+            (matching if same else mismatched).append(test_id)
+    return matching, mismatched
+
+
+def purge(engine: Engine, test_ids: List[int]) -> int:
+    """Delete the data point rows of `test_ids`, returns the number of rows"""
+    deleted = 0
+    for test_id in test_ids:
+        with engine.begin() as conn:
+            deleted += conn.execute(delete(points).where(points.c.test_id == test_id)).rowcount
+    return deleted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert legacy test_data_points rows to test_curves")
+    parser.add_argument("--database", help="SQLite file (default: the configured database)")
+    parser.add_argument("--purge", action="store_true",
+                        help="delete the data points of tests whose curve matches them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.database:
+        engine = create_engine(f"sqlite:///{args.database}")
+    else:
+        from .database import engine
+    Base.metadata.create_all(bind=engine)  # test_curves on a database not opened by this version yet
+
+    logger.info(f"Converted {convert(engine)} tests")
+    matching, mismatched = verify(engine)
+    logger.info(f"{len(matching)} curves match their data points")
+    if mismatched:
+        logger.warning(f"Curve and data points differ, rows kept: tests {mismatched}")
+    if args.purge:
+        logger.info(f"Deleted {purge(engine, matching)} data points of {len(matching)} tests")
+    elif matching:
+        logger.info("Data points kept, delete them with --purge after a backup")
+    sys.exit(1 if mismatched else 0)
+
+
+if __name__ == "__main__":
+    main()
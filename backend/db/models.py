@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone, timedelta
 from .database import Base
@@ -86,9 +86,16 @@ class TestGroup(Base):
 class Test(Base):
     """Test record model - stores completed test results"""
     __tablename__ = "tests"
+    # History queries filter on these and page by (test_date, id). SQLite
+    # appends the rowid (id) to every index, so each one also serves the keyset.
+    __table_args__ = (
+        Index("ix_tests_passed_test_date", "passed", "test_date"),
+        Index("ix_tests_operator_test_date", "operator", "test_date"),
+        Index("ix_tests_sample_id_test_date", "sample_id", "test_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    sample_id = Column(String(50), nullable=True, index=True)
+    sample_id = Column(String(50), nullable=True)  # indexed with test_date
     operator = Column(String(100), nullable=True)
     test_date = Column(DateTime, default=lambda: datetime.now(timezone(timedelta(hours=3))), index=True)
 
@@ -131,6 +138,7 @@ class Test(Base):
     # Relationships
     group = relationship("TestGroup", back_populates="tests")
     data_points = relationship("TestDataPoint", back_populates="test", cascade="all, delete-orphan")
+    curve = relationship("TestCurve", back_populates="test", uselist=False, cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Test {self.id}: Ø{self.pipe_diameter}mm, SN{self.sn_class}, {'PASS' if self.passed else 'FAIL'}>"
@@ -168,8 +176,28 @@ class Test(Base):
         }
 
 
+class TestCurve(Base):
+    """Test curve model - the whole force/deflection curve of a test in one row
+
+    `data` is the compressed columnar encoding of db/curves.py
+    (encode_curve / decode_curve).
+    """
+    __tablename__ = "test_curves"
+
+    test_id = Column(Integer, ForeignKey("tests.id", ondelete="CASCADE"), primary_key=True)
+    samples = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    # Relationship
+    test = relationship("Test", back_populates="curve")
+
+    def __repr__(self):
+        return f"<TestCurve test={self.test_id}: {self.samples} samples, {len(self.data or b'')} bytes>"
+
+
 class TestDataPoint(Base):
-    """Test data point model - stores force/deflection curve data"""
+    """Test data point model - one row per curve sample (pre test_curves storage,
+    converted by `python -m db.migrate_curves`)"""
     __tablename__ = "test_data_points"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -5,7 +5,6 @@ Python + FastAPI + Snap7 + WebSocket
 Run with: uvicorn main:socket_app --host 0.0.0.0 --port 8000 --reload
 """
 
-import asyncio
 import logging
 import sys
 from contextlib import asynccontextmanager
@@ -20,6 +19,8 @@ from db.database import init_db
 from plc.connector import PLCConnector
 from plc.data_service import DataService
 from plc.command_service import CommandService
+from plc.supervisor import ConnectionSupervisor
+from plc.live_bus import LiveBus
 from services.pdf_generator import PDFGenerator
 from services.excel_export import ExcelExporter
 from services.test_service import TestService
@@ -40,10 +41,12 @@ logger = logging.getLogger(__name__)
 # Initialize components
 plc = PLCConnector(settings.PLC_IP, settings.PLC_RACK, settings.PLC_SLOT)
 data_service = DataService(plc)
-command_service = CommandService(plc)
+live_bus = LiveBus(data_service)
+command_service = CommandService(plc, live_bus)
+supervisor = ConnectionSupervisor(plc)
 pdf_generator = PDFGenerator()
 excel_exporter = ExcelExporter()
-test_service = TestService(data_service, command_service)
+test_service = TestService(data_service, command_service, live_bus)
 
 
 @asynccontextmanager
@@ -56,15 +59,27 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("Database initialized")
 
+    # Start PLC I/O thread (owns all async snap7 calls)
+    plc.start_io()
+
     # Connect to PLC
     if plc.connect():
         logger.info(f"Connected to PLC at {settings.PLC_IP}")
         # Set default mode to REMOTE on startup
-        if command_service.set_remote_mode(True):
+        if (await command_service.aset_remote_mode(True))["success"]:
             logger.info("Default mode set to REMOTE")
     else:
         logger.warning(f"Could not connect to PLC at {settings.PLC_IP} - running in offline mode")
 
+    # Keep the PLC links up in the background (backoff, never blocks the loop)
+    supervisor.start()
+
+    # Single live data poller shared by all consumers
+    live_bus.start()
+
+    # Tests interrupted by a crash / power cut: save, or resume once the PLC is back
+    await ws.recover_tests()
+
     # Start WebSocket broadcast task
     ws.start_broadcast_task()
     logger.info("WebSocket broadcast started")
@@ -76,12 +91,18 @@ async def lifespan(app: FastAPI):
 
     # Stop broadcast
     ws.stop_broadcast_task()
+    await ws.persistence.stop()  # finish saving completed tests
+    await live_bus.stop()
+    await supervisor.stop()
 
     # Safety: stop all movements
-    command_service.stop_all_jog()
+    await command_service.astop_all_jog()
 
     # Disconnect PLC
     plc.disconnect()
+    plc.stop_io()
+    if data_service.blackbox is not None:
+        data_service.blackbox.close()
     logger.info("Server shutdown complete")
 
 
@@ -103,10 +124,10 @@ app.add_middleware(
 )
 
 # Set services for routes
-status.set_services(plc, data_service)
+status.set_services(plc, data_service, supervisor, live_bus)
 commands.set_services(command_service)
 reports.set_services(pdf_generator, excel_exporter)
-ws.set_services(data_service, command_service, plc)
+ws.set_services(data_service, command_service, plc, supervisor, live_bus)
 
 # Include routers
 app.include_router(status.router, prefix="/api")
@@ -154,7 +175,7 @@ async def api_start_test(
 @app.post("/api/test/stop")
 async def api_stop_test():
     """Stop current test"""
-    test_service.stop_test()
+    await test_service.stop_test()
     return {"success": True, "message": "Test stopped"}
 
 
@@ -1,5 +1,11 @@
 from .connector import PLCConnector
 from .data_service import DataService
 from .command_service import CommandService
+from .io_engine import PLCIOEngine
+from .live_bus import LiveBus, LiveSnapshot
+from .live_data import LiveData
+from .scheduler import Priority, PriorityLock
+from .supervisor import ConnectionSupervisor, LinkState
 
-__all__ = ["PLCConnector", "DataService", "CommandService"]
+__all__ = ["PLCConnector", "DataService", "CommandService", "PLCIOEngine", "Priority", "PriorityLock",
+           "ConnectionSupervisor", "LinkState", "LiveBus", "LiveSnapshot", "LiveData"]
@@ -0,0 +1,217 @@
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .tags import TAGS, TagMap
+
+logger = logging.getLogger(__name__)
+
+Range = Tuple[int, int, int]  # (db, start, size)
+
+
+class BlackBoxRecorder:
+    """Flight recorder of the raw live-cycle DB blocks
+
+    Every block set read by the live poll is appended, with a sequence
+    number and monotonic + wall-clock timestamps, to a fixed-size
+    memory-mapped ring file overwritten in place. One append is a few
+    slice copies into the mapping - no encoding, no syscalls.
+
+    File layout (little-endian):
+        header (HEADER_SIZE bytes): magic, record size, capacity, head
+            sequence, range count, then (db, start, size) per range
+        records: seq u64 | monotonic f64 | wall f64 | raw blocks...
+
+    A record's seq is cleared before its data is rewritten and set last,
+    so readers can copy records while the poll keeps appending.
+    """
+
+    MAGIC = b"GRPBBX01"
+    HEADER = struct.Struct("<8sIIQI")          # magic, record_size, capacity, head, n_ranges
+    RANGE = struct.Struct("<HHH")
+    HEAD_OFFSET = 16                           # offset of the head sequence in the header
+    HEADER_SIZE = 4096
+    RECORD_HEAD = struct.Struct("<Qdd")        # seq (1-based), monotonic, wall
+
+    def __init__(self, path: str, size_bytes: int, ranges: Sequence[Range]):
+        self.path = path
+        self.size_bytes = size_bytes
+        self.ranges: List[Range] = [tuple(r) for r in ranges]
+        self.record_size = self.RECORD_HEAD.size + sum(size for _, _, size in self.ranges)
+        self.capacity = max(1, (size_bytes - self.HEADER_SIZE) // self.record_size)
+        self.seq = 0
+        self.failed = False
+        self.readonly = False
+        self._mm: Optional[mmap.mmap] = None
+        self._file = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._mm is not None
+
+    def open(self, readonly: bool = False) -> None:
+        """Map the ring file, continuing an existing recording with the same layout
+
+        readonly maps an existing file for reading only (replay, analysis).
+        """
+        length = self.HEADER_SIZE + self.capacity * self.record_size
+        existing = os.path.exists(self.path) and os.path.getsize(self.path) == length
+        self.readonly = readonly
+        if readonly:
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            header = self._read_header(self._mm)
+            if not header or header[1] != self.record_size or len(self._mm) != length:
+                self.close()
+                raise ValueError(f"{self.path} is not a black box file with this layout")
+            self.seq = header[3]
+            return
+        self._file = open(self.path, "r+b" if existing else "w+b")
+        if not existing:
+            self._file.truncate(length)
+        self._mm = mmap.mmap(self._file.fileno(), length)
+
+        header = self._read_header(self._mm)
+        if header and header[0] == self.ranges and header[1] == self.record_size and header[2] == self.capacity:
+            self.seq = header[3]
+            logger.info(f"Black box {self.path}: continuing at record {self.seq}")
+        else:
+            self._mm[:self.HEADER_SIZE] = bytes(self.HEADER_SIZE)
+            self.HEADER.pack_into(self._mm, 0, self.MAGIC, self.record_size, self.capacity, 0, len(self.ranges))
+            for index, read_range in enumerate(self.ranges):
+                self.RANGE.pack_into(self._mm, self.HEADER.size + index * self.RANGE.size, *read_range)
+            self.seq = 0
+            logger.info(f"Black box {self.path}: new ring of {self.capacity} records "
+                        f"({self.record_size} bytes each)")
+
+    @classmethod
+    def from_file(cls, path: str) -> "BlackBoxRecorder":
+        """Open a ring file or dump read-only, taking the layout from its header"""
+        with open(path, "rb") as f:
+            header = cls._read_header(f.read(cls.HEADER_SIZE))
+        if header is None:
+            raise ValueError(f"{path} is not a black box file")
+        ranges, record_size, capacity, _ = header
+        recorder = cls(path, cls.HEADER_SIZE + capacity * record_size, ranges)
+        recorder.capacity = capacity  # 0: dump of an empty window
+        recorder.open(readonly=True)
+        return recorder
+
+    def close(self) -> None:
+        if self._mm is not None:
+            if not self.readonly:
+                self._mm.flush()
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def append(self, blocks: Sequence[bytes]) -> None:
+        """Record one live cycle (blocks in self.ranges order)"""
+        if self._mm is None:
+            if self.failed:
+                return
+            try:
+                self.open()
+            except OSError as e:
+                self.failed = True
+                logger.error(f"Black box disabled - cannot open {self.path}: {e}")
+                return
+        mm = self._mm
+        offset = self.HEADER_SIZE + (self.seq % self.capacity) * self.record_size
+        mm[offset:offset + 8] = b"\0" * 8
+        position = offset + self.RECORD_HEAD.size
+        for block in blocks:
+            end = position + len(block)
+            mm[position:end] = block
+            position = end
+        self.seq += 1
+        self.RECORD_HEAD.pack_into(mm, offset, self.seq, time.monotonic(), time.time())
+        struct.pack_into("<Q", mm, self.HEAD_OFFSET, self.seq)
+
+    # ══════════════════════════════════════════════════════════════════════
+    # READ BACK
+    # ══════════════════════════════════════════════════════════════════════
+
+    @classmethod
+    def _read_header(cls, buffer) -> Optional[Tuple[List[Range], int, int, int]]:
+        if len(buffer) < cls.HEADER_SIZE:
+            return None
+        magic, record_size, capacity, head, n_ranges = cls.HEADER.unpack_from(buffer, 0)
+        if magic != cls.MAGIC:
+            return None
+        ranges = [cls.RANGE.unpack_from(buffer, cls.HEADER.size + i * cls.RANGE.size) for i in range(n_ranges)]
+        return ranges, record_size, capacity, head
+
+    def records(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Tuple[int, float, float, bytes]]:
+        """Yield (seq, monotonic, wall, raw) oldest first, filtered by wall time"""
+        if self._mm is None:
+            return
+        mm, size = self._mm, self.record_size
+        head = self.seq
+        first = max(1, head - self.capacity + 1)
+        if since is not None:
+            first = self._first_at(since, first, head)
+        for seq in range(first, head + 1):
+            offset = self.HEADER_SIZE + ((seq - 1) % self.capacity) * size
+            raw = mm[offset:offset + size]
+            stored, monotonic, wall = self.RECORD_HEAD.unpack_from(raw)
+            if stored != seq or stored != struct.unpack_from("<Q", mm, offset)[0]:
+                continue  # overwritten while copying
+            if since is not None and wall < since:
+                continue
+            if until is not None and wall > until:
+                break
+            yield seq, monotonic, wall, raw[self.RECORD_HEAD.size:]
+
+    def _first_at(self, since: float, low: int, high: int) -> int:
+        """Binary search for the first seq with wall time >= since"""
+        wall_offset = self.RECORD_HEAD.size - 8
+        while low < high:
+            middle = (low + high) // 2
+            offset = self.HEADER_SIZE + ((middle - 1) % self.capacity) * self.record_size
+            if struct.unpack_from("<d", self._mm, offset + wall_offset)[0] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def dump(self, since: Optional[float] = None, until: Optional[float] = None) -> bytes:
+        """Records of a time window as a standalone file in the same format
+
+        Records are renumbered from 1, so the dump is itself a full ring
+        that from_file() can read back (header only, capacity 0, when no
+        record falls in the window).
+        """
+        records = [self.RECORD_HEAD.pack(index, monotonic, wall) + raw
+                   for index, (_, monotonic, wall, raw) in enumerate(self.records(since, until), 1)]
+        header = bytearray(self.HEADER_SIZE)
+        self.HEADER.pack_into(header, 0, self.MAGIC, self.record_size, len(records), len(records), len(self.ranges))
+        for index, read_range in enumerate(self.ranges):
+            self.RANGE.pack_into(header, self.HEADER.size + index * self.RANGE.size, *read_range)
+        return bytes(header) + b"".join(records)
+
+    def decode(self, raw: bytes, tags: TagMap = TAGS) -> Dict[str, Any]:
+        """Decode one record's raw blocks into tag values (full keys)"""
+        values: Dict[str, Any] = {}
+        position = 0
+        for db, start, size in self.ranges:
+            keys = tuple(t.key for t in tags.block_tags(db) if start <= t.offset and t.end <= start + size)
+            if keys:
+                values.update(tags.decoder(keys, full_keys=True).decode(raw[position:position + size], start))
+            position += size
+        return values
+
+    def get_stats(self) -> Dict[str, Any]:
+        oldest = next(self.records(), None)
+        return {
+            "path": self.path,
+            "open": self.is_open,
+            "records": min(self.seq, self.capacity),
+            "capacity": self.capacity,
+            "record_bytes": self.record_size,
+            "oldest": oldest[2] if oldest else None,
+            "newest_seq": self.seq,
+        }
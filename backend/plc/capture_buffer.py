@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+Sample = Tuple[float, float, float, float]  # timestamp, force, deflection, position
+
+
+class CaptureBuffer:
+    """Columnar test curve: one array('d') per column instead of a dict per sample
+
+    A sample costs 32 bytes (vs. ~400 for a dict of four boxed floats);
+    appends are amortized O(1) (array over-allocates like list).
+    columns() exposes the arrays themselves, rows() iterates samples for
+    the database writer.
+
+    Above `max_memory` bytes the in-memory columns are spilled to a temp
+    file as one record and cleared, so a very long test keeps a bounded
+    footprint. Spilled records are read back in order by rows() / columns().
+
+    With `journal` (a path) the file is durable instead: checkpoint()
+    appends the samples captured since the last checkpoint and fsyncs, and
+    record() journals test context (parameters, completion results), so a
+    crash or power cut loses at most one checkpoint interval. A journal
+    outlives the process until close(); open_journal() reads it back.
+
+    File layout: MAGIC + version, then records - kind, sample count or
+    JSON length, crc32 of the body - with the raw columns (SAMPLES) or a
+    JSON object (CONTEXT) as body. Reading stops at a torn or corrupt record.
+    One writer: the capturing task appends and awaits the checkpoints.
+    """
+
+    COLUMNS = ("timestamp", "force", "deflection", "position")
+    SAMPLE_BYTES = 8 * len(COLUMNS)
+    MAGIC = b"GRPJ"
+    VERSION = 1
+    HEADER = struct.Struct("<4sB")  # magic, version
+    RECORD = struct.Struct("<BII")  # kind, samples / JSON bytes, crc32 of the body
+    SAMPLES = 1
+    CONTEXT = 2
+
+    def __init__(self, max_memory: int = settings.CAPTURE_MAX_MEMORY_MB * 1024 * 1024,
+                 journal: Optional[str] = None, context: Optional[Dict[str, Any]] = None):
+        self.max_samples = max(1, max_memory // self.SAMPLE_BYTES)
+        self._columns: Tuple[array, ...] = tuple(array("d") for _ in self.COLUMNS)
+        self._file = None   # spill file or journal
+        self.journal = journal  # durable journal path (None: spill to an anonymous temp file)
+        self.context: Dict[str, Any] = {}
+        self.spilled = 0    # samples in the file
+        self.frozen = False
+        self.checkpoint_samples = settings.CAPTURE_CHECKPOINT_SAMPLES
+        self.checkpoint_interval = settings.CAPTURE_CHECKPOINT_INTERVAL
+        self.checkpoints = 0
+        self.checkpointed_at = time.monotonic()
+        self.resume_after: Optional[float] = None  # extend() skips samples up to this timestamp
+        if journal is not None:
+            os.makedirs(os.path.dirname(journal) or ".", exist_ok=True)
+            self._file = open(journal, "xb")
+            self._file.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+            self.record(context or {})
+
+    def __len__(self) -> int:
+        return self.spilled + len(self._columns[0])
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def append(self, timestamp: float, force: float, deflection: float, position: float) -> None:
+        if self.frozen:
+            raise RuntimeError("CaptureBuffer is frozen")
+        t, f, d, p = self._columns
+        t.append(timestamp)
+        f.append(force)
+        d.append(deflection)
+        p.append(position)
+        if len(t) >= self.max_samples:
+            self._spill_columns()
+
+    def extend(self, samples: Iterable[Sample]) -> int:
+        """Append (timestamp, force, deflection, position) rows, returns the count"""
+        count = 0
+        after = self.resume_after
+        for sample in samples:
+            if after is not None and sample[0] <= after:
+                continue  # journaled before a restart, still in the PLC ring
+            self.append(*sample)
+            count += 1
+        return count
+
+    def freeze(self) -> "CaptureBuffer":
+        """No more appends: the buffer is handed over (persistence, charts)"""
+        self.frozen = True
+        return self
+
+    # ══════════════════════════════════════════════════════════════════════
+    # READ
+    # ══════════════════════════════════════════════════════════════════════
+
+    def columns(self) -> Dict[str, array]:
+        """Column arrays. Zero-copy unless part of the capture was spilled."""
+        if not self.spilled:
+            return dict(zip(self.COLUMNS, self._columns))
+        merged = tuple(array("d") for _ in self.COLUMNS)
+        for chunk in self._chunks():
+            for out, column in zip(merged, chunk):
+                out.extend(column)
+        return dict(zip(self.COLUMNS, merged))
+
+    def rows(self) -> Iterator[Sample]:
+        """Samples in capture order (spilled records first)"""
+        for chunk in self._chunks():
+            yield from zip(*chunk)
+
+    def max(self, column: str, default: float = 0.0) -> float:
+        index = self.COLUMNS.index(column)
+        return max((max(chunk[index]) for chunk in self._chunks()), default=default)
+
+    def nbytes(self) -> int:
+        """Bytes held in memory (the arrays' over-allocation not included)"""
+        return len(self._columns[0]) * self.SAMPLE_BYTES
+
+    def _chunks(self) -> Iterator[Tuple[array, ...]]:
+        if self._file is not None and self.spilled:
+            self._file.flush()
+            with open(self._file.name, "rb") as f:
+                f.seek(self.HEADER.size)
+                for kind, count, body in self._records(f):
+                    if kind == self.SAMPLES:
+                        yield self._split(count, body)
+        if len(self._columns[0]):
+            yield self._columns
+
+    @classmethod
+    def _split(cls, count: int, body: bytes) -> Tuple[array, ...]:
+        span = count * 8
+        view = memoryview(body)
+        chunk = []
+        for index in range(len(cls.COLUMNS)):
+            column = array("d")
+            column.frombytes(view[index * span:(index + 1) * span])
+            chunk.append(column)
+        return tuple(chunk)
+
+    @classmethod
+    def _records(cls, f) -> Iterator[Tuple[int, int, bytes]]:
+        """(kind, size, body) of each intact record, stops at a torn or corrupt one"""
+        while True:
+            head = f.read(cls.RECORD.size)
+            if len(head) < cls.RECORD.size:
+                return
+            kind, size, crc = cls.RECORD.unpack(head)
+            length = size * cls.SAMPLE_BYTES if kind == cls.SAMPLES else size
+            body = f.read(length)
+            if len(body) < length or zlib.crc32(body) != crc:
+                return
+            yield kind, size, body
+
+    # ══════════════════════════════════════════════════════════════════════
+    # SPILL / JOURNAL
+    # ══════════════════════════════════════════════════════════════════════
+
+    def _spill_columns(self, sync: bool = False) -> int:
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile(prefix="capture_", suffix=".bin", delete=False)
+            self._file.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+            logger.info(f"Test capture above {self.max_samples} samples, spilling to {self._file.name}")
+        count = len(self._columns[0])
+        if count:
+            self._write(self.SAMPLES, count, self._columns)
+            self.spilled += count
+            self._columns = tuple(array("d") for _ in self.COLUMNS)
+        if sync:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return count
+
+    def _write(self, kind: int, size: int, parts) -> None:
+        crc = 0
+        for part in parts:
+            crc = zlib.crc32(part, crc)
+        offset = self._file.tell()
+        try:
+            self._file.write(self.RECORD.pack(kind, size, crc))
+            for part in parts:
+                self._file.write(part)
+            self._file.flush()
+        except OSError:
+            # No half record in front of the next one
+            try:
+                self._file.seek(offset)
+                self._file.truncate()
+            except OSError:
+                pass
+            raise
+
+    def checkpoint_due(self) -> bool:
+        pending = len(self._columns[0])
+        return self.journal is not None and pending > 0 and (
+            pending >= self.checkpoint_samples
+            or time.monotonic() - self.checkpointed_at >= self.checkpoint_interval
+        )
+
+    def checkpoint(self) -> int:
+        """Journal the samples captured since the last checkpoint (fsynced), returns their count"""
+        if self.journal is None or self._file is None:
+            return 0
+        count = self._spill_columns(sync=True)
+        self.checkpoints += 1
+        self.checkpointed_at = time.monotonic()
+        return count
+
+    async def acheckpoint(self) -> int:
+        """checkpoint() on a worker thread (the caller is the only writer and awaits it)"""
+        return await asyncio.to_thread(self.checkpoint)
+
+    def record(self, values: Dict[str, Any]) -> None:
+        """Merge `values` into the context; journaled after the samples so far (fsynced)"""
+        self.context.update(values)
+        if self.journal is None or self._file is None:
+            return
+        body = json.dumps(values, default=str).encode()
+        self._spill_columns()
+        self._write(self.CONTEXT, len(body), (body,))
+        os.fsync(self._file.fileno())
+        self.checkpointed_at = time.monotonic()
+
+    async def arecord(self, values: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.record, values)
+
+    @classmethod
+    def open_journal(cls, path: str) -> "CaptureBuffer":
+        """Reopen the journal of a previous run: samples on disk, context restored
+
+        A torn or corrupt tail (power cut during a write) is cut off.
+        """
+        buffer = cls()
+        buffer.journal = path
+        last = None
+        with open(path, "rb") as f:
+            head = f.read(cls.HEADER.size)
+            if len(head) < cls.HEADER.size or cls.HEADER.unpack(head) != (cls.MAGIC, cls.VERSION):
+                raise ValueError(f"{path} is not a capture journal")
+            end = f.tell()
+            for kind, size, body in cls._records(f):
+                if kind == cls.SAMPLES:
+                    buffer.spilled += size
+                    last = cls._split(size, body)[0][-1]
+                else:
+                    buffer.context.update(json.loads(body))
+                end = f.tell()
+            torn = f.seek(0, os.SEEK_END) - end
+        if torn:
+            logger.warning(f"Capture journal {path}: {torn} bytes of a torn record cut off")
+            os.truncate(path, end)
+        buffer._file = open(path, "ab")
+        buffer.resume_after = last
+        return buffer
+
+    def release(self) -> None:
+        """Journal the remaining samples and close, keeping the journal (recovered at the next start)"""
+        if self.journal is None:
+            self.close()
+            return
+        if self._file is not None:
+            self._spill_columns(sync=True)
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        """Drop the spill file / journal (the in-memory part stays readable)"""
+        f, self._file = self._file, None
+        if f is not None:
+            f.close()
+        path = f.name if f is not None else self.journal
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        self.spilled = 0
+
+    def __del__(self):
+        if self.journal is None:
+            self.close()
+        elif self._file is not None:
+            self._file.close()  # a journal stays for recovery
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self),
+            "in_memory": len(self._columns[0]),
+            "spilled": self.spilled,
+            "memory_kb": round(self.nbytes() / 1024, 1),
+            "journal": self.journal,
+            "checkpoints": self.checkpoints,
+        }
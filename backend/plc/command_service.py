@@ -1,6 +1,12 @@
+import asyncio
 import time
 import logging
+from typing import Any, Dict, Optional, Sequence, Tuple
 from .connector import PLCConnector
+from .live_bus import LiveBus
+from .tags import TAGS, DB_RESULTS, DB_SERVO, DB_HMI
+from .read_planner import ReadPlanner
+from .scheduler import Priority, prioritized
 
 logger = logging.getLogger(__name__)
 
@@ -17,61 +23,68 @@ class CommandService:
     HMI commands (tare, zero position) → DB4
     """
 
-    DB_RESULTS = 2   # DB2 - Test Results
-    DB_SERVO = 3     # DB3 - Servo Control
-    DB_HMI = 4       # DB4 - HMI Interface
+    DB_RESULTS = DB_RESULTS   # DB2 - Test Results
+    DB_SERVO = DB_SERVO       # DB3 - Servo Control
+    DB_HMI = DB_HMI           # DB4 - HMI Interface
+
+    # Addresses come from the shared tag map (plc/tags.py)
 
-    # ═══════════════════════════════════════════════════════════════════
     # DB3 - SERVO COMMANDS (Byte 0) - PLC reads these for motion
-    # ═══════════════════════════════════════════════════════════════════
-    CMD_ENABLE = (0, 0)            # DB3.DBX0.0 - Enable Servo
-    CMD_JOG_FORWARD = (0, 1)       # DB3.DBX0.1 - Jog Forward (down)
-    CMD_JOG_BACKWARD = (0, 2)      # DB3.DBX0.2 - Jog Backward (up)
-    CMD_START_TEST = (0, 3)        # DB3.DBX0.3 - Start Test
-    CMD_STOP = (0, 4)              # DB3.DBX0.4 - Stop
-    CMD_RESET = (0, 5)             # DB3.DBX0.5 - Reset
-    CMD_HOME = (0, 6)              # DB3.DBX0.6 - Home
-
-    # ═══════════════════════════════════════════════════════════════════
+    CMD_ENABLE = TAGS.bit("servo.enable")                # DB3.DBX0.0
+    CMD_JOG_FORWARD = TAGS.bit("servo.jog_forward")      # DB3.DBX0.1
+    CMD_JOG_BACKWARD = TAGS.bit("servo.jog_backward")    # DB3.DBX0.2
+    CMD_START_TEST = TAGS.bit("servo.start_test")        # DB3.DBX0.3
+    CMD_STOP = TAGS.bit("servo.stop")                    # DB3.DBX0.4
+    CMD_RESET = TAGS.bit("servo.reset")                  # DB3.DBX0.5
+    CMD_HOME = TAGS.bit("servo.home")                    # DB3.DBX0.6
+
     # DB3 - CLAMPS (Byte 14) - Disabled in PLC (always True)
-    # ═══════════════════════════════════════════════════════════════════
-    CMD_LOCK_UPPER = (14, 0)       # DB3.DBX14.0 - Lock Upper Clamp
-    CMD_LOCK_LOWER = (14, 1)       # DB3.DBX14.1 - Lock Lower Clamp
+    CMD_LOCK_UPPER = TAGS.bit("servo.lock_upper")        # DB3.DBX14.0
+    CMD_LOCK_LOWER = TAGS.bit("servo.lock_lower")        # DB3.DBX14.1
 
-    # ═══════════════════════════════════════════════════════════════════
     # DB3 - MODE & STATUS (Byte 25)
-    # ═══════════════════════════════════════════════════════════════════
-    CMD_REMOTE_MODE = (25, 0)      # DB3.DBX25.0 - Remote Mode
-    STATUS_ESTOP = (25, 1)         # DB3.DBX25.1 - E-Stop Active (Read)
-    STATUS_UPPER_LIMIT = (25, 2)   # DB3.DBX25.2 - Upper Limit (Read)
-    STATUS_LOWER_LIMIT = (25, 3)   # DB3.DBX25.3 - Lower Limit (Read)
-    STATUS_HOME_POS = (25, 4)      # DB3.DBX25.4 - Home Position (Read)
-    STATUS_SAFETY_OK = (25, 5)     # DB3.DBX25.5 - Safety OK (Read)
-    STATUS_MOTION_OK = (25, 6)     # DB3.DBX25.6 - Motion Allowed (Read)
-
-    # ═══════════════════════════════════════════════════════════════════
+    CMD_REMOTE_MODE = TAGS.bit("servo.remote_mode")      # DB3.DBX25.0
+    STATUS_ESTOP = TAGS.bit("servo.estop_active")        # DB3.DBX25.1
+    STATUS_UPPER_LIMIT = TAGS.bit("servo.upper_limit")   # DB3.DBX25.2
+    STATUS_LOWER_LIMIT = TAGS.bit("servo.lower_limit")   # DB3.DBX25.3
+    STATUS_HOME_POS = TAGS.bit("servo.home_position")    # DB3.DBX25.4
+    STATUS_SAFETY_OK = TAGS.bit("servo.safety_ok")       # DB3.DBX25.5
+    STATUS_MOTION_OK = TAGS.bit("servo.motion_allowed")  # DB3.DBX25.6
+
     # DB3 - REAL VALUES
-    # ═══════════════════════════════════════════════════════════════════
-    CMD_JOG_VELOCITY_SETPOINT = 26  # DB3.DBD26 - Jog Speed (Real, mm/min)
-
-    # ═══════════════════════════════════════════════════════════════════
-    # DB3 - STEP MOVEMENT
-    # ═══════════════════════════════════════════════════════════════════
-    STEP_DISTANCE = 32             # DB3.DBD32 - Real
-    STEP_COMMANDS = 36             # DB3.DBB36
-    BIT_STEP_FORWARD = 0           # DB3.DBX36.0
-    BIT_STEP_BACKWARD = 1          # DB3.DBX36.1
-    BIT_STEP_ACTIVE = 2            # DB3.DBX36.2
-    BIT_STEP_DONE = 3              # DB3.DBX36.3
-
-    # ═══════════════════════════════════════════════════════════════════
-    # DB4 - HMI COMMANDS (tare/zero only)
-    # ═══════════════════════════════════════════════════════════════════
-    TARE_LOADCELL = (59, 6)        # DB4.DBX59.6 - Tare_LoadCell
-    HMI_TARE_POSITION = (59, 7)    # DB4.DBX59.7 - Zero position
+    CMD_JOG_VELOCITY_SETPOINT = TAGS.offset("servo.jog_velocity_sp")  # DB3.DBD26
 
-    def __init__(self, plc: PLCConnector):
-        self.plc = plc
+    # DB3 - STEP MOVEMENT (Byte 36)
+    STEP_DISTANCE = TAGS.offset("servo.step_distance")   # DB3.DBD32
+    STEP_COMMANDS = TAGS.offset("servo.step_forward")    # DB3.DBB36
+    BIT_STEP_FORWARD = TAGS["servo.step_forward"].bit    # DB3.DBX36.0
+    BIT_STEP_BACKWARD = TAGS["servo.step_backward"].bit  # DB3.DBX36.1
+    BIT_STEP_ACTIVE = TAGS["servo.step_active"].bit      # DB3.DBX36.2
+    BIT_STEP_DONE = TAGS["servo.step_done"].bit          # DB3.DBX36.3
+
+    # DB4 - HMI COMMANDS (tare/zero only)
+    TARE_LOADCELL = TAGS.bit("hmi.tare_loadcell")        # DB4.DBX59.6
+    HMI_TARE_POSITION = TAGS.bit("hmi.tare_position")    # DB4.DBX59.7
+
+    # Multi-field status reads (one coalesced block read each)
+    SAFETY_TAGS = (
+        "servo.estop_active", "servo.upper_limit", "servo.lower_limit",
+        "servo.home_position", "servo.safety_ok", "servo.motion_allowed",
+    )
+    STEP_TAGS = ("servo.step_distance", "servo.step_active", "servo.step_done")
+
+    def __init__(self, plc: PLCConnector, live_bus: Optional[LiveBus] = None):
+        # Commands use the dedicated command link (plc itself if disabled)
+        self.plc = plc.commands
+        self.reader = ReadPlanner(self.plc)
+        self.live_bus = live_bus
+
+    def _snapshot(self) -> Optional[Dict[str, Any]]:
+        """Live bus data if fresh and read after our last write, else None"""
+        snapshot = self.live_bus.fresh() if self.live_bus is not None else None
+        if snapshot is None or snapshot.read_at <= self.plc.last_write or not snapshot.data["connected"]:
+            return None
+        return snapshot.data
 
     def _check_connection(self) -> bool:
         """Check PLC connection before command"""
@@ -82,14 +95,23 @@ class CommandService:
 
     def _check_remote_mode(self) -> bool:
         """Check if system is in REMOTE mode"""
+        live = self._snapshot()
+        if live is not None:
+            return live["mode"]["remote"]
         return self.plc.read_bool(self.DB_SERVO, *self.CMD_REMOTE_MODE) or False
 
     def _check_safety_ok(self) -> bool:
         """Check if safety is OK"""
+        live = self._snapshot()
+        if live is not None:
+            return live["safety"]["ok"]
         return self.plc.read_bool(self.DB_SERVO, *self.STATUS_SAFETY_OK) or False
 
     def _check_motion_allowed(self) -> bool:
         """Check if motion is allowed"""
+        live = self._snapshot()
+        if live is not None:
+            return live["safety"]["motion_allowed"]
         return self.plc.read_bool(self.DB_SERVO, *self.STATUS_MOTION_OK) or False
 
     # ========== TARE / ZERO Commands (DB4) ==========
@@ -133,6 +155,7 @@ class CommandService:
         logger.info(f"Servo enable (DB3.DBX0.0=True) -> {result}")
         return result
 
+    @prioritized(Priority.SAFETY)
     def disable_servo(self) -> bool:
         """Disable servo - DB3.DBX0.0"""
         if not self._check_connection():
@@ -162,9 +185,11 @@ class CommandService:
             return {"success": False, "reason": "LOCAL_MODE", "message": "Jog disabled - LOCAL mode"}
         if state and not self._check_motion_allowed():
             return {"success": False, "reason": "MOTION_BLOCKED", "message": "Motion not allowed"}
+        # Interlock: clear the opposite direction in the same byte write
+        bits = [(*self.CMD_JOG_FORWARD, state)]
         if state:
-            self.plc.write_bool(self.DB_SERVO, *self.CMD_JOG_BACKWARD, False)
-        result = self.plc.write_bool(self.DB_SERVO, *self.CMD_JOG_FORWARD, state)
+            bits.insert(0, (*self.CMD_JOG_BACKWARD, False))
+        result = self.plc.write_bits(self.DB_SERVO, bits)
         logger.info(f"Jog forward: {state} (DB3.DBX0.1)")
         return {"success": result}
 
@@ -176,12 +201,24 @@ class CommandService:
             return {"success": False, "reason": "LOCAL_MODE", "message": "Jog disabled - LOCAL mode"}
         if state and not self._check_motion_allowed():
             return {"success": False, "reason": "MOTION_BLOCKED", "message": "Motion not allowed"}
+        # Interlock: clear the opposite direction in the same byte write
+        bits = [(*self.CMD_JOG_BACKWARD, state)]
         if state:
-            self.plc.write_bool(self.DB_SERVO, *self.CMD_JOG_FORWARD, False)
-        result = self.plc.write_bool(self.DB_SERVO, *self.CMD_JOG_BACKWARD, state)
+            bits.insert(0, (*self.CMD_JOG_FORWARD, False))
+        result = self.plc.write_bits(self.DB_SERVO, bits)
         logger.info(f"Jog backward: {state} (DB3.DBX0.2)")
         return {"success": result}
 
+    async def ajog_forward(self, state: bool) -> dict:
+        """jog_forward() executed on the PLC I/O thread (release is a safety request)"""
+        level = Priority.COMMAND if state else Priority.SAFETY
+        return await self.plc.run("jog_forward", self.jog_forward, state, level=level)
+
+    async def ajog_backward(self, state: bool) -> dict:
+        """jog_backward() executed on the PLC I/O thread (release is a safety request)"""
+        level = Priority.COMMAND if state else Priority.SAFETY
+        return await self.plc.run("jog_backward", self.jog_backward, state, level=level)
+
     def set_jog_velocity(self, velocity: float) -> bool:
         """Set jog speed - DB3.DBD26 (mm/min)"""
         if not self._check_connection():
@@ -191,16 +228,26 @@ class CommandService:
         logger.info(f"Jog velocity: {velocity} mm/min (DB3.DBD26)")
         return result
 
+    @prioritized(Priority.SAFETY)
     def stop_all_jog(self) -> bool:
         """Stop all jog"""
         if not self._check_connection():
             return False
-        success = True
-        success &= self.plc.write_bool(self.DB_SERVO, *self.CMD_JOG_FORWARD, False)
-        success &= self.plc.write_bool(self.DB_SERVO, *self.CMD_JOG_BACKWARD, False)
+        success = self.plc.write_bits(self.DB_SERVO, [
+            (*self.CMD_JOG_FORWARD, False),
+            (*self.CMD_JOG_BACKWARD, False),
+        ])
         logger.info("All jog stopped")
         return success
 
+    async def astop_all_jog(self) -> bool:
+        """stop_all_jog() executed on the PLC I/O thread"""
+        return await self.plc.run("stop_all_jog", self.stop_all_jog, level=Priority.SAFETY)
+
+    async def aset_jog_velocity(self, velocity: float) -> bool:
+        """set_jog_velocity() executed on the PLC I/O thread"""
+        return await self.plc.run("set_jog_velocity", self.set_jog_velocity, velocity, level=Priority.COMMAND)
+
     # ========== Clamp Control (DB3) - Note: FC_Clamps disabled, always locked ==========
 
     def lock_upper(self) -> bool:
@@ -242,12 +289,17 @@ class CommandService:
         logger.info(f"Test start (DB3.DBX0.3=True) -> {result}")
         return {"success": result, "message": "Test started" if result else "Failed to start"}
 
+    @prioritized(Priority.SAFETY)
     def stop(self) -> bool:
         """Stop - DB3.DBX0.4 (pulse)"""
         if not self._check_connection():
             return False
-        self.stop_all_jog()
-        self.plc.write_bool(self.DB_SERVO, *self.CMD_STOP, True)
+        # Jog off + stop pulse high in one byte write
+        self.plc.write_bits(self.DB_SERVO, [
+            (*self.CMD_JOG_FORWARD, False),
+            (*self.CMD_JOG_BACKWARD, False),
+            (*self.CMD_STOP, True),
+        ])
         time.sleep(0.1)
         result = self.plc.write_bool(self.DB_SERVO, *self.CMD_STOP, False)
         logger.warning(f"STOP (DB3.DBX0.4 pulse) -> {result}")
@@ -278,6 +330,9 @@ class CommandService:
         """Get remote mode - DB3.DBX25.0"""
         if not self.plc.connected:
             return False
+        live = self._snapshot()
+        if live is not None:
+            return live["mode"]["remote"]
         return self.plc.read_bool(self.DB_SERVO, *self.CMD_REMOTE_MODE) or False
 
     # ========== Safety Status (Read Only) ==========
@@ -288,13 +343,25 @@ class CommandService:
                 "e_stop": False, "upper_limit": False, "lower_limit": False,
                 "home": False, "safety_ok": False, "motion_allowed": False
             }
+        live = self._snapshot()
+        if live is not None:
+            safety = live["safety"]
+            return {
+                "e_stop": safety["e_stop"],
+                "upper_limit": safety["upper_limit"],
+                "lower_limit": safety["lower_limit"],
+                "home": safety["home"],
+                "safety_ok": safety["ok"],
+                "motion_allowed": safety["motion_allowed"],
+            }
+        v = self.reader.read(self.SAFETY_TAGS) or {}
         return {
-            "e_stop": self.plc.read_bool(self.DB_SERVO, *self.STATUS_ESTOP) or False,
-            "upper_limit": self.plc.read_bool(self.DB_SERVO, *self.STATUS_UPPER_LIMIT) or False,
-            "lower_limit": self.plc.read_bool(self.DB_SERVO, *self.STATUS_LOWER_LIMIT) or False,
-            "home": self.plc.read_bool(self.DB_SERVO, *self.STATUS_HOME_POS) or False,
-            "safety_ok": self.plc.read_bool(self.DB_SERVO, *self.STATUS_SAFETY_OK) or False,
-            "motion_allowed": self.plc.read_bool(self.DB_SERVO, *self.STATUS_MOTION_OK) or False,
+            "e_stop": v.get("servo.estop_active", False),
+            "upper_limit": v.get("servo.upper_limit", False),
+            "lower_limit": v.get("servo.lower_limit", False),
+            "home": v.get("servo.home_position", False),
+            "safety_ok": v.get("servo.safety_ok", False),
+            "motion_allowed": v.get("servo.motion_allowed", False),
         }
 
     # ========== Step Movement ==========
@@ -338,8 +405,117 @@ class CommandService:
     def get_step_status(self) -> dict:
         if not self.plc.connected:
             return {"distance": 0.0, "active": False, "done": False}
+        live = self._snapshot()
+        if live is not None:
+            step = live["step"]
+            return {"distance": step["distance"] or 0.0, "active": step["active"], "done": step["done"]}
+        v = self.reader.read(self.STEP_TAGS) or {}
         return {
-            "distance": self.plc.read_real(self.DB_SERVO, self.STEP_DISTANCE) or 0.0,
-            "active": self.plc.read_bool(self.DB_SERVO, self.STEP_COMMANDS, self.BIT_STEP_ACTIVE) or False,
-            "done": self.plc.read_bool(self.DB_SERVO, self.STEP_COMMANDS, self.BIT_STEP_DONE) or False,
+            "distance": v.get("servo.step_distance") or 0.0,
+            "active": v.get("servo.step_active", False),
+            "done": v.get("servo.step_done", False),
         }
+
+    # ══════════════════════════════════════════════════════════════════════
+    # ASYNC API - for the event loop (REST routes, socket handlers)
+    # ══════════════════════════════════════════════════════════════════════
+    # Each command runs on the PLC I/O thread at its priority class; pulse
+    # widths are awaited on the loop, so no request blocks it.
+
+    async def _apulse(self, op: str, db_number: int, address: Tuple[int, int], width: float,
+                      level: Priority = Priority.COMMAND, clear: Sequence[Tuple[int, int]] = ()) -> bool:
+        """Command bit high for `width` s, then low. `clear` bits of the same
+        byte are written False together with the rising edge."""
+        bits = [(*bit, False) for bit in clear] + [(*address, True)]
+        await self.plc.run(op, self.plc.write_bits, db_number, bits, level=level)
+        try:
+            await asyncio.sleep(width)
+        finally:
+            # Falling edge even if the request is cancelled mid-pulse
+            result = await self.plc.run(op, self.plc.write_bool, db_number, *address, False, level=level)
+        return result
+
+    async def atare_loadcell(self) -> dict:
+        """tare_loadcell() with the pulse awaited"""
+        if not self._check_connection():
+            return {"success": False, "message": "PLC not connected"}
+        try:
+            await self._apulse("tare_loadcell", self.DB_HMI, self.TARE_LOADCELL, 0.1)
+            logger.info("Tare command sent (DB4.DBX59.6)")
+            return {"success": True, "message": "Tare command sent"}
+        except Exception as e:
+            logger.error(f"Tare error: {e}")
+            return {"success": False, "message": str(e)}
+
+    async def azero_position(self) -> dict:
+        """zero_position() with the pulse awaited"""
+        if not self._check_connection():
+            return {"success": False, "message": "PLC not connected"}
+        try:
+            await self._apulse("zero_position", self.DB_HMI, self.HMI_TARE_POSITION, 0.1)
+            logger.info("Position zero sent (DB4.DBX59.7)")
+            return {"success": True, "message": "Position zeroed"}
+        except Exception as e:
+            logger.error(f"Zero position error: {e}")
+            return {"success": False, "message": str(e)}
+
+    async def astop(self) -> bool:
+        """stop() at SAFETY priority, jog off + stop pulse high in one byte write"""
+        if not self._check_connection():
+            return False
+        result = await self._apulse(
+            "stop", self.DB_SERVO, self.CMD_STOP, 0.1, level=Priority.SAFETY,
+            clear=(self.CMD_JOG_FORWARD, self.CMD_JOG_BACKWARD),
+        )
+        logger.warning(f"STOP (DB3.DBX0.4 pulse) -> {result}")
+        return result
+
+    async def areset_alarm(self) -> bool:
+        """reset_alarm() with the pulse awaited"""
+        if not self._check_connection():
+            return False
+        result = await self._apulse("reset_alarm", self.DB_SERVO, self.CMD_RESET, 0.5)
+        logger.info(f"Alarm reset (DB3.DBX0.5 pulse) -> {result}")
+        return result
+
+    async def aenable_servo(self) -> bool:
+        return await self.plc.run("enable_servo", self.enable_servo, level=Priority.COMMAND)
+
+    async def adisable_servo(self) -> bool:
+        return await self.plc.run("disable_servo", self.disable_servo, level=Priority.SAFETY)
+
+    async def astart_test(self) -> dict:
+        return await self.plc.run("start_test", self.start_test, level=Priority.COMMAND)
+
+    async def ahome(self) -> dict:
+        return await self.plc.run("home", self.home, level=Priority.COMMAND)
+
+    async def alock_upper(self) -> bool:
+        return await self.plc.run("lock_upper", self.lock_upper, level=Priority.COMMAND)
+
+    async def alock_lower(self) -> bool:
+        return await self.plc.run("lock_lower", self.lock_lower, level=Priority.COMMAND)
+
+    async def aunlock_all(self) -> bool:
+        return await self.plc.run("unlock_all", self.unlock_all, level=Priority.COMMAND)
+
+    async def aset_remote_mode(self, is_remote: bool) -> dict:
+        return await self.plc.run("set_remote_mode", self.set_remote_mode, is_remote, level=Priority.COMMAND)
+
+    async def aget_remote_mode(self) -> bool:
+        return await self.plc.run("get_remote_mode", self.get_remote_mode, level=Priority.COMMAND)
+
+    async def aget_safety_status(self) -> dict:
+        return await self.plc.run("get_safety_status", self.get_safety_status, level=Priority.COMMAND)
+
+    async def aset_step_distance(self, distance: float) -> dict:
+        return await self.plc.run("set_step_distance", self.set_step_distance, distance, level=Priority.COMMAND)
+
+    async def astep_forward(self) -> dict:
+        return await self.plc.run("step_forward", self.step_forward, level=Priority.COMMAND)
+
+    async def astep_backward(self) -> dict:
+        return await self.plc.run("step_backward", self.step_backward, level=Priority.COMMAND)
+
+    async def aget_step_status(self) -> dict:
+        return await self.plc.run("get_step_status", self.get_step_status, level=Priority.COMMAND)
@@ -1,10 +1,16 @@
 import snap7
 from snap7.client import Area as Areas
+from snap7.type import Parameter
 from snap7.util import get_real, set_real, get_int, get_bool, set_bool
-import threading
 import logging
-from typing import Optional
+import socket
+import time
+from typing import Optional, Any, Callable, Dict, List, Tuple
 from config import settings
+from .io_engine import PLCIOEngine, LatencyStats
+from .tags import Tag, REAL, INT, COMMAND_BYTES, PULSE_BITS
+from .process_image import ShadowImage
+from .scheduler import Priority, PriorityLock
 
 logger = logging.getLogger(__name__)
 
@@ -17,70 +23,145 @@ class PLCConnector:
     CPU_STATE_STOP = 0x04
     CPU_STATE_UNKNOWN = 0x00
 
+    # S7 ReadVar framing (bytes) - used to split multi-var reads on PDU size
+    DEFAULT_PDU_LENGTH = 240       # S7-1200 default negotiated PDU
+    MAX_MULTI_VARS = 20            # S7 protocol limit per ReadVar request
+    MULTI_READ_OVERHEAD = 14       # 12 header + 2 (function + item count)
+    MULTI_READ_REQ_ITEM = 12       # address spec per item in request
+    MULTI_READ_RES_ITEM = 4        # data item header per item in reply
+
+    # Error texts that mean the link itself is gone (a timed-out or broken
+    # reply leaves the ISO stream out of sync, so those count as well)
+    LINK_ERROR_MARKERS = ("socket error", "tcp", "connection", "timeout", "receive error")
+
     def __init__(
         self,
         ip: str = settings.PLC_IP,
         rack: int = settings.PLC_RACK,
         slot: int = settings.PLC_SLOT,
+        port: int = settings.PLC_PORT,
+        name: str = "poll",
+        command_connection: bool = settings.PLC_COMMAND_CONNECTION,
+        shadow: Optional[ShadowImage] = None,
     ):
         self.ip = ip
         self.rack = rack
         self.slot = slot
+        self.port = port
+        self.name = name
         self.client = snap7.client.Client()
         self._connected = False
-        self.lock = threading.Lock()
+        self._pdu_length = self.DEFAULT_PDU_LENGTH
+        self._last_io = 0.0  # time.monotonic() of the last successful PLC request
+        self.last_write = 0.0  # time.monotonic() of the last acknowledged DB write
+        self.lock = PriorityLock()  # granted safety > commands > polling > background
+        self.io = PLCIOEngine(f"plc-{name}")
+        self.shadow = shadow or ShadowImage(COMMAND_BYTES, settings.PLC_SHADOW_MAX_AGE, PULSE_BITS)
+        self.ack_stats = LatencyStats()  # write issue -> PLC write ack (wait = lock wait)
+
+        # Second S7 connection for commands: own client, lock, I/O thread and
+        # reconnect, so jog/stop never queue behind the poller's block reads.
+        # Shares the shadow image, which the poller keeps fresh.
+        if command_connection:
+            self.commands = PLCConnector(ip, rack, slot, port, name="cmd", command_connection=False, shadow=self.shadow)
+        else:
+            self.commands = self
 
     @property
     def connected(self) -> bool:
-        """Check if PLC is connected"""
+        """Cached link health (O(1))
+
+        Set by connect/disconnect, cleared by I/O errors that mean the link
+        is gone, and re-checked by heartbeat() while the link is idle.
+        """
+        return self._connected
+
+    def heartbeat_due(self) -> bool:
+        """True if no I/O succeeded within PLC_HEARTBEAT_INTERVAL"""
+        return self._connected and time.monotonic() - self._last_io > settings.PLC_HEARTBEAT_INTERVAL
+
+    def heartbeat(self) -> bool:
+        """Probe an idle link with one cheap request and refresh the cached state"""
+        if not self._connected:
+            return False
         try:
-            if not self._connected:
-                return False
-            # Actually test the connection
-            is_connected = self.client.get_connected()
-            if not is_connected:
-                self._connected = False
-            return is_connected
-        except Exception:
+            with self.lock:
+                if not self.client.get_connected():
+                    raise ConnectionError("socket closed")
+                self.client.get_cpu_state()
+                self._last_io = time.monotonic()
+            return True
+        except Exception as e:
             self._connected = False
+            logger.warning(f"Heartbeat failed [{self.name}]: {e}")
             return False
 
     def _handle_connection_error(self, error: Exception) -> None:
         """Handle connection errors and mark as disconnected"""
-        error_str = str(error)
-        if "Socket error" in error_str or "TCP" in error_str or "connection" in error_str.lower():
+        error_str = str(error).lower()
+        if any(marker in error_str for marker in self.LINK_ERROR_MARKERS):
             self._connected = False
-            logger.warning(f"Connection lost: {error}")
+            logger.warning(f"Connection lost [{self.name}]: {error}")
 
     def connect(self) -> bool:
-        """Establish connection to PLC"""
+        """Establish connection to PLC (and the command link, if separate)"""
+        connected = self._connect_link()
+        if self.commands is not self:
+            self.commands._connect_link()
+        return connected
+
+    def _connect_link(self) -> bool:
+        """Connect this connector's own snap7 client
+
+        A plain TCP probe bounded by PLC_CONNECT_TIMEOUT runs first, so an
+        unreachable PLC fails fast instead of after the OS connect timeout.
+        Reconnection is driven by the ConnectionSupervisor, off the event loop.
+        """
         try:
             if self.connected:
                 return True
-            # Always disconnect first to reset client state
-            try:
-                self.client.disconnect()
-            except Exception:
-                pass
-            self.client.connect(self.ip, self.rack, self.slot)
-            self._connected = self.client.get_connected()
+            self.shadow.invalidate()
+            socket.create_connection((self.ip, self.port), timeout=settings.PLC_CONNECT_TIMEOUT).close()
+            with self.lock:
+                # Always disconnect first to reset client state
+                try:
+                    self.client.disconnect()
+                except Exception:
+                    pass
+                self.client.connect(self.ip, self.rack, self.slot, self.port)
+                self._apply_timeouts()
+                self._connected = self.client.get_connected()
+                self._last_io = time.monotonic()
             if self._connected:
-                logger.info(f"Connected to PLC at {self.ip}")
+                self._pdu_length = self.client.get_pdu_length() or self.DEFAULT_PDU_LENGTH
+                logger.info(f"Connected to PLC at {self.ip} [{self.name}] (PDU {self._pdu_length} bytes)")
             return self._connected
         except Exception as e:
-            logger.error(f"PLC connection error: {e}")
+            logger.error(f"PLC connection error [{self.name}]: {e}")
             self._connected = False
             return False
 
+    def _apply_timeouts(self) -> None:
+        """Apply PLC_CONNECT_TIMEOUT / PLC_RECV_TIMEOUT to the snap7 client"""
+        self.client.set_param(Parameter.PingTimeout, int(settings.PLC_CONNECT_TIMEOUT * 1000))
+        self.client.set_param(Parameter.RecvTimeout, int(settings.PLC_RECV_TIMEOUT * 1000))
+        # The pure-Python client reads its socket timeout from the connection
+        connection = getattr(self.client, "connection", None)
+        if connection is not None and getattr(connection, "socket", None) is not None:
+            connection.timeout = settings.PLC_RECV_TIMEOUT
+            connection.socket.settimeout(settings.PLC_RECV_TIMEOUT)
+
     def disconnect(self):
-        """Disconnect from PLC"""
+        """Disconnect from PLC (and the command link, if separate)"""
         try:
             if self.client.get_connected():
                 self.client.disconnect()
             self._connected = False
-            logger.info("Disconnected from PLC")
+            logger.info(f"Disconnected from PLC [{self.name}]")
         except Exception as e:
             logger.error(f"PLC disconnect error: {e}")
+        if self.commands is not self:
+            self.commands.disconnect()
 
     def reconnect(self) -> bool:
         """Reconnect to PLC"""
@@ -92,19 +173,22 @@ class PLCConnector:
 
         Returns: 'run' | 'stop' | 'unknown'
         """
-        if not self._connected:
+        if not self.connected:
             return "unknown"
 
         try:
             with self.lock:
                 state = self.client.get_cpu_state()
-                if state == self.CPU_STATE_RUN:
-                    return "run"
-                elif state == self.CPU_STATE_STOP:
-                    return "stop"
-                else:
-                    return "unknown"
+                self._last_io = time.monotonic()
+            # python-snap7 returns "S7CpuStatusRun"/"S7CpuStatusStop"; raw codes kept for older clients
+            if state == self.CPU_STATE_RUN or state == "S7CpuStatusRun":
+                return "run"
+            elif state == self.CPU_STATE_STOP or state == "S7CpuStatusStop":
+                return "stop"
+            else:
+                return "unknown"
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error reading CPU state: {e}")
             return "unknown"
 
@@ -115,8 +199,10 @@ class PLCConnector:
         try:
             with self.lock:
                 data = self.client.db_read(db_number, offset, 4)
+                self._last_io = time.monotonic()
                 return get_real(data, 0)
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error reading Real from DB{db_number}.{offset}: {e}")
             return None
 
@@ -125,12 +211,17 @@ class PLCConnector:
         if not self.connected:
             return False
         try:
+            requested = time.perf_counter()
             with self.lock:
+                acquired = time.perf_counter()
                 data = bytearray(4)
                 set_real(data, 0, value)
                 self.client.db_write(db_number, offset, data)
+                self.last_write = self._last_io = time.monotonic()
+                self.ack_stats.record(acquired - requested, time.perf_counter() - acquired)
                 return True
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error writing Real to DB{db_number}.{offset}: {e}")
             return False
 
@@ -141,24 +232,63 @@ class PLCConnector:
         try:
             with self.lock:
                 data = self.client.db_read(db_number, byte_offset, 1)
+                self._last_io = time.monotonic()
                 return get_bool(data, 0, bit_offset)
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error reading Bool from DB{db_number}.DBX{byte_offset}.{bit_offset}: {e}")
             return None
 
     def write_bool(self, db_number: int, byte_offset: int, bit_offset: int, value: bool) -> bool:
-        """Write a Bool value to DB"""
+        """Write a Bool value to DB (one round-trip when the byte is shadowed)"""
+        return self.write_bits(db_number, [(byte_offset, bit_offset, value)])
+
+    def write_bits(self, db_number: int, bits: List[Tuple[int, int, bool]]) -> bool:
+        """Apply several Bool changes with one db_write per contiguous byte span
+
+        Args:
+            db_number: Data block number
+            bits: List of (byte_offset, bit_offset, value)
+
+        Base bytes come from the shadow image when fresh, otherwise the span
+        is read first (read-modify-write) to preserve the other bits.
+        Pulse bits of the base are cleared: only those in `bits` are set.
+        """
         if not self.connected:
             return False
+        if not bits:
+            return True
+        offsets = sorted({byte_offset for byte_offset, _, _ in bits})
+        spans: List[List[int]] = []
+        for offset in offsets:
+            if spans and offset == spans[-1][-1] + 1:
+                spans[-1].append(offset)
+            else:
+                spans.append([offset])
         try:
+            requested = time.perf_counter()
             with self.lock:
-                # Read current byte first to preserve other bits
-                data = self.client.db_read(db_number, byte_offset, 1)
-                set_bool(data, 0, bit_offset, value)
-                self.client.db_write(db_number, byte_offset, data)
+                acquired = time.perf_counter()
+                for span in spans:
+                    start = span[0]
+                    base = [self.shadow.get(db_number, offset) for offset in span]
+                    if None in base:
+                        data = self.client.db_read(db_number, start, len(span))
+                        for index, value in enumerate(data):
+                            data[index] = self.shadow.latched(db_number, start + index, value)
+                    else:
+                        data = bytearray(base)
+                    for byte_offset, bit_offset, value in bits:
+                        if start <= byte_offset <= span[-1]:
+                            set_bool(data, byte_offset - start, bit_offset, value)
+                    self.client.db_write(db_number, start, data)
+                    self.shadow.store(db_number, start, data)
+                self.last_write = self._last_io = time.monotonic()
+                self.ack_stats.record(acquired - requested, time.perf_counter() - acquired)
                 return True
         except Exception as e:
-            logger.error(f"Error writing Bool to DB{db_number}.DBX{byte_offset}.{bit_offset}: {e}")
+            self._handle_connection_error(e)
+            logger.error(f"Error writing Bool(s) to DB{db_number} {bits}: {e}")
             return False
 
     def read_int(self, db_number: int, offset: int) -> Optional[int]:
@@ -168,8 +298,10 @@ class PLCConnector:
         try:
             with self.lock:
                 data = self.client.db_read(db_number, offset, 2)
+                self._last_io = time.monotonic()
                 return get_int(data, 0)
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error reading Int from DB{db_number}.{offset}: {e}")
             return None
 
@@ -178,16 +310,37 @@ class PLCConnector:
         if not self.connected:
             return False
         try:
+            requested = time.perf_counter()
             with self.lock:
+                acquired = time.perf_counter()
                 data = bytearray(2)
                 data[0] = (value >> 8) & 0xFF
                 data[1] = value & 0xFF
                 self.client.db_write(db_number, offset, data)
+                self.last_write = self._last_io = time.monotonic()
+                self.ack_stats.record(acquired - requested, time.perf_counter() - acquired)
                 return True
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error writing Int to DB{db_number}.{offset}: {e}")
             return False
 
+    def read_tag(self, tag: Tag) -> Any:
+        """Read a single tag from the tag map (see plc/tags.py)"""
+        if tag.type == REAL:
+            return self.read_real(tag.db, tag.offset)
+        if tag.type == INT:
+            return self.read_int(tag.db, tag.offset)
+        return self.read_bool(tag.db, tag.offset, tag.bit)
+
+    def write_tag(self, tag: Tag, value: Any) -> bool:
+        """Write a single tag from the tag map (see plc/tags.py)"""
+        if tag.type == REAL:
+            return self.write_real(tag.db, tag.offset, float(value))
+        if tag.type == INT:
+            return self.write_int(tag.db, tag.offset, int(value))
+        return self.write_bool(tag.db, tag.offset, tag.bit, bool(value))
+
     # ══════════════════════════════════════════════════════════════════════
     # DIRECT HARDWARE I/O - Read directly from physical inputs (PE Area)
     # No PLC programming needed for these signals!
@@ -208,6 +361,7 @@ class PLCConnector:
         try:
             with self.lock:
                 data = self.client.read_area(Areas.PE, 0, byte_offset, 1)
+                self._last_io = time.monotonic()
                 return get_bool(data, 0, bit)
         except Exception as e:
             self._handle_connection_error(e)
@@ -228,6 +382,7 @@ class PLCConnector:
         try:
             with self.lock:
                 data = self.client.read_area(Areas.PE, 0, byte_offset, 1)
+                self._last_io = time.monotonic()
                 return data[0]
         except Exception as e:
             self._handle_connection_error(e)
@@ -248,6 +403,7 @@ class PLCConnector:
         try:
             with self.lock:
                 data = self.client.read_area(Areas.PE, 0, address, 2)
+                self._last_io = time.monotonic()
                 return get_int(data, 0)
         except Exception as e:
             self._handle_connection_error(e)
@@ -277,6 +433,7 @@ class PLCConnector:
                 data = self.client.read_area(Areas.PA, 0, byte_offset, 1)
                 set_bool(data, 0, bit, value)
                 self.client.write_area(Areas.PA, 0, byte_offset, data)
+                self._last_io = time.monotonic()
                 return True
         except Exception as e:
             self._handle_connection_error(e)
@@ -298,6 +455,7 @@ class PLCConnector:
         try:
             with self.lock:
                 data = self.client.read_area(Areas.PA, 0, byte_offset, 1)
+                self._last_io = time.monotonic()
                 return get_bool(data, 0, bit)
         except Exception as e:
             self._handle_connection_error(e)
@@ -322,13 +480,86 @@ class PLCConnector:
         if not self.connected:
             return None
         try:
+            started = time.monotonic()
             with self.lock:
-                return self.client.db_read(db_number, start, size)
+                data = self.client.db_read(db_number, start, size)
+                self._last_io = time.monotonic()
+            self.shadow.refresh(db_number, start, data, started)
+            return data
         except Exception as e:
             self._handle_connection_error(e)
             logger.error(f"Error reading block from DB{db_number}: {e}")
             return None
 
+    # ══════════════════════════════════════════════════════════════════════
+    # MULTI-VAR READ - Several DB areas in one S7 request (one round-trip)
+    # ══════════════════════════════════════════════════════════════════════
+
+    def _plan_multi_read(self, items: List[Tuple[int, int, int]]) -> List[List[int]]:
+        """Group item indexes into batches that fit the negotiated PDU
+
+        Request budget: 14 + 12*N <= PDU
+        Reply budget:   14 + sum(4 + even(size)) <= PDU
+        """
+        pdu = self._pdu_length
+        batches: List[List[int]] = []
+        current: List[int] = []
+        req_used = res_used = self.MULTI_READ_OVERHEAD
+        for index, (_, _, size) in enumerate(items):
+            req_cost = self.MULTI_READ_REQ_ITEM
+            res_cost = self.MULTI_READ_RES_ITEM + size + (size & 1)
+            if current and (
+                len(current) >= self.MAX_MULTI_VARS
+                or req_used + req_cost > pdu
+                or res_used + res_cost > pdu
+            ):
+                batches.append(current)
+                current = []
+                req_used = res_used = self.MULTI_READ_OVERHEAD
+            current.append(index)
+            req_used += req_cost
+            res_used += res_cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def read_multi_db_blocks(self, items: List[Tuple[int, int, int]]) -> Optional[List[bytearray]]:
+        """Read several DB areas with as few S7 requests as the PDU allows
+
+        Args:
+            items: List of (db_number, start, size)
+
+        Returns:
+            List of bytearrays in the same order as items, or None if error
+        """
+        if not self.connected:
+            return None
+        results: List[Optional[bytearray]] = [None] * len(items)
+        try:
+            started = time.monotonic()
+            with self.lock:
+                for batch in self._plan_multi_read(items):
+                    if len(batch) == 1:
+                        # Single area (or one larger than the PDU) - plain read, snap7 splits it
+                        db_number, start, size = items[batch[0]]
+                        results[batch[0]] = self.client.db_read(db_number, start, size)
+                        continue
+                    request = [
+                        {"area": Areas.DB, "db_number": items[i][0], "start": items[i][1], "size": items[i][2]}
+                        for i in batch
+                    ]
+                    _, data = self.client.read_multi_vars(request)
+                    for i, block in zip(batch, data):
+                        results[i] = bytearray(block)
+                self._last_io = time.monotonic()
+            for (db_number, start, _), data in zip(items, results):
+                self.shadow.refresh(db_number, start, data, started)
+            return results
+        except Exception as e:
+            self._handle_connection_error(e)
+            logger.error(f"Error in multi-var read {items}: {e}")
+            return None
+
     def write_db_block(self, db_number: int, start: int, data: bytearray) -> bool:
         """Write a block of data to DB in one operation
         
@@ -343,10 +574,73 @@ class PLCConnector:
         if not self.connected:
             return False
         try:
+            requested = time.perf_counter()
             with self.lock:
+                acquired = time.perf_counter()
                 self.client.db_write(db_number, start, data)
+                self.last_write = self._last_io = time.monotonic()
+                self.ack_stats.record(acquired - requested, time.perf_counter() - acquired)
                 return True
         except Exception as e:
             self._handle_connection_error(e)
             logger.error(f"Error writing block to DB{db_number}: {e}")
             return False
+
+    # ══════════════════════════════════════════════════════════════════════
+    # ASYNC API - Blocking calls executed on the PLC I/O thread
+    # ══════════════════════════════════════════════════════════════════════
+
+    def start_io(self) -> None:
+        """Start the PLC I/O owner thread(s)"""
+        self.io.start()
+        if self.commands is not self:
+            self.commands.io.start()
+
+    def stop_io(self) -> None:
+        """Stop the PLC I/O owner thread(s)"""
+        self.io.stop()
+        if self.commands is not self:
+            self.commands.io.stop()
+
+    async def run(self, op: str, fn: Callable, *args, level: Optional[Priority] = None, **kwargs) -> Any:
+        """Run any blocking PLC routine on the I/O thread
+
+        Args:
+            level: priority class of the request (defaults to the caller's)
+        """
+        return await self.io.run(op, fn, *args, level=level, **kwargs)
+
+    async def aread_db_block(self, db_number: int, start: int, size: int) -> Optional[bytearray]:
+        return await self.io.run("read_db_block", self.read_db_block, db_number, start, size)
+
+    async def awrite_db_block(self, db_number: int, start: int, data: bytearray) -> bool:
+        return await self.io.run("write_db_block", self.write_db_block, db_number, start, data)
+
+    async def aread_bool(self, db_number: int, byte_offset: int, bit_offset: int) -> Optional[bool]:
+        return await self.io.run("read_bool", self.read_bool, db_number, byte_offset, bit_offset)
+
+    async def awrite_bool(self, db_number: int, byte_offset: int, bit_offset: int, value: bool) -> bool:
+        return await self.io.run("write_bool", self.write_bool, db_number, byte_offset, bit_offset, value)
+
+    async def aread_real(self, db_number: int, offset: int) -> Optional[float]:
+        return await self.io.run("read_real", self.read_real, db_number, offset)
+
+    async def awrite_real(self, db_number: int, offset: int, value: float) -> bool:
+        return await self.io.run("write_real", self.write_real, db_number, offset, value)
+
+    async def aget_cpu_state(self) -> str:
+        return await self.io.run("get_cpu_state", self.get_cpu_state)
+
+    def get_io_stats(self) -> Dict[str, Any]:
+        """Per-call latency stats of the PLC I/O thread(s), write ack latency
+        shadow image hit rate and per-priority scheduling delay / deadline misses"""
+        stats = self.io.get_stats()
+        stats["connected"] = self.connected
+        stats["last_io_age_ms"] = round((time.monotonic() - self._last_io) * 1000) if self._last_io else None
+        stats["scheduler"] = self.lock.get_stats()
+        stats["write_ack"] = self.ack_stats.to_dict()
+        stats["shadow"] = self.shadow.get_stats()
+        if self.commands is not self:
+            stats["command_link"] = self.commands.get_io_stats()
+            stats["command_link"].pop("shadow", None)  # shared with the poll link
+        return stats
@@ -0,0 +1,108 @@
+import logging
+import struct
+import time
+from typing import Any, Dict
+
+from config import settings
+from .capture_buffer import CaptureBuffer
+from .connector import PLCConnector
+from .scheduler import Priority
+from .tags import DB_CURVE
+
+logger = logging.getLogger(__name__)
+
+
+class CurveBuffer:
+    """Drains the PLC-side sample ring (DB5) in block reads
+
+    The PLC logs one sample per recording tick at its own scan rate:
+    sample k goes to slot k % CAPACITY, then DB2.DBW80 (data_point_count)
+    is set to k + 1, wrapping at 32768. Each slot is four REALs:
+    time since recording start (s), force (kN), deflection (mm),
+    position (mm).
+
+    The count read by the live poll is the cursor, so draining needs no
+    extra request to find new samples. The new slots are read as one or
+    two contiguous ranges (two when they wrap around the end of the ring).
+    CAPACITY is a power of two, so slot = k % CAPACITY stays continuous
+    across the 16-bit counter wrap.
+    """
+
+    CAPACITY = 256
+    SAMPLE = struct.Struct(">4f")
+    COUNTER_MASK = 0x7FFF  # DB2.DBW80 is an INT
+
+    def __init__(self, plc: PLCConnector, db_number: int = DB_CURVE,
+                 interval: float = settings.PLC_CURVE_DRAIN_INTERVAL):
+        self.plc = plc
+        self.db_number = db_number
+        self.interval = interval
+        self.cursor = 0
+        self.drained_at = 0.0
+        self.samples = 0
+        self.reads = 0
+        self.lost = 0
+
+    def reset(self) -> None:
+        """Start of a recording: the PLC restarts its count at 0"""
+        self.cursor = 0
+        self.drained_at = time.monotonic()
+
+    def pending(self, count: int) -> int:
+        """Samples logged by the PLC since the last drain"""
+        return (count - self.cursor) & self.COUNTER_MASK
+
+    def due(self, count: int) -> bool:
+        """Drain every `interval`, or earlier once half the ring is filled"""
+        pending = self.pending(count)
+        if not pending:
+            return False
+        return pending >= self.CAPACITY // 2 or time.monotonic() - self.drained_at >= self.interval
+
+    def drain(self, count: int, out: CaptureBuffer) -> int:
+        """Read the samples logged up to `count` into `out` (blocking)
+
+        Returns the number of samples appended.
+        """
+        pending = self.pending(count)
+        if not pending:
+            return 0
+        if pending > self.CAPACITY:
+            # Overwritten before we got to them. The PLC keeps logging while
+            # we read, so the oldest remaining slots are next to go: only the
+            # newer half is taken (e.g. after a restart during a test)
+            keep = self.CAPACITY // 2
+            self.lost += pending - keep
+            logger.warning(f"Curve buffer overrun: {pending - keep} samples lost")
+            pending = keep
+
+        size = self.SAMPLE.size
+        first = (count - pending) % self.CAPACITY
+        head = min(pending, self.CAPACITY - first)
+        items = [(self.db_number, first * size, head * size)]
+        if pending > head:
+            items.append((self.db_number, 0, (pending - head) * size))
+        blocks = self.plc.read_multi_db_blocks(items)
+        if blocks is None:
+            return 0  # cursor unchanged, retried on the next drain
+
+        self.cursor = count
+        self.drained_at = time.monotonic()
+        self.samples += pending
+        self.reads += 1
+        for block in blocks:
+            out.extend(self.SAMPLE.iter_unpack(block))
+        return pending
+
+    async def adrain(self, count: int, out: CaptureBuffer) -> int:
+        """drain() executed on the PLC I/O thread"""
+        return await self.plc.run("drain_curve", self.drain, count, out, level=Priority.POLL)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.CAPACITY,
+            "samples": self.samples,
+            "reads": self.reads,
+            "samples_per_read": round(self.samples / self.reads, 1) if self.reads else 0.0,
+            "lost": self.lost,
+        }
@@ -1,16 +1,18 @@
-import math
-from typing import Dict, Any, Optional
-from snap7.util import get_real, get_int, get_bool
+import os
+import time
+from typing import Dict, Any, List, Optional
+from config import settings
 from .connector import PLCConnector
+from .tags import TAGS, DB_PARAMS, DB_RESULTS, DB_SERVO, DB_HMI
+from .read_planner import ReadPlanner
+from .blackbox import BlackBoxRecorder
+from .curve_buffer import CurveBuffer
+from .live_data import LiveData
+from .sampler import SlowSampler
+from .scheduler import Priority, prioritized
 import logging
 
 logger = logging.getLogger(__name__)
-# Helper to handle NaN values
-def safe_float(val, default=0.0):
-    if val is None or math.isnan(val) or math.isinf(val):
-        return default
-    return val
-
 
 
 class DataService:
@@ -24,212 +26,158 @@ class DataService:
     """
 
     # DB Numbers
-    DB_PARAMS = 1
-    DB_RESULTS = 2
-    DB_SERVO = 3
-    DB_HMI = 4
-
-    # Block sizes for reading
-    DB2_SIZE = 89
-    DB3_SIZE = 37
-    DB4_SIZE = 64
-
-    # ═══════════════════════════════════════════════════════════════════
-    # DB1 - TEST PARAMETERS OFFSETS
-    # ═══════════════════════════════════════════════════════════════════
-    PARAM_PIPE_DIAMETER = 0
-    PARAM_PIPE_LENGTH = 4
-    PARAM_DEFLECTION_PERCENT = 8
-    PARAM_DEFLECTION_TARGET = 12
-    PARAM_TEST_SPEED = 16
-    PARAM_MAX_STROKE = 20
-    PARAM_MAX_FORCE = 24
-    PARAM_PRELOAD_FORCE = 38
-    PARAM_APPROACH_SPEED = 42
-    PARAM_CONTACT_SPEED = 46
-    PARAM_RETURN_SPEED = 50
-    PARAM_TARGET_SN_CLASS = 58   # Int (2 bytes) - Target SN class for pass/fail
-
-    # ═══════════════════════════════════════════════════════════════════
-    # DB2 - TEST RESULTS OFFSETS
-    # ═══════════════════════════════════════════════════════════════════
-    RES_ACTUAL_FORCE = 0
-    RES_ACTUAL_DEFLECTION = 4
-    RES_DEFLECTION_PERCENT = 8
-    RES_FORCE_AT_TARGET = 12
-    RES_RING_STIFFNESS = 16
-    RES_SN_CLASS = 20
-    RES_TEST_STATUS = 22
-    RES_TEST_PASSED = (24, 0)
-    RES_FORCE_FILTERED = 34
-    RES_FORCE_KN = 42
-    RES_LOAD_CELL_RAW = 46
-    RES_LOAD_CELL_ACTUAL = 54
-    RES_TARE_COMMAND = (58, 0)
-    RES_POSITION_RAW = 60
-    RES_POSITION_ACTUAL = 68
-    RES_TEST_STAGE = 72
-    RES_PRELOAD_REACHED = (74, 0)
-    RES_CONTACT_POSITION = 76
-    RES_DATA_POINT_COUNT = 80
-    RES_RECORDING_ACTIVE = (82, 0)
+    DB_PARAMS = DB_PARAMS
+    DB_RESULTS = DB_RESULTS
+    DB_SERVO = DB_SERVO
+    DB_HMI = DB_HMI
 
-    # ═══════════════════════════════════════════════════════════════════
-    # DB3 - SERVO CONTROL OFFSETS
-    # ═══════════════════════════════════════════════════════════════════
-    STATUS_ENABLE = (0, 0)
-    STATUS_SERVO_READY = (0, 7)
-    STATUS_SERVO_ERROR = (1, 0)
-    STATUS_AT_HOME = (1, 1)
-    VAL_ACTUAL_POSITION = 2
-    VAL_ACTUAL_SPEED = 10
-    STATUS_LOCK_UPPER = (14, 0)
-    STATUS_LOCK_LOWER = (14, 1)
-    STATUS_MC_POWER = (20, 0)
-    STATUS_MC_BUSY = (20, 1)
-    STATUS_MC_ERROR = (20, 2)
-    STATUS_REMOTE_MODE = (25, 0)
-    STATUS_ESTOP_ACTIVE = (25, 1)
-    STATUS_UPPER_LIMIT = (25, 2)
-    STATUS_LOWER_LIMIT = (25, 3)
-    STATUS_HOME_POSITION = (25, 4)
-    STATUS_SAFETY_OK = (25, 5)
-    STATUS_MOTION_ALLOWED = (25, 6)
-    VAL_JOG_VELOCITY_SP = 26
-    STATUS_MODE_CHANGE_OK = (30, 0)
-    STEP_DISTANCE = 32
-    STEP_FORWARD = (36, 0)
-    STEP_BACKWARD = (36, 1)
-    STEP_ACTIVE = (36, 2)
-    STEP_DONE = (36, 3)
-
-    # ═══════════════════════════════════════════════════════════════════
-    # DB4 - HMI INTERFACE OFFSETS
-    # ═══════════════════════════════════════════════════════════════════
-    HMI_ALARM_ACTIVE = (2, 2)
-    HMI_ALARM_CODE = 4
-    HMI_LAMP_READY = (59, 3)
-    HMI_LAMP_RUNNING = (59, 4)
-    HMI_LAMP_ERROR = (59, 5)
-    HMI_TEST_PROGRESS = 62
+    # Fast tier: read every live cycle (coalesced into block reads by ReadPlanner)
+    LIVE_TAGS = tuple(t.key for db in (DB_RESULTS, DB_SERVO, DB_HMI) for t in TAGS.block_tags(db))
+    # Slow tier: DB1 + CPU state, sampled at PLC_SLOW_POLL_INTERVAL or after a write.
+    # Mode bits stay fast - they share DB3 bytes 25/30 with the safety bits.
+    PARAM_TAGS = tuple(t.key for t in TAGS.block_tags(DB_PARAMS))
+    RESULT_TAGS = (
+        "results.ring_stiffness", "results.force_at_target", "results.sn_class",
+        "results.test_passed", "results.deflection_percent",
+    )
 
     def __init__(self, plc: PLCConnector):
         self.plc = plc
+        self.reader = ReadPlanner(plc)
+        self.slow = SlowSampler(plc, self.reader, self.PARAM_TAGS)
+        # PLC-buffered curve samples (DB5), None = sample at broadcast rate
+        self.curve: Optional[CurveBuffer] = CurveBuffer(plc) if settings.PLC_CURVE_BUFFER else None
+        self.blackbox: Optional[BlackBoxRecorder] = None
+        if settings.BLACKBOX_ENABLED:
+            live_plan = self.reader.plan(self.LIVE_TAGS)
+            self.blackbox = BlackBoxRecorder(
+                settings.BLACKBOX_PATH,
+                settings.BLACKBOX_SIZE_MB * 1024 * 1024,
+                [(r.db, r.start, r.size) for r in live_plan],
+            )
+        # Trace capture: live blocks + last DB1 sample of every cycle of a test
+        self.trace: Optional[BlackBoxRecorder] = None
+        self.trace_path: Optional[str] = None
+        self._last_blocks: Optional[List[bytearray]] = None
+        # Change detection: the snapshot is rebuilt only when the raw bytes change
+        # An unchanged cycle returns the previous LiveData object itself
+        self.live_seq = 0            # bumped whenever get_live_data returns new content
+        self.live_unchanged = 0      # cycles served from the previous snapshot
+        self._live: Optional[LiveData] = None
+        self._live_key: Optional[tuple] = None
 
-    def get_live_data(self) -> Dict[str, Any]:
-        """OPTIMIZED: Read all real-time values using block reads (3 reads instead of 82!)"""
+    @prioritized(Priority.POLL)
+    def get_live_data(self) -> LiveData:
+        """OPTIMIZED: Read all real-time values with coalesced block reads (1 round-trip instead of 82!)"""
         if not self.plc.connected:
+            self.slow.invalidate()
             return self._get_disconnected_data()
 
         try:
-            # Read all DBs in 3 operations instead of 82!
-            db2 = self.plc.read_db_block(self.DB_RESULTS, 0, self.DB2_SIZE)
-            db3 = self.plc.read_db_block(self.DB_SERVO, 0, self.DB3_SIZE)
-            db4 = self.plc.read_db_block(self.DB_HMI, 0, self.DB4_SIZE)
-
-            if db2 is None or db3 is None or db4 is None:
+            # DB2/DB3/DB4 coalesced into one multi-var request
+            plan, blocks = self.reader.read_raw(self.LIVE_TAGS)
+            if blocks is None:
                 return self._get_disconnected_data()
+            if self.blackbox is not None:
+                self.blackbox.append(blocks)
+            slow = self.slow
+            slow.schedule()
+            self._last_blocks = blocks
+            if self.trace is not None:
+                self._record_trace(blocks)
 
-            # Parse data locally (no network calls!)
-            return {
-                "force": {
-                    "raw": safe_float(get_real(db2, self.RES_LOAD_CELL_RAW)),
-                    "actual": safe_float(get_real(db2, self.RES_LOAD_CELL_ACTUAL)),
-                    "filtered": safe_float(get_real(db2, self.RES_FORCE_FILTERED)),
-                    "kN": safe_float(get_real(db2, self.RES_FORCE_KN)),
-                    "N": safe_float(get_real(db2, self.RES_ACTUAL_FORCE)),
-                },
-                "position": {
-                    "raw": safe_float(get_real(db2, self.RES_POSITION_RAW)),
-                    "actual": safe_float(get_real(db2, self.RES_POSITION_ACTUAL)),
-                },
-                "deflection": {
-                    "percent": 0.0,
-                    "actual": safe_float(get_real(db2, self.RES_ACTUAL_DEFLECTION)),
-                    "target": self.plc.read_real(self.DB_PARAMS, self.PARAM_DEFLECTION_TARGET) or 0.0,
-                },
-                "test": {
-                    "status": get_int(db2, self.RES_TEST_STATUS),
-                    "stage": get_int(db2, self.RES_TEST_STAGE),
-                    "preload_reached": get_bool(db2, self.RES_PRELOAD_REACHED[0], self.RES_PRELOAD_REACHED[1]),
-                    "recording": get_bool(db2, self.RES_RECORDING_ACTIVE[0], self.RES_RECORDING_ACTIVE[1]),
-                    "progress": get_int(db4, self.HMI_TEST_PROGRESS),
-                    "passed": get_bool(db2, self.RES_TEST_PASSED[0], self.RES_TEST_PASSED[1]),
-                },
-                "results": {
-                    "ring_stiffness": get_real(db2, self.RES_RING_STIFFNESS),
-                    "force_at_target": get_real(db2, self.RES_FORCE_AT_TARGET),
-                    "sn_class": get_int(db2, self.RES_SN_CLASS),
-                    "contact_position": get_real(db2, self.RES_CONTACT_POSITION),
-                    "data_points": get_int(db2, self.RES_DATA_POINT_COUNT),
-                },
-                "servo": {
-                    "ready": get_bool(db3, self.STATUS_SERVO_READY[0], self.STATUS_SERVO_READY[1]),
-                    "error": get_bool(db3, self.STATUS_SERVO_ERROR[0], self.STATUS_SERVO_ERROR[1]),
-                    "enabled": get_bool(db3, self.STATUS_ENABLE[0], self.STATUS_ENABLE[1]),
-                    "at_home": get_bool(db3, self.STATUS_AT_HOME[0], self.STATUS_AT_HOME[1]),
-                    "mc_power": get_bool(db3, self.STATUS_MC_POWER[0], self.STATUS_MC_POWER[1]),
-                    "mc_busy": get_bool(db3, self.STATUS_MC_BUSY[0], self.STATUS_MC_BUSY[1]),
-                    "mc_error": get_bool(db3, self.STATUS_MC_ERROR[0], self.STATUS_MC_ERROR[1]),
-                    "speed": get_real(db3, self.VAL_ACTUAL_SPEED),
-                    "jog_velocity": get_real(db3, self.VAL_JOG_VELOCITY_SP),
-                },
-                "step": {
-                    "distance": get_real(db3, self.STEP_DISTANCE),
-                    "forward_cmd": get_bool(db3, self.STEP_FORWARD[0], self.STEP_FORWARD[1]),
-                    "backward_cmd": get_bool(db3, self.STEP_BACKWARD[0], self.STEP_BACKWARD[1]),
-                    "active": get_bool(db3, self.STEP_ACTIVE[0], self.STEP_ACTIVE[1]),
-                    "done": get_bool(db3, self.STEP_DONE[0], self.STEP_DONE[1]),
-                },
-                "safety": {
-                    "e_stop": get_bool(db3, self.STATUS_ESTOP_ACTIVE[0], self.STATUS_ESTOP_ACTIVE[1]),
-                    "upper_limit": get_bool(db3, self.STATUS_UPPER_LIMIT[0], self.STATUS_UPPER_LIMIT[1]),
-                    "lower_limit": get_bool(db3, self.STATUS_LOWER_LIMIT[0], self.STATUS_LOWER_LIMIT[1]),
-                    "home": get_bool(db3, self.STATUS_HOME_POSITION[0], self.STATUS_HOME_POSITION[1]),
-                    "ok": get_bool(db3, self.STATUS_SAFETY_OK[0], self.STATUS_SAFETY_OK[1]),
-                    "motion_allowed": get_bool(db3, self.STATUS_MOTION_ALLOWED[0], self.STATUS_MOTION_ALLOWED[1]),
-                },
-                "clamps": {
-                    "upper": get_bool(db3, self.STATUS_LOCK_UPPER[0], self.STATUS_LOCK_UPPER[1]),
-                    "lower": get_bool(db3, self.STATUS_LOCK_LOWER[0], self.STATUS_LOCK_LOWER[1]),
-                },
-                "mode": {
-                    "remote": get_bool(db3, self.STATUS_REMOTE_MODE[0], self.STATUS_REMOTE_MODE[1]),
-                    "can_change": get_bool(db3, self.STATUS_MODE_CHANGE_OK[0], self.STATUS_MODE_CHANGE_OK[1]),
-                },
-                "alarm": {
-                    "active": get_bool(db4, self.HMI_ALARM_ACTIVE[0], self.HMI_ALARM_ACTIVE[1]),
-                    "code": get_int(db4, self.HMI_ALARM_CODE),
-                },
-                "lamps": {
-                    "ready": get_bool(db4, self.HMI_LAMP_READY[0], self.HMI_LAMP_READY[1]),
-                    "running": get_bool(db4, self.HMI_LAMP_RUNNING[0], self.HMI_LAMP_RUNNING[1]),
-                    "error": get_bool(db4, self.HMI_LAMP_ERROR[0], self.HMI_LAMP_ERROR[1]),
-                },
-                "connected": True,
-                "plc": {"connected": True, "cpu_state": self.plc.get_cpu_state(), "ip": self.plc.ip},
-                # Legacy flat fields
-                "servo_ready": get_bool(db3, self.STATUS_SERVO_READY[0], self.STATUS_SERVO_READY[1]),
-                "servo_error": get_bool(db3, self.STATUS_SERVO_ERROR[0], self.STATUS_SERVO_ERROR[1]),
-                "servo_enabled": get_bool(db3, self.STATUS_ENABLE[0], self.STATUS_ENABLE[1]),
-                "at_home": get_bool(db3, self.STATUS_AT_HOME[0], self.STATUS_AT_HOME[1]),
-                "lock_upper": get_bool(db3, self.STATUS_LOCK_UPPER[0], self.STATUS_LOCK_UPPER[1]),
-                "lock_lower": get_bool(db3, self.STATUS_LOCK_LOWER[0], self.STATUS_LOCK_LOWER[1]),
-                "remote_mode": get_bool(db3, self.STATUS_REMOTE_MODE[0], self.STATUS_REMOTE_MODE[1]),
-                "e_stop_active": get_bool(db3, self.STATUS_ESTOP_ACTIVE[0], self.STATUS_ESTOP_ACTIVE[1]),
-                "actual_position": safe_float(get_real(db2, self.RES_POSITION_ACTUAL)),
-                "actual_force": safe_float(get_real(db2, self.RES_FORCE_KN)),
-                "actual_deflection": safe_float(get_real(db2, self.RES_ACTUAL_DEFLECTION)),
-                "target_deflection": get_real(db2, self.RES_DEFLECTION_PERCENT),
-                "test_status": get_int(db2, self.RES_TEST_STATUS),
-                "test_progress": get_int(db4, self.HMI_TEST_PROGRESS),
-            }
+            # Same DB bytes and slow tier as last cycle: same snapshot, skip decoding
+            key = (blocks, slow.blocks, slow.cpu_state)
+            if key == self._live_key:
+                self.live_unchanged += 1
+                return self._live
+            v = self.reader.decode(plan, blocks)
+            # Sections and legacy fields are built on first access (plc/live_data.py)
+            live = LiveData(v, slow.values, slow.cpu_state, self.plc.ip)
+            self._live, self._live_key = live, key
+            self.live_seq += 1
+            return live
         except Exception as e:
             logger.error(f"Error in optimized get_live_data: {e}")
             return self._get_disconnected_data()
 
-    def _get_disconnected_data(self) -> Dict[str, Any]:
+    async def aget_live_data(self) -> LiveData:
+        """get_live_data() executed on the PLC I/O thread"""
+        if not self.plc.connected:
+            return self._get_disconnected_data()
+        return await self.plc.run("get_live_data", self.get_live_data, level=Priority.POLL)
+
+    # ══════════════════════════════════════════════════════════════════════
+    # TRACE CAPTURE - raw cycle images for replay (plc.replay)
+    # ══════════════════════════════════════════════════════════════════════
+
+    def trace_ranges(self) -> List[tuple]:
+        """(db, start, size) of every block in a trace record"""
+        plan = self.reader.plan(self.LIVE_TAGS) + self.reader.plan(self.PARAM_TAGS)
+        return [(r.db, r.start, r.size) for r in plan]
+
+    def start_trace(self, path: Optional[str] = None) -> str:
+        """Capture every live cycle from now on (the current cycle included)"""
+        self.stop_trace()
+        if path is None:
+            path = os.path.join(settings.TRACE_DIR, f"trace_{time.strftime('%Y%m%d_%H%M%S')}.bin")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.trace = BlackBoxRecorder(path + ".part", settings.TRACE_MAX_MB * 1024 * 1024, self.trace_ranges())
+        self.trace_path = path
+        if self._last_blocks is not None:
+            self._record_trace(self._last_blocks)
+        logger.info(f"Trace capture started: {path}")
+        return path
+
+    def stop_trace(self) -> Optional[str]:
+        """Stop capturing and write the trace file, returns its path"""
+        recorder, self.trace = self.trace, None
+        if recorder is None:
+            return None
+        try:
+            data = recorder.dump()
+            recorder.close()
+            if os.path.exists(recorder.path):
+                os.remove(recorder.path)
+            with open(self.trace_path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            logger.error(f"Failed to save trace {self.trace_path}: {e}")
+            return None
+        logger.info(f"Trace saved: {self.trace_path} ({recorder.seq} cycles)")
+        return self.trace_path
+
+    def _record_trace(self, blocks: List[bytearray]) -> None:
+        params = self.slow.blocks
+        if params is None:
+            params = [bytearray(r.size) for r in self.reader.plan(self.PARAM_TAGS)]
+        self.trace.append(blocks + params)
+
+    async def astart_trace(self, path: Optional[str] = None) -> str:
+        # On the I/O thread, so it never races get_live_data's appends
+        return await self.plc.run("start_trace", self.start_trace, path, level=Priority.BACKGROUND)
+
+    async def astop_trace(self) -> Optional[str]:
+        return await self.plc.run("stop_trace", self.stop_trace, level=Priority.BACKGROUND)
+
+    def get_live_stats(self) -> Dict[str, Any]:
+        total = self.live_seq + self.live_unchanged
         return {
+            "seq": self.live_seq,
+            "unchanged": self.live_unchanged,
+            "unchanged_ratio": round(self.live_unchanged / total, 3) if total else 0.0,
+        }
+
+    def _get_disconnected_data(self) -> LiveData:
+        if self._live is not None and self._live_key is None:
+            return self._live  # still disconnected: same snapshot
+        self._live = self._build_disconnected_data()
+        self._live_key = None
+        self.live_seq += 1
+        return self._live
+
+    def _build_disconnected_data(self) -> LiveData:
+        return LiveData.from_dict({
             "force": {"raw": 0.0, "actual": 0.0, "filtered": 0.0, "kN": 0.0, "N": 0.0},
             "position": {"raw": 0.0, "actual": 0.0},
             "deflection": {
@@ -250,31 +198,47 @@ class DataService:
             "remote_mode": False, "e_stop_active": False,
             "actual_position": 0.0, "actual_force": 0.0, "actual_deflection": 0.0,
             "target_deflection": 0.0, "test_status": -1, "test_progress": 0,
-        }
+        })
+
+    # Parameter defaults used when the PLC returns 0 / nothing
+    PARAM_DEFAULTS = {
+        "pipe_diameter": 0.0, "pipe_length": 300.0, "deflection_percent": 3.0,
+        "deflection_target": 0.0, "test_speed": 12.0, "max_stroke": 300.0,
+        "max_force": 200000.0, "preload_force": 10.0, "approach_speed": 50.0,
+        "contact_speed": 2.0, "return_speed": 300.0, "target_sn_class": 2500,
+    }
 
+    @prioritized(Priority.BACKGROUND)
     def get_parameters(self) -> Dict[str, Any]:
+        """DB1 parameters from the cache, one block read if it is stale"""
         if not self.plc.connected:
             return self._get_default_parameters()
         try:
-            return {
-                "pipe_diameter": self.plc.read_real(self.DB_PARAMS, self.PARAM_PIPE_DIAMETER) or 0.0,
-                "pipe_length": self.plc.read_real(self.DB_PARAMS, self.PARAM_PIPE_LENGTH) or 300.0,
-                "deflection_percent": self.plc.read_real(self.DB_PARAMS, self.PARAM_DEFLECTION_PERCENT) or 3.0,
-                "deflection_target": self.plc.read_real(self.DB_PARAMS, self.PARAM_DEFLECTION_TARGET) or 0.0,
-                "test_speed": self.plc.read_real(self.DB_PARAMS, self.PARAM_TEST_SPEED) or 12.0,
-                "max_stroke": self.plc.read_real(self.DB_PARAMS, self.PARAM_MAX_STROKE) or 300.0,
-                "max_force": self.plc.read_real(self.DB_PARAMS, self.PARAM_MAX_FORCE) or 200000.0,
-                "preload_force": self.plc.read_real(self.DB_PARAMS, self.PARAM_PRELOAD_FORCE) or 10.0,
-                "approach_speed": self.plc.read_real(self.DB_PARAMS, self.PARAM_APPROACH_SPEED) or 50.0,
-                "contact_speed": self.plc.read_real(self.DB_PARAMS, self.PARAM_CONTACT_SPEED) or 2.0,
-                "return_speed": self.plc.read_real(self.DB_PARAMS, self.PARAM_RETURN_SPEED) or 300.0,
-                "target_sn_class": self.plc.read_int(self.DB_PARAMS, self.PARAM_TARGET_SN_CLASS) or 2500,
-                "connected": True,
-            }
+            slow = self.slow
+            if (not slow.sampled_at or slow.due()) and not slow.sample():
+                return self._get_default_parameters()
+            return self._params_from(slow.values)
         except Exception as e:
             logger.error(f"Error reading parameters: {e}")
             return self._get_default_parameters()
 
+    async def aget_parameters(self) -> Dict[str, Any]:
+        """DB1 parameters - from the cache if current, else refreshed on the PLC I/O thread"""
+        if not self.plc.connected:
+            return self._get_default_parameters()
+        slow = self.slow
+        if slow.sampled_at and not slow.due():
+            return self._params_from(slow.values)
+        return await self.plc.run("get_parameters", self.get_parameters, level=Priority.BACKGROUND)
+
+    def _params_from(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        params = {
+            name: values.get(f"params.{name}") or default
+            for name, default in self.PARAM_DEFAULTS.items()
+        }
+        params["connected"] = True
+        return params
+
     def _get_default_parameters(self) -> Dict[str, Any]:
         return {
             "pipe_diameter": 0.0, "pipe_length": 300.0, "deflection_percent": 3.0,
@@ -283,39 +247,50 @@ class DataService:
             "contact_speed": 2.0, "return_speed": 100.0, "target_sn_class": 2500, "connected": False,
         }
 
+    # Parameters the UI is allowed to write
+    WRITABLE_PARAMS = (
+        "pipe_diameter", "pipe_length", "deflection_percent", "test_speed",
+        "max_stroke", "max_force", "preload_force", "target_sn_class",
+    )
+
     def set_parameters(self, **kwargs) -> bool:
+        """Write parameters through the DB1 cache (None = leave unchanged)"""
         if not self.plc.connected:
             return False
+        unknown = set(kwargs) - set(self.WRITABLE_PARAMS)
+        if unknown:
+            logger.warning(f"Ignoring unknown parameters: {sorted(unknown)}")
+        values = {
+            f"params.{name}": kwargs[name]
+            for name in self.WRITABLE_PARAMS
+            if kwargs.get(name) is not None
+        }
         try:
-            if "pipe_diameter" in kwargs:
-                self.plc.write_real(self.DB_PARAMS, self.PARAM_PIPE_DIAMETER, float(kwargs["pipe_diameter"]))
-            if "pipe_length" in kwargs:
-                self.plc.write_real(self.DB_PARAMS, self.PARAM_PIPE_LENGTH, float(kwargs["pipe_length"]))
-            if "deflection_percent" in kwargs:
-                self.plc.write_real(self.DB_PARAMS, self.PARAM_DEFLECTION_PERCENT, float(kwargs["deflection_percent"]))
-            if "test_speed" in kwargs:
-                self.plc.write_real(self.DB_PARAMS, self.PARAM_TEST_SPEED, float(kwargs["test_speed"]))
-            if "max_stroke" in kwargs:
-                self.plc.write_real(self.DB_PARAMS, self.PARAM_MAX_STROKE, float(kwargs["max_stroke"]))
-            if "max_force" in kwargs:
-                self.plc.write_real(self.DB_PARAMS, self.PARAM_MAX_FORCE, float(kwargs["max_force"]))
-            if "preload_force" in kwargs:
-                self.plc.write_real(self.DB_PARAMS, self.PARAM_PRELOAD_FORCE, float(kwargs["preload_force"]))
-            if "target_sn_class" in kwargs:
-                self.plc.write_int(self.DB_PARAMS, self.PARAM_TARGET_SN_CLASS, int(kwargs["target_sn_class"]))
-            logger.info(f"Parameters written: {kwargs}")
+            # Changed fields only, adjacent ones as one block write
+            if not self.slow.write(values):
+                return False
+            logger.info(f"Parameters written: {values}")
             return True
         except Exception as e:
             logger.error(f"Error writing parameters: {e}")
             return False
 
+    async def aset_parameters(self, **kwargs) -> bool:
+        """set_parameters() on the PLC I/O thread (serialized with the cache refresh)"""
+        return await self.plc.run("set_parameters", self.set_parameters, level=Priority.COMMAND, **kwargs)
+
+    @prioritized(Priority.BACKGROUND)
     def get_test_results(self) -> Dict[str, Any]:
         if not self.plc.connected:
             return {"ring_stiffness": 0.0, "force_at_target": 0.0, "sn_class": 0, "test_passed": False}
+        v = self.reader.read(self.RESULT_TAGS) or {}
         return {
-            "ring_stiffness": self.plc.read_real(self.DB_RESULTS, self.RES_RING_STIFFNESS) or 0.0,
-            "force_at_target": self.plc.read_real(self.DB_RESULTS, self.RES_FORCE_AT_TARGET) or 0.0,
-            "sn_class": self.plc.read_int(self.DB_RESULTS, self.RES_SN_CLASS) or 0,
-            "test_passed": self.plc.read_bool(self.DB_RESULTS, *self.RES_TEST_PASSED) or False,
-            "deflection_percent": self.plc.read_real(self.DB_RESULTS, self.RES_DEFLECTION_PERCENT) or 0.0,
+            "ring_stiffness": v.get("results.ring_stiffness") or 0.0,
+            "force_at_target": v.get("results.force_at_target") or 0.0,
+            "sn_class": v.get("results.sn_class") or 0,
+            "test_passed": v.get("results.test_passed") or False,
+            "deflection_percent": v.get("results.deflection_percent") or 0.0,
         }
+
+    async def aget_test_results(self) -> Dict[str, Any]:
+        return await self.plc.run("get_test_results", self.get_test_results, level=Priority.BACKGROUND)
@@ -0,0 +1,171 @@
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .scheduler import Priority, current_priority, priority
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Running latency counters for one kind of PLC call"""
+
+    __slots__ = ("count", "errors", "wait_total", "wait_max", "exec_total", "exec_max", "exec_last")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.exec_total = 0.0
+        self.exec_max = 0.0
+        self.exec_last = 0.0
+
+    def record(self, wait: float, execute: float, failed: bool = False) -> None:
+        self.count += 1
+        if failed:
+            self.errors += 1
+        self.wait_total += wait
+        self.exec_total += execute
+        self.exec_last = execute
+        if wait > self.wait_max:
+            self.wait_max = wait
+        if execute > self.exec_max:
+            self.exec_max = execute
+
+    def to_dict(self) -> Dict[str, Any]:
+        n = self.count or 1
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "wait_avg_ms": round(self.wait_total / n * 1000, 3),
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "exec_avg_ms": round(self.exec_total / n * 1000, 3),
+            "exec_max_ms": round(self.exec_max * 1000, 3),
+            "exec_last_ms": round(self.exec_last * 1000, 3),
+            "exec_total_ms": round(self.exec_total * 1000, 1),
+        }
+
+
+class PLCIOEngine:
+    """Owner thread for blocking snap7 calls
+
+    Every request is queued and executed on one dedicated thread, so the
+    asyncio event loop only awaits a future instead of blocking on the
+    PLC round-trip. The queue is ordered by Priority (FIFO within a class)
+    and each job runs in its submitter's priority context, so the lock it
+    takes is granted in the same order. Latency is tracked per operation name:
+    - wait: time spent queued behind other requests
+    - exec: time spent inside snap7 (= event loop time freed)
+    """
+
+    _STOP = len(Priority)  # sorts after every real class: pending jobs drain first
+
+    def __init__(self, name: str = "plc-io"):
+        self.name = name
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, LatencyStats] = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_owner_thread(self) -> bool:
+        """True when called from the engine thread itself"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self) -> None:
+        """Start the owner thread (idempotent)"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"PLC I/O thread '{self.name}' started")
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Drain pending requests and stop the owner thread"""
+        if not self.running:
+            return
+        self._queue.put((self._STOP, next(self._seq), None))
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"PLC I/O thread '{self.name}' stopped")
+
+    def submit(self, op: str, fn: Callable, *args, level: Optional[Priority] = None, **kwargs) -> concurrent.futures.Future:
+        """Queue a blocking call and return a concurrent Future
+
+        Args:
+            level: priority class (defaults to the caller's current priority)
+        """
+        if not self.running:
+            self.start()
+        if level is None:
+            level = current_priority()
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        job = (op, fn, args, kwargs, future, time.perf_counter())
+        self._queue.put((level, next(self._seq), job))
+        return future
+
+    async def run(self, op: str, fn: Callable, *args, level: Optional[Priority] = None, **kwargs) -> Any:
+        """Await a blocking call executed on the owner thread"""
+        if self.in_owner_thread():
+            return fn(*args, **kwargs)
+        return await asyncio.wrap_future(self.submit(op, fn, *args, level=level, **kwargs))
+
+    def call(self, op: str, fn: Callable, *args, level: Optional[Priority] = None, **kwargs) -> Any:
+        """Blocking variant of run() for synchronous callers"""
+        if self.in_owner_thread():
+            return fn(*args, **kwargs)
+        return self.submit(op, fn, *args, level=level, **kwargs).result()
+
+    def _worker(self) -> None:
+        while True:
+            level, _, job = self._queue.get()
+            if job is None:
+                break
+            op, fn, args, kwargs, future, queued_at = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            failed = False
+            try:
+                with priority(level, queued_at):
+                    result = fn(*args, **kwargs)
+            except BaseException as e:
+                failed = True
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finished = time.perf_counter()
+            self._record(op, started - queued_at, finished - started, failed)
+
+    def _record(self, op: str, wait: float, execute: float, failed: bool) -> None:
+        with self._stats_lock:
+            stats = self._stats.get(op)
+            if stats is None:
+                stats = self._stats[op] = LatencyStats()
+            stats.record(wait, execute, failed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-operation latency stats plus queue depth"""
+        with self._stats_lock:
+            ops = {op: s.to_dict() for op, s in self._stats.items()}
+        return {
+            "thread": self.name,
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "loop_time_freed_ms": round(sum(s["exec_total_ms"] for s in ops.values()), 1),
+            "operations": ops,
+        }
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from config import settings
+from .data_service import DataService
+from .live_data import LiveData
+from .ticker import Ticker
+
+logger = logging.getLogger(__name__)
+
+
+class LiveSnapshot(NamedTuple):
+    seq: int               # bumped only when the content changes
+    read_at: float         # time.monotonic() when the PLC read that produced / confirmed it started
+    data: LiveData         # DataService.get_live_data() - shared, read only
+    tick: float            # scheduled poll time - uniform time base for curve samples
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.read_at
+
+
+class LiveBus:
+    """Single poller of the live PLC data, shared by every consumer
+
+    One task reads get_live_data() on a fixed-rate Ticker (absolute
+    deadlines, no drift by the read time) and publishes an immutable
+    LiveSnapshot. The websocket broadcast, TestService, REST
+    status / safety and the command prechecks read the latest snapshot
+    (or wait for the next one) instead of polling the PLC themselves, so
+    PLC load no longer grows with clients and callers.
+
+    A reader whose snapshot is older than `max_age` (bus not started or
+    stalled) falls back to polling once and publishes the result.
+    """
+
+    def __init__(
+        self,
+        data_service: DataService,
+        interval: float = settings.WS_UPDATE_INTERVAL,
+        max_age: float = settings.PLC_SNAPSHOT_MAX_AGE,
+    ):
+        self.data_service = data_service
+        self.interval = interval
+        self.max_age = max_age
+        self.latest: Optional[LiveSnapshot] = None
+        self.polls = 0
+        self.served = 0      # reads answered from the bus
+        self.fallbacks = 0   # reads that had to poll the PLC themselves
+        self.ticker = Ticker(interval, "live")
+        self._task: Optional[asyncio.Task] = None
+        self._cycle: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the poll task (idempotent, needs a running loop)"""
+        if self.running:
+            return
+        self._cycle = asyncio.Event()
+        self.ticker.reset()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Live bus started ({self.interval * 1000:.0f} ms)")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        logger.info("Live bus stopped")
+
+    async def _run(self) -> None:
+        ticker = self.ticker
+        while True:
+            tick = await ticker.wait()
+            try:
+                await self.poll(tick)
+            except Exception as e:
+                logger.error(f"Live bus poll error: {e}")
+
+    async def poll(self, tick: Optional[float] = None) -> LiveSnapshot:
+        """Read the PLC now and publish the result"""
+        read_at = time.monotonic()  # before the read: a write completed after this may not be in it
+        if tick is None:
+            tick = read_at
+        data = await self.data_service.aget_live_data()
+        self.polls += 1
+        return self.publish(data, tick, read_at)
+
+    def publish(self, data: LiveData, tick: float, read_at: Optional[float] = None) -> LiveSnapshot:
+        """Make `data` the latest snapshot (`read_at`: when its PLC read started, default now)"""
+        latest = self.latest
+        if latest is None:
+            seq = 1
+        else:
+            # DataService returns the very same LiveData when nothing changed
+            seq = latest.seq if data is latest.data else latest.seq + 1
+        snapshot = LiveSnapshot(seq, time.monotonic() if read_at is None else read_at, data, tick)
+        self.latest = snapshot
+        if self._cycle is not None:
+            cycle, self._cycle = self._cycle, asyncio.Event()
+            cycle.set()
+        return snapshot
+
+    # ══════════════════════════════════════════════════════════════════════
+    # CONSUMERS
+    # ══════════════════════════════════════════════════════════════════════
+
+    async def wait(self) -> LiveSnapshot:
+        """Next published snapshot (one per poll cycle, changed or not)"""
+        if not self.running:
+            # Polled here at the bus rate: a disconnected PLC answers from cache
+            # without yielding, an unpaced loop would spin
+            tick = await self.ticker.wait()
+            return await self.poll(tick)
+        await self._cycle.wait()
+        return self.latest
+
+    def fresh(self, max_age: Optional[float] = None) -> Optional[LiveSnapshot]:
+        """Latest snapshot if younger than max_age, else None (thread-safe)"""
+        snapshot = self.latest
+        if snapshot is None or snapshot.age > (self.max_age if max_age is None else max_age):
+            return None
+        return snapshot
+
+    async def aget_live_data(self) -> LiveData:
+        """Drop-in for DataService.aget_live_data() served from the bus"""
+        snapshot = self.fresh()
+        if snapshot is not None:
+            self.served += 1
+            return snapshot.data
+        self.fallbacks += 1
+        return (await self.poll()).data
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self.latest
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 1),
+            "seq": snapshot.seq if snapshot else 0,
+            "age_ms": round(snapshot.age * 1000, 1) if snapshot else None,
+            "polls": self.polls,
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+            "ticker": self.ticker.get_stats(),
+        }
@@ -0,0 +1,170 @@
+import json
+import math
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+# Helper to handle NaN values
+def safe_float(val, default=0.0):
+    if val is None or math.isnan(val) or math.isinf(val):
+        return default
+    return val
+
+
+def _json_safe(value: Any) -> Any:
+    """Copy of `value` with non-finite floats as None (JSON has no NaN)"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, Mapping):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+def _section(**fields: str) -> Callable[["LiveData"], Dict[str, Any]]:
+    """Builder for a nested section: field name -> tag key"""
+    items = tuple(fields.items())
+    return lambda live: {name: live.values[tag] for name, tag in items}
+
+
+def _floats(**fields: str) -> Callable[["LiveData"], Dict[str, Any]]:
+    items = tuple(fields.items())
+    return lambda live: {name: safe_float(live.values[tag]) for name, tag in items}
+
+
+def _tag(tag: str, convert: Optional[Callable[[Any], Any]] = None) -> Callable[["LiveData"], Any]:
+    if convert is None:
+        return lambda live: live.values[tag]
+    return lambda live: convert(live.values[tag])
+
+
+class LiveData(Mapping):
+    """One live cycle, read-only
+
+    Holds the decoded tag values of the cycle. The get_live_data() layout
+    (nested sections + legacy flat fields) is a lazy view: each top-level
+    key is built on first access and cached, so a consumer reading
+    data["test_status"] builds nothing else. to_json() encodes the whole
+    layout once per snapshot and is shared by every emit of it.
+    """
+
+    __slots__ = ("values", "params", "cpu_state", "ip", "_view", "_json")
+
+    BUILDERS: Dict[str, Callable[["LiveData"], Any]] = {
+        "force": _floats(
+            raw="results.load_cell_raw", actual="results.load_cell_actual",
+            filtered="results.force_filtered", kN="results.force_kn", N="results.actual_force",
+        ),
+        "position": _floats(raw="results.position_raw", actual="results.position_actual"),
+        "deflection": lambda live: {
+            "percent": 0.0,
+            "actual": safe_float(live.values["results.actual_deflection"]),
+            "target": safe_float(live.params.get("params.deflection_target", 0.0)),
+        },
+        "test": _section(
+            status="results.test_status", stage="results.test_stage",
+            preload_reached="results.preload_reached", recording="results.recording_active",
+            progress="hmi.test_progress", passed="results.test_passed",
+        ),
+        "results": _section(
+            ring_stiffness="results.ring_stiffness", force_at_target="results.force_at_target",
+            sn_class="results.sn_class", contact_position="results.contact_position",
+            data_points="results.data_point_count",
+        ),
+        "servo": _section(
+            ready="servo.servo_ready", error="servo.servo_error", enabled="servo.enable",
+            at_home="servo.at_home", mc_power="servo.mc_power", mc_busy="servo.mc_busy",
+            mc_error="servo.mc_error", speed="servo.actual_speed", jog_velocity="servo.jog_velocity_sp",
+        ),
+        "step": _section(
+            distance="servo.step_distance", forward_cmd="servo.step_forward",
+            backward_cmd="servo.step_backward", active="servo.step_active", done="servo.step_done",
+        ),
+        "safety": _section(
+            e_stop="servo.estop_active", upper_limit="servo.upper_limit", lower_limit="servo.lower_limit",
+            home="servo.home_position", ok="servo.safety_ok", motion_allowed="servo.motion_allowed",
+        ),
+        "clamps": _section(upper="servo.lock_upper", lower="servo.lock_lower"),
+        "mode": _section(remote="servo.remote_mode", can_change="servo.mode_change_ok"),
+        "alarm": _section(active="hmi.alarm_active", code="hmi.alarm_code"),
+        "lamps": _section(ready="hmi.lamp_ready", running="hmi.lamp_running", error="hmi.lamp_error"),
+        "connected": lambda live: True,
+        "plc": lambda live: {"connected": True, "cpu_state": live.cpu_state, "ip": live.ip},
+        # Legacy flat fields
+        "servo_ready": _tag("servo.servo_ready"),
+        "servo_error": _tag("servo.servo_error"),
+        "servo_enabled": _tag("servo.enable"),
+        "at_home": _tag("servo.at_home"),
+        "lock_upper": _tag("servo.lock_upper"),
+        "lock_lower": _tag("servo.lock_lower"),
+        "remote_mode": _tag("servo.remote_mode"),
+        "e_stop_active": _tag("servo.estop_active"),
+        "actual_position": _tag("results.position_actual", safe_float),
+        "actual_force": _tag("results.force_kn", safe_float),
+        "actual_deflection": _tag("results.actual_deflection", safe_float),
+        "target_deflection": _tag("results.deflection_percent"),
+        "test_status": _tag("results.test_status"),
+        "test_progress": _tag("hmi.test_progress"),
+    }
+    KEYS = tuple(BUILDERS)
+
+    def __init__(self, values: Dict[str, Any], params: Dict[str, Any], cpu_state: str, ip: str):
+        self.values = values        # decoded fast-tier tags (ReadPlanner.decode)
+        self.params = params        # slow-tier values merged into this cycle
+        self.cpu_state = cpu_state
+        self.ip = ip
+        self._view: Dict[str, Any] = {}
+        self._json: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, view: Dict[str, Any]) -> "LiveData":
+        """Snapshot with a fixed, fully built view (disconnected data)"""
+        live = cls({}, {}, view["plc"]["cpu_state"], view["plc"]["ip"])
+        live._view = view
+        return live
+
+    def __getitem__(self, key: str) -> Any:
+        view = self._view
+        if key in view:
+            return view[key]
+        build = self.BUILDERS.get(key)
+        if build is None:
+            raise KeyError(key)
+        # Racing builders on two threads produce equal values, last one wins
+        value = view[key] = build(self)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        return f"LiveData({self.as_dict()!r})"
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Full get_live_data() layout as a plain dict (shared, never modify)"""
+        view = self._view
+        if len(view) < len(self.KEYS):
+            view = self._view = {
+                key: view[key] if key in view else build(self)
+                for key, build in self.BUILDERS.items()
+            }
+        return view
+
+    def to_json(self) -> str:
+        """Compact JSON of as_dict(), encoded once per snapshot
+
+        An unset or failed REAL (NaN / inf) is encoded as null.
+        """
+        encoded = self._json
+        if encoded is None:
+            view = self.as_dict()
+            try:
+                encoded = json.dumps(view, separators=(",", ":"), allow_nan=False)
+            except ValueError:
+                encoded = json.dumps(_json_safe(view), separators=(",", ":"), allow_nan=False)
+            self._json = encoded
+        return encoded
@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class ShadowImage:
+    """Shadow copy of the command bytes (DB3.0/14/25/36, DB4.59)
+
+    Refreshed by every block read that covers a tracked byte (i.e. the live
+    poll cycle) and by our own writes. Bit writes use the shadow as the base
+    byte instead of a read-modify-write, saving one round-trip per command.
+
+    Command bytes also hold PLC-owned bits (status, self-clearing commands),
+    so the shadow is only trusted while younger than max_age; older bytes
+    fall back to a fresh read. A read that started before our last write to
+    a byte completed may predate that write, so it does not refresh it.
+
+    Pulse bits (`pulses`, (db, byte, bit)) are kept cleared: only latched
+    bits are carried from the shadow into the next write (see latched()).
+    """
+
+    def __init__(self, tracked: Iterable[Tuple[int, int]], max_age: float,
+                 pulses: Iterable[Tuple[int, int, int]] = ()):
+        self.max_age = max_age
+        self._pulse_masks: Dict[Tuple[int, int], int] = {}
+        for db, offset, bit in pulses:
+            self._pulse_masks[(db, offset)] = self._pulse_masks.get((db, offset), 0) | (1 << bit)
+        self._tracked: Dict[int, Tuple[int, ...]] = {}
+        for db, offset in tracked:
+            self._tracked[db] = tuple(sorted(set(self._tracked.get(db, ())) | {offset}))
+        self._bytes: Dict[Tuple[int, int], Tuple[int, float]] = {}
+        self._written: Dict[Tuple[int, int], float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def tracks(self, db: int, offset: int) -> bool:
+        return offset in self._tracked.get(db, ())
+
+    def latched(self, db: int, offset: int, value: int) -> int:
+        """`value` of a byte with its pulse bits cleared"""
+        return value & ~self._pulse_masks.get((db, offset), 0) & 0xFF
+
+    def refresh(self, db: int, start: int, data: bytes, read_started: float) -> None:
+        """Update tracked bytes covered by a block read starting at `start`
+
+        Args:
+            read_started: time.monotonic() taken before the read was issued
+        """
+        offsets = self._tracked.get(db)
+        if not offsets:
+            return
+        end = start + len(data)
+        with self._lock:
+            for offset in offsets:
+                if start <= offset < end and self._written.get((db, offset), 0.0) <= read_started:
+                    self._bytes[(db, offset)] = (self.latched(db, offset, data[offset - start]), read_started)
+
+    def get(self, db: int, offset: int) -> Optional[int]:
+        """Shadow byte value if tracked and fresh, else None"""
+        with self._lock:
+            entry = self._bytes.get((db, offset))
+            if entry is None or time.monotonic() - entry[1] > self.max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def store(self, db: int, start: int, data: bytes) -> None:
+        """Record bytes we have just written (call after the write ack)"""
+        now = time.monotonic()
+        with self._lock:
+            for index, value in enumerate(data):
+                if self.tracks(db, start + index):
+                    self._bytes[(db, start + index)] = (self.latched(db, start + index, value), now)
+                    self._written[(db, start + index)] = now
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._bytes.clear()
+            self._written.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "max_age_ms": int(self.max_age * 1000)}
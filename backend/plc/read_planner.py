@@ -0,0 +1,84 @@
+import logging
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import settings
+from .connector import PLCConnector
+from .tags import TAGS, TagMap
+
+logger = logging.getLogger(__name__)
+
+
+class ReadRange(NamedTuple):
+    """One contiguous block read covering one or more tags"""
+    db: int
+    start: int
+    size: int
+    keys: Tuple[str, ...]
+
+
+class ReadPlanner:
+    """Coalesces tag reads into the fewest DB block reads
+
+    Requested tags are grouped per DB, sorted by offset and merged whenever
+    the gap to the previous range is <= max_gap bytes (reading a few unused
+    bytes is far cheaper than another round-trip). The resulting ranges are
+    fetched with one multi-var request and decoded with compiled decoders.
+    """
+
+    def __init__(self, plc: PLCConnector, tags: TagMap = TAGS, max_gap: int = settings.PLC_READ_GAP):
+        self.plc = plc
+        self.tags = tags
+        self.max_gap = max_gap
+        self._plans: Dict[Tuple[str, ...], List[ReadRange]] = {}
+
+    def plan(self, keys: Iterable[str]) -> List[ReadRange]:
+        """Merge the tags into block ranges (cached per key set)"""
+        keys = tuple(keys)
+        plan = self._plans.get(keys)
+        if plan is not None:
+            return plan
+
+        by_db: Dict[int, list] = {}
+        for key in dict.fromkeys(keys):
+            tag = self.tags[key]
+            by_db.setdefault(tag.db, []).append(tag)
+
+        plan = []
+        for db in sorted(by_db):
+            current: list = []
+            start = end = 0
+            for tag in sorted(by_db[db], key=lambda t: (t.offset, t.bit)):
+                if current and tag.offset - end > self.max_gap:
+                    plan.append(ReadRange(db, start, end - start, tuple(t.key for t in current)))
+                    current = []
+                if not current:
+                    start, end = tag.offset, tag.end
+                current.append(tag)
+                end = max(end, tag.end)
+            plan.append(ReadRange(db, start, end - start, tuple(t.key for t in current)))
+
+        self._plans[keys] = plan
+        return plan
+
+    def read(self, keys: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """Read and decode the tags, keyed by full tag key ("servo.safety_ok")
+
+        Returns None if the PLC read failed.
+        """
+        plan, blocks = self.read_raw(keys)
+        if blocks is None:
+            return None
+        return self.decode(plan, blocks)
+
+    def read_raw(self, keys: Iterable[str]) -> Tuple[List[ReadRange], Optional[List[bytearray]]]:
+        """Read the plan's blocks without decoding (blocks is None on failure)"""
+        plan = self.plan(keys)
+        return plan, self.plc.read_multi_db_blocks([(r.db, r.start, r.size) for r in plan])
+
+    def decode(self, plan: List[ReadRange], blocks: List[bytearray]) -> Dict[str, Any]:
+        """Decode raw range buffers returned for a plan"""
+        values: Dict[str, Any] = {}
+        for read_range, data in zip(plan, blocks):
+            decoder = self.tags.decoder(read_range.keys, full_keys=True)
+            values.update(decoder.decode(data, read_range.start))
+        return values
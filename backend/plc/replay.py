@@ -0,0 +1,288 @@
+"""
+Trace replay - a PLCConnector that serves recorded DB images instead of a PLC
+
+Traces are black box files (plc/blackbox.py): the per-test files written
+with TRACE_CAPTURE=true, a /status/blackbox/dump export, or the ring
+file itself. Every poll read of the live blocks advances to the next
+recorded cycle (step mode, the default - deterministic and as fast as the
+pipeline allows) or to the cycle due at `speed` x the recorded time.
+Writes land in the DB images like on a real CPU and are overwritten by
+the next recorded cycle.
+
+Benchmark the whole pipeline (broadcast_live_data, test detection,
+_save_test_result) against a production trace:
+    python -m plc.replay traces/trace_20260101_120000.bin
+    python -m plc.replay trace.bin --speed 10 --database /tmp/replay.db
+"""
+
+import argparse
+import asyncio
+import bisect
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from .blackbox import BlackBoxRecorder
+from .connector import PLCConnector
+from .tags import TAGS, DB_PARAMS, DB_RESULTS, DB_SERVO, DB_HMI
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayClient:
+    """snap7.client.Client stand-in backed by the cycles of a trace"""
+
+    PDU_LENGTH = 240
+
+    def __init__(self, trace: BlackBoxRecorder, speed: float = 0.0, loop: bool = False):
+        self.ranges = trace.ranges
+        self.frames: List[Tuple[float, bytes]] = [(monotonic, raw) for _, monotonic, _, raw in trace.records()]
+        if not self.frames:
+            raise ValueError(f"Trace {trace.path} has no records")
+        self.times = [t for t, _ in self.frames]
+        self.speed = speed
+        self.loop = loop
+
+        sizes = {db: max(t.end for t in TAGS.block_tags(db)) for db in (DB_PARAMS, DB_RESULTS, DB_SERVO, DB_HMI)}
+        for db, start, size in self.ranges:
+            sizes[db] = max(sizes.get(db, 0), start + size)
+        self.images: Dict[int, bytearray] = {db: bytearray(size) for db, size in sizes.items()}
+        self.areas: Dict[Any, bytearray] = {}  # process image (inputs / outputs)
+
+        # One poll cycle = one read of the first recorded range
+        self.trigger = self.ranges[0][:2]
+        self.index = -1
+        self.served = 0
+        self.finished = False
+        self._started: Optional[float] = None
+        self._connected = False
+
+    # ══════════════════════════════════════════════════════════════════════
+    # REPLAY CLOCK
+    # ══════════════════════════════════════════════════════════════════════
+
+    def clock(self) -> float:
+        """Recorded monotonic time of the cycle being served"""
+        return self.frames[max(self.index, 0)][0]
+
+    @property
+    def duration(self) -> float:
+        return self.times[-1] - self.times[0]
+
+    def _advance(self) -> None:
+        count = len(self.frames)
+        if self.speed > 0:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = now
+            elapsed = (now - self._started) * self.speed
+            if self.loop and self.duration > 0:
+                elapsed %= self.duration
+            index = max(0, bisect.bisect_right(self.times, self.times[0] + elapsed) - 1)
+        else:
+            index = self.index + 1
+            if self.loop:
+                index %= count
+        if index >= count - 1 and not self.loop:
+            # Past the end: hold the last cycle
+            self.finished = self.index == count - 1
+            index = count - 1
+        if index != self.index:
+            self._apply(index)
+        self.served += 1
+
+    def _apply(self, index: int) -> None:
+        raw = self.frames[index][1]
+        position = 0
+        for db, start, size in self.ranges:
+            self.images[db][start:start + size] = raw[position:position + size]
+            position += size
+        self.index = index
+
+    def _read(self, db_number: int, start: int, size: int) -> bytearray:
+        image = self.images.get(db_number)
+        if image is None or start + size > len(image):
+            raise RuntimeError(f"Address out of range: DB{db_number}.{start} ({size} bytes)")
+        return bytearray(image[start:start + size])
+
+    # ══════════════════════════════════════════════════════════════════════
+    # snap7 CLIENT API (the subset PLCConnector uses)
+    # ══════════════════════════════════════════════════════════════════════
+
+    def connect(self, address: str, rack: int, slot: int, tcp_port: int = 102) -> "ReplayClient":
+        self._connected = True
+        return self
+
+    def disconnect(self) -> bool:
+        self._connected = False
+        return True
+
+    def get_connected(self) -> bool:
+        return self._connected
+
+    def get_pdu_length(self) -> int:
+        return self.PDU_LENGTH
+
+    def set_param(self, parameter, value) -> None:
+        pass
+
+    def get_cpu_state(self) -> str:
+        return "S7CpuStatusRun"
+
+    def db_read(self, db_number: int, start: int, size: int) -> bytearray:
+        if (db_number, start) == self.trigger:
+            self._advance()
+        return self._read(db_number, start, size)
+
+    def db_write(self, db_number: int, start: int, data: bytearray) -> int:
+        image = self.images.get(db_number)
+        if image is None or start + len(data) > len(image):
+            raise RuntimeError(f"Address out of range: DB{db_number}.{start} ({len(data)} bytes)")
+        image[start:start + len(data)] = data
+        return 0
+
+    def read_multi_vars(self, items: List[Dict[str, Any]]) -> Tuple[int, List[bytearray]]:
+        if any((item["db_number"], item["start"]) == self.trigger for item in items):
+            self._advance()
+        return 0, [self._read(item["db_number"], item["start"], item["size"]) for item in items]
+
+    def read_area(self, area, db_number: int, start: int, size: int) -> bytearray:
+        image = self.areas.setdefault(area, bytearray(256))
+        return bytearray(image[start:start + size])
+
+    def write_area(self, area, db_number: int, start: int, data: bytearray) -> int:
+        image = self.areas.setdefault(area, bytearray(256))
+        image[start:start + len(data)] = data
+        return 0
+
+
+class ReplayPLC(PLCConnector):
+    """PLCConnector whose link is a recorded trace (single link, no TCP)"""
+
+    def __init__(self, trace_path: str, speed: float = 0.0, loop: bool = False):
+        super().__init__("replay", settings.PLC_RACK, settings.PLC_SLOT, name="replay", command_connection=False)
+        self.trace_path = trace_path
+        trace = BlackBoxRecorder.from_file(trace_path)
+        try:
+            self.client = ReplayClient(trace, speed, loop)
+        finally:
+            trace.close()
+
+    @property
+    def finished(self) -> bool:
+        return self.client.finished
+
+    def clock(self) -> float:
+        return self.client.clock()
+
+    def _connect_link(self) -> bool:
+        with self.lock:
+            self.client.connect(self.ip, self.rack, self.slot)
+            self._connected = True
+            self._last_io = time.monotonic()
+        logger.info(f"Replaying {self.trace_path}: {len(self.client.frames)} cycles, "
+                    f"{self.client.duration:.1f}s recorded")
+        return True
+
+
+async def replay(trace_path: str, speed: float = 0.0, loop: bool = False,
+                 database: Optional[str] = None) -> Dict[str, Any]:
+    """Run broadcast_live_data against a trace until it ends, return timings
+
+    Results are saved to `database` (a throwaway SQLite file if None).
+    """
+    # Settings must be in place before the DB and websocket modules load
+    temp_db = None
+    if database is None:
+        handle, temp_db = tempfile.mkstemp(prefix="replay_", suffix=".db")
+        os.close(handle)
+        database = temp_db
+    settings.DATABASE_URL = f"sqlite+aiosqlite:///{database}"
+    settings.DATABASE_SYNC_URL = f"sqlite:///{database}"
+    settings.BLACKBOX_ENABLED = False
+    settings.TRACE_CAPTURE = False
+    settings.CAPTURE_JOURNAL = False  # a replayed test is not a real one
+    settings.PLC_CURVE_BUFFER = False  # traces hold DB1-DB4 only
+    settings.WS_UPDATE_INTERVAL = 0.0 if speed <= 0 else settings.WS_UPDATE_INTERVAL / speed
+
+    from db.database import init_db
+    from api import websocket as ws
+    from .command_service import CommandService
+    from .data_service import DataService
+
+    init_db()
+    plc = ReplayPLC(trace_path, speed, loop)
+    plc.start_io()
+    plc.connect()
+    data_service = DataService(plc)
+    # No LiveBus: the broadcast polls itself so step mode serves every cycle once
+    ws.set_services(data_service, CommandService(plc), plc)
+    ws.set_clock(plc.clock)
+
+    completed: List[Dict[str, Any]] = []
+    emit_test_complete = ws.emit_test_complete
+
+    async def record_completion(test_data: dict):
+        completed.append(test_data)
+        await emit_test_complete(test_data)
+
+    ws.emit_test_complete = record_completion
+    started = time.perf_counter()
+    task = asyncio.create_task(ws.broadcast_live_data())
+    try:
+        while not plc.finished and not task.done():
+            await asyncio.sleep(0.005)
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await ws.persistence.stop()
+        ws.emit_test_complete = emit_test_complete
+        plc.stop_io()
+        if temp_db is not None:
+            os.remove(temp_db)
+    elapsed = time.perf_counter() - started
+
+    client = plc.client
+    live = plc.io.get_stats()["operations"].get("get_live_data", {})
+    return {
+        "cycles": len(client.frames),
+        "polls": client.served,
+        "recorded_s": round(client.duration, 3),
+        "elapsed_s": round(elapsed, 3),
+        "speedup": round(client.duration / elapsed, 1) if elapsed > 0 else None,
+        "get_live_data": live,
+        "tests": [
+            {"test_id": t.get("test_id"), **{k: t.get("results", {}).get(k) for k in ("ring_stiffness", "sn_class")}}
+            for t in completed
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded PLC trace through the live pipeline")
+    parser.add_argument("trace", help="trace / black box file")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="N x recorded time (0 = one cycle per poll, as fast as possible)")
+    parser.add_argument("--loop", action="store_true", help="restart at the end (stop with Ctrl+C)")
+    parser.add_argument("--database", help="SQLite file for saved tests (default: throwaway)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    result = asyncio.run(replay(args.trace, args.speed, args.loop, args.database))
+    print(f"Replayed {result['cycles']} cycles ({result['recorded_s']}s recorded) "
+          f"in {result['elapsed_s']}s - {result['speedup']}x real time, {result['polls']} polls")
+    live = result["get_live_data"]
+    if live:
+        print(f"get_live_data: avg {live.get('exec_avg_ms')} ms, max {live.get('exec_max_ms')} ms")
+    for test in result["tests"]:
+        print(f"Test saved: id={test['test_id']} RS={test['ring_stiffness']} SN={test['sn_class']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import logging
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import settings
+from .connector import PLCConnector
+from .read_planner import ReadPlanner
+from .scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+
+class SlowSampler:
+    """Low-rate tier for slow-changing PLC data (CPU state, DB1 parameters)
+
+    The live poll only reads the fast tags; these values are re-read every
+    `interval` seconds, or on the next cycle after invalidate() (a write),
+    as a background job on the PLC I/O thread so the poll never waits for
+    them. The live snapshot merges the last sampled values.
+
+    The sampled image doubles as the DB1 parameter cache: write() patches
+    it and writes the changed tags as one block, and every sample compares
+    the CRC of the image with the cache to notice edits made on the PLC
+    side (HMI panel).
+    """
+
+    def __init__(
+        self,
+        plc: PLCConnector,
+        reader: ReadPlanner,
+        keys: Iterable[str],
+        interval: float = settings.PLC_SLOW_POLL_INTERVAL,
+    ):
+        self.plc = plc
+        self.reader = reader
+        self.keys = tuple(keys)
+        self.interval = interval
+        self.values: Dict[str, Any] = {}
+        self.blocks: Optional[List[bytearray]] = None  # raw image of the last sample
+        self.cpu_state = "unknown"
+        self.sampled_at = 0.0
+        self.samples = 0
+        self.checksum: Optional[int] = None  # CRC32 of the cached image
+        self.external_changes = 0  # image changed without a write from here
+        self.writes = 0
+        self._written = False  # next sample may differ: the PLC derives values from written ones
+        self._dirty = True
+        self._pending = False
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful sample (inf if none)"""
+        return time.monotonic() - self.sampled_at if self.sampled_at else float("inf")
+
+    def due(self) -> bool:
+        return self._dirty or self.age >= self.interval
+
+    def invalidate(self) -> None:
+        """Force a refresh on the next schedule() (call after writing DB1)"""
+        self._dirty = True
+
+    def sample(self) -> bool:
+        """Read the slow tier now (blocking)"""
+        try:
+            plan, blocks = self.reader.read_raw(self.keys)
+            if blocks is None:
+                return False
+            cpu_state = self.plc.get_cpu_state()
+            checksum = self._crc(blocks)
+            if checksum != self.checksum:
+                if self.checksum is not None and not self._written:
+                    self.external_changes += 1
+                    logger.info("Parameters changed on the PLC side, cache refreshed")
+                self.values = self.reader.decode(plan, blocks)
+                self.blocks = blocks
+                self.checksum = checksum
+            self._written = False
+            self.cpu_state = cpu_state
+            self.sampled_at = time.monotonic()
+            self.samples += 1
+            self._dirty = False
+            return True
+        except Exception as e:
+            logger.error(f"Error sampling slow PLC data: {e}")
+            return False
+        finally:
+            self._pending = False
+
+    def schedule(self) -> None:
+        """Refresh in the background if due (at most one job in flight)
+
+        The first sample is taken inline so the first snapshot is complete.
+        """
+        if self._pending or not self.due():
+            return
+        if not self.sampled_at or not self.plc.io.running:
+            self.sample()
+            return
+        self._pending = True
+        self.plc.io.submit("sample_slow", self.sample, level=Priority.BACKGROUND)
+
+    def write(self, values: Dict[str, Any]) -> bool:
+        """Write-through: store the tags whose bytes change
+
+        Only the changed tags' own bytes are written - adjacent ones merged
+        into one block write - never bytes in between from the cached image,
+        which may be up to `interval` old (an HMI edit or a value the PLC
+        derives would be overwritten with the stale copy).
+        """
+        if not values:
+            return True
+        if self.blocks is None or self.due():
+            if not self.sample():
+                return False
+        plan = self.reader.plan(self.keys)
+        tags = [self.reader.tags[key] for key in values]
+        for index, read_range in enumerate(plan):
+            if all(t.db == read_range.db and read_range.start <= t.offset and t.end <= read_range.start + read_range.size
+                   for t in tags):
+                break
+        else:
+            raise ValueError(f"Tags not within one cached block: {list(values)}")
+
+        cached = self.blocks[index]
+        image = bytearray(cached)
+        for tag in tags:
+            tag.pack_into(image, read_range.start, values[tag.key])
+        changed = [t for t in tags
+                   if image[t.offset - read_range.start:t.end - read_range.start]
+                   != cached[t.offset - read_range.start:t.end - read_range.start]]
+        if not changed:
+            return True
+        runs: List[List[int]] = []  # [start, end) of contiguous changed tags
+        for tag in sorted(changed, key=lambda t: t.offset):
+            if runs and tag.offset == runs[-1][1]:
+                runs[-1][1] = tag.end
+            else:
+                runs.append([tag.offset, tag.end])
+        for start, end in runs:
+            data = image[start - read_range.start:end - read_range.start]
+            if not self.plc.write_db_block(read_range.db, start, data):
+                self.invalidate()  # earlier runs may have been written
+                return False
+
+        blocks = list(self.blocks)
+        blocks[index] = image
+        self.values = self.reader.decode(plan, blocks)
+        self.blocks = blocks
+        self.checksum = self._crc(blocks)
+        self.writes += 1
+        # Re-read next cycle for values the PLC derives (deflection_target)
+        self._written = True
+        self.invalidate()
+        return True
+
+    @staticmethod
+    def _crc(blocks: List[bytearray]) -> int:
+        checksum = 0
+        for block in blocks:
+            checksum = zlib.crc32(block, checksum)
+        return checksum
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "interval_ms": int(self.interval * 1000),
+            "age_ms": round(self.age * 1000) if self.sampled_at else None,
+            "samples": self.samples,
+            "writes": self.writes,
+            "external_changes": self.external_changes,
+        }
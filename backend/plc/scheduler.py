@@ -0,0 +1,160 @@
+"""
+PLC request scheduling - priority classes with latency budgets
+
+Priority classes (lower value = served first):
+- SAFETY:     stop, jog release, stop-all-jog, servo disable
+- COMMAND:    operator commands and their prechecks
+- POLL:       the live data poll
+- BACKGROUND: parameter / result reads for persistence, reports
+
+The class of the running code is carried in a thread-local context, so
+every `with plc.lock:` (a PriorityLock) and every queued I/O job is served
+in priority order instead of first-come-first-served. A running snap7
+call is never interrupted, so a SAFETY request waits at most for the one
+PDU exchange already in flight.
+"""
+
+import functools
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Dict, Optional
+
+
+class Priority(IntEnum):
+    SAFETY = 0
+    COMMAND = 1
+    POLL = 2
+    BACKGROUND = 3
+
+
+# Scheduling delay budget per class (seconds): request issued -> PLC lock granted
+DEFAULT_BUDGETS: Dict[Priority, float] = {
+    Priority.SAFETY: 0.015,      # ~ one PDU exchange on an S7-1214C
+    Priority.COMMAND: 0.050,
+    Priority.POLL: 0.020,        # one 50 Hz cycle
+    Priority.BACKGROUND: 0.500,
+}
+
+_context = threading.local()
+
+
+def current_priority() -> Priority:
+    """Priority of the code running on this thread (COMMAND if unset)"""
+    return getattr(_context, "priority", Priority.COMMAND)
+
+
+@contextmanager
+def priority(level: Priority, queued_at: Optional[float] = None):
+    """Run a block at the given priority
+
+    Args:
+        queued_at: perf_counter() when the request was queued, so the first
+            lock acquisition also accounts for the time spent in the queue
+    """
+    previous = current_priority()
+    _context.priority = level
+    if queued_at is not None:
+        _context.queued_at = queued_at
+    try:
+        yield
+    finally:
+        _context.priority = previous
+        if queued_at is not None:
+            _context.queued_at = None
+
+
+def prioritized(level: Priority):
+    """Decorator: run the whole method at the given priority"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with priority(level):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class DeadlineTracker:
+    """Scheduling delay and deadline misses per priority class"""
+
+    def __init__(self, budgets: Optional[Dict[Priority, float]] = None):
+        self.budgets = dict(budgets or DEFAULT_BUDGETS)
+        self._lock = threading.Lock()
+        self._stats = {p: {"count": 0, "misses": 0, "delay_total": 0.0, "delay_max": 0.0} for p in Priority}
+
+    def record(self, level: Priority, delay: float) -> None:
+        with self._lock:
+            stats = self._stats[level]
+            stats["count"] += 1
+            stats["delay_total"] += delay
+            if delay > stats["delay_max"]:
+                stats["delay_max"] = delay
+            if delay > self.budgets[level]:
+                stats["misses"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                p.name.lower(): {
+                    "count": s["count"],
+                    "misses": s["misses"],
+                    "budget_ms": round(self.budgets[p] * 1000, 1),
+                    "delay_avg_ms": round(s["delay_total"] / (s["count"] or 1) * 1000, 3),
+                    "delay_max_ms": round(s["delay_max"] * 1000, 3),
+                }
+                for p, s in self._stats.items()
+            }
+
+
+class PriorityLock:
+    """Mutex granted to the highest-priority waiter (FIFO within a class)
+
+    Drop-in for threading.Lock in `with` statements; the priority comes
+    from the caller's thread context (see priority()).
+    """
+
+    def __init__(self, budgets: Optional[Dict[Priority, float]] = None):
+        self._cond = threading.Condition(threading.Lock())
+        self._held = False
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self.deadlines = DeadlineTracker(budgets)
+
+    def acquire(self) -> bool:
+        level = current_priority()
+        since = getattr(_context, "queued_at", None) or time.perf_counter()
+        _context.queued_at = None  # queue time is only charged once per job
+        with self._cond:
+            if self._held or self._waiters:
+                entry = (level, next(self._seq))
+                heapq.heappush(self._waiters, entry)
+                while self._held or self._waiters[0] is not entry:
+                    self._cond.wait()
+                heapq.heappop(self._waiters)
+            self._held = True
+        self.deadlines.record(level, time.perf_counter() - since)
+        return True
+
+    def release(self) -> None:
+        with self._cond:
+            self._held = False
+            self._cond.notify_all()
+
+    def locked(self) -> bool:
+        return self._held
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.deadlines.get_stats()
+        with self._cond:
+            waiting = len(self._waiters)
+        return {"waiting": waiting, "classes": stats}
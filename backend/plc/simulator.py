@@ -0,0 +1,458 @@
+"""
+S7-1214C simulator - snap7 server exposing DB1..DB4 with a pipe compression model
+
+Serves the exact DB layouts of plc/tags.py and runs a PLC scan cycle that
+reacts to the DB3 command bits (enable, jog, start, stop, reset, home,
+step) and the DB4 tare pulses. Force follows the ISO 9969 ring stiffness
+relation for a configurable pipe stiffness; every S7 request is answered
+after a configurable latency, like a real CPU's communication load.
+During compression, samples are logged to the DB5 ring every 10 ms
+(PLC_CURVE_BUFFER=true on the backend drains them).
+
+Run:
+    python -m plc.simulator --port 1102 --stiffness 5000 --latency 3
+
+Then point the backend at it:
+    PLC_IP=127.0.0.1 PLC_PORT=1102 uvicorn main:socket_app
+"""
+
+import argparse
+import logging
+import random
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import snap7
+from snap7.type import SrvArea
+
+from .curve_buffer import CurveBuffer
+from .tags import TAGS, BOOL, REAL, DB_PARAMS, DB_RESULTS, DB_SERVO, DB_HMI, DB_CURVE
+
+logger = logging.getLogger(__name__)
+
+
+class PipeModel:
+    """Force-deflection model of a GRP pipe ring (ISO 9969)
+
+    S = (0.0186 + 0.025 * y / D) * F / (L * y)
+    solved for F, with S in N/m², L and y in m, F in kN.
+    """
+
+    def __init__(self, stiffness: float = 5000.0, contact_position: float = 80.0, noise: float = 0.002):
+        self.stiffness = stiffness                  # N/m² (SN class value)
+        self.contact_position = contact_position    # mm from home to the pipe crown
+        self.noise = noise                          # kN (1 sigma load cell noise)
+
+    def force(self, position: float, diameter: float, length: float) -> float:
+        """Load on the ring in kN at a given ram position (mm)"""
+        y = position - self.contact_position
+        if y <= 0 or diameter <= 0 or length <= 0:
+            return 0.0
+        return (self.stiffness / 1000.0) * (length / 1000.0) * (y / 1000.0) / (0.0186 + 0.025 * y / diameter)
+
+    @staticmethod
+    def ring_stiffness(force: float, deflection: float, diameter: float, length: float) -> float:
+        """Ring stiffness in kN/m² from force (kN) at deflection (mm)"""
+        if deflection <= 0 or length <= 0 or diameter <= 0:
+            return 0.0
+        return (0.0186 + 0.025 * deflection / diameter) * force / ((length / 1000.0) * (deflection / 1000.0))
+
+
+class LatencyServer(snap7.server.Server):
+    """snap7 server that answers each request after latency ± jitter seconds"""
+
+    def __init__(self, latency: float = 0.003, jitter: float = 0.001, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.jitter = jitter
+
+    def _process_request(self, request_data, client_address):
+        delay = random.gauss(self.latency, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return super()._process_request(request_data, client_address)
+
+
+class PLCSimulator:
+    """Simulated test machine: DB1..DB5 plus the PLC program's state machine"""
+
+    SCAN_TIME = 0.005       # s - PLC cycle
+    DB_SIZES = {
+        DB_PARAMS: 64, DB_RESULTS: 86, DB_SERVO: 40, DB_HMI: 66,
+        DB_CURVE: CurveBuffer.CAPACITY * CurveBuffer.SAMPLE.size,
+    }
+    SN_CLASSES = (630, 1250, 2500, 5000, 10000, 20000, 40000)
+    DATA_POINT_INTERVAL = 0.01  # s - PLC-side recording rate (DB5 sample ring)
+    HOLD_AT_TARGET = 0.5        # s - stage 6 (recording results)
+    LOAD_CELL_CAPACITY = 200.0  # kN at 27648 raw counts
+
+    # Test status (DB2.DBW22) / stage (DB2.DBW72) codes, as shown by the frontend
+    STATUS_IDLE, STATUS_STARTING, STATUS_TESTING, STATUS_AT_TARGET, STATUS_RETURNING, STATUS_COMPLETE = range(6)
+    STAGE_ERROR = 99
+
+    DEFAULT_PARAMS = {
+        "params.pipe_diameter": 500.0, "params.pipe_length": 300.0, "params.deflection_percent": 3.0,
+        "params.test_speed": 12.0, "params.max_stroke": 300.0, "params.max_force": 200000.0,
+        "params.preload_force": 10.0, "params.approach_speed": 50.0, "params.contact_speed": 2.0,
+        "params.return_speed": 300.0, "params.target_sn_class": 2500,
+        "servo.jog_velocity_sp": 50.0, "servo.step_distance": 1.0,
+        "servo.lock_upper": True, "servo.lock_lower": True, "servo.remote_mode": True,
+    }
+
+    def __init__(
+        self,
+        port: int = 1102,
+        model: Optional[PipeModel] = None,
+        latency: float = 0.003,
+        jitter: float = 0.001,
+        time_scale: float = 1.0,
+        scan_time: float = SCAN_TIME,
+    ):
+        self.port = port
+        self.model = model or PipeModel()
+        self.time_scale = time_scale
+        self.scan_time = scan_time
+        self.server = LatencyServer(latency, jitter)
+        self.dbs = {db: bytearray(size) for db, size in self.DB_SIZES.items()}
+        for db, data in self.dbs.items():
+            self.server.register_area(SrvArea.DB, db, data)
+
+        # Machine state (position in mm from home, positive = down)
+        self.position = 0.0
+        self.velocity = 0.0
+        self.force_filtered = 0.0
+        self.force_offset = 0.0
+        self.position_offset = 0.0
+        self.status = self.STATUS_IDLE
+        self.stage = 0
+        self.alarm = 0
+        self.contact = 0.0
+        self.stage_time = 0.0
+        self.record_time = 0.0
+        self.data_points = 0
+        self.samples_logged = 0
+        self.move_target: Optional[float] = None
+        self.step_moving = False
+        self._edges: Dict[str, bool] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        for key, value in self.DEFAULT_PARAMS.items():
+            self._set(key, value)
+
+    # ══════════════════════════════════════════════════════════════════════
+    # DB access (caller holds the area locks)
+    # ══════════════════════════════════════════════════════════════════════
+
+    def _get(self, key: str) -> Any:
+        tag = TAGS[key]
+        data = self.dbs[tag.db]
+        if tag.type == BOOL:
+            return bool(data[tag.offset] >> tag.bit & 1)
+        return struct.unpack_from(">f" if tag.type == REAL else ">h", data, tag.offset)[0]
+
+    def _set(self, key: str, value: Any) -> None:
+        tag = TAGS[key]
+        data = self.dbs[tag.db]
+        if tag.type == BOOL:
+            if value:
+                data[tag.offset] |= 1 << tag.bit
+            else:
+                data[tag.offset] &= ~(1 << tag.bit) & 0xFF
+        elif tag.type == REAL:
+            struct.pack_into(">f", data, tag.offset, float(value))
+        else:
+            struct.pack_into(">h", data, tag.offset, int(value))
+
+    def _rising(self, key: str) -> bool:
+        value = self._get(key)
+        previous = self._edges.get(key, False)
+        self._edges[key] = value
+        return value and not previous
+
+    # ══════════════════════════════════════════════════════════════════════
+    # LIFECYCLE
+    # ══════════════════════════════════════════════════════════════════════
+
+    def start(self) -> None:
+        self.server.start(tcp_port=self.port)
+        self.server.set_cpu_status(8)  # RUN
+        self._running = True
+        self._thread = threading.Thread(target=self._cycle, name="plc-sim", daemon=True)
+        self._thread.start()
+        logger.info(f"PLC simulator listening on port {self.port} "
+                    f"(SN{self.model.stiffness:.0f}, latency {self.server.latency * 1000:.1f} ms)")
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread:
+            self._thread.join(1.0)
+        self.server.stop()
+        logger.info("PLC simulator stopped")
+
+    def _cycle(self) -> None:
+        last = time.monotonic()
+        while self._running:
+            now = time.monotonic()
+            dt = (now - last) * self.time_scale
+            last = now
+            for db in self.dbs:
+                self.server.lock_area(SrvArea.DB, db)
+            try:
+                self.scan(dt)
+            except Exception as e:
+                logger.error(f"Simulator scan error: {e}")
+            finally:
+                for db in self.dbs:
+                    self.server.unlock_area(SrvArea.DB, db)
+            time.sleep(max(0.0, self.scan_time - (time.monotonic() - now)))
+
+    # ══════════════════════════════════════════════════════════════════════
+    # PLC PROGRAM
+    # ══════════════════════════════════════════════════════════════════════
+
+    def scan(self, dt: float) -> None:
+        """One PLC cycle: commands -> motion -> measurements -> status"""
+        diameter = self._get("params.pipe_diameter")
+        length = self._get("params.pipe_length")
+        target = diameter * self._get("params.deflection_percent") / 100.0
+        self._set("params.deflection_target", target)
+
+        enabled = self._get("servo.enable")
+        remote = self._get("servo.remote_mode")
+        safety_ok = self.alarm == 0 or self.alarm == 7
+        motion_allowed = enabled and safety_ok
+        running = self.STATUS_STARTING <= self.status <= self.STATUS_RETURNING
+
+        # Pulse commands
+        if self._rising("servo.stop"):
+            self._halt()
+            if running:
+                self.alarm = 7  # Test stopped
+            running = False
+        if self._rising("servo.reset"):
+            self.alarm = 0
+            self.status, self.stage = self.STATUS_IDLE, 0
+        if self._rising("servo.start_test"):
+            self._set("servo.start_test", False)
+            if motion_allowed and remote and not running:
+                self._start_test()
+        if self._rising("servo.home"):
+            self._set("servo.home", False)
+            if motion_allowed and not running:
+                self.move_target = 0.0
+        for key, direction in (("servo.step_forward", 1.0), ("servo.step_backward", -1.0)):
+            if self._rising(key):
+                self._set(key, False)
+                if motion_allowed and remote and not running:
+                    self.move_target = self.position + direction * self._get("servo.step_distance")
+                    self.step_moving = True
+                    self._set("servo.step_done", False)
+        if self._get("hmi.tare_loadcell"):
+            self._set("hmi.tare_loadcell", False)
+            self.force_offset = self.model.force(self.position, diameter, length)
+        if self._get("hmi.tare_position"):
+            self._set("hmi.tare_position", False)
+            self.position_offset = self.position
+
+        # Motion
+        if not motion_allowed:
+            self._halt()
+        elif running:
+            self._run_test(dt, target, diameter, length)
+        elif self.move_target is not None:
+            speed = self._get("servo.jog_velocity_sp") if self.step_moving else self._get("params.return_speed")
+            self._move_towards(self.move_target, speed, dt)
+            if self.position == self.move_target:
+                self.move_target = None
+                if self.step_moving:
+                    self.step_moving = False
+                    self._set("servo.step_done", True)
+        elif remote and self._get("servo.jog_forward") != self._get("servo.jog_backward"):
+            direction = 1.0 if self._get("servo.jog_forward") else -1.0
+            self.velocity = direction * self._get("servo.jog_velocity_sp")
+        else:
+            self.velocity = 0.0
+
+        max_stroke = self._get("params.max_stroke")
+        self.position = min(max(self.position + self.velocity / 60.0 * dt, 0.0), max_stroke)
+
+        # Measurements
+        force = self.model.force(self.position, diameter, length)
+        if force * 1000.0 > self._get("params.max_force"):
+            self.alarm = 5  # Max force exceeded
+            self.status, self.stage = self.STATUS_IDLE, self.STAGE_ERROR
+            self._halt()
+        measured = force - self.force_offset + random.gauss(0.0, self.model.noise)
+        self.force_filtered += (measured - self.force_filtered) * min(1.0, dt / 0.02)
+        position = self.position - self.position_offset
+        self._set("results.force_kn", measured)
+        self._set("results.actual_force", measured * 1000.0)
+        self._set("results.load_cell_actual", measured)
+        self._set("results.load_cell_raw", measured / self.LOAD_CELL_CAPACITY * 27648.0)
+        self._set("results.force_filtered", self.force_filtered)
+        self._set("results.position_actual", position)
+        self._set("results.position_raw", position * 1000.0)
+        self._set("servo.actual_position", position)
+        self._set("servo.actual_speed", abs(self.velocity))
+
+        deflection = max(0.0, self.position - self.contact) if self._get("results.preload_reached") else 0.0
+        self._set("results.actual_deflection", deflection)
+        self._set("results.deflection_percent", deflection / diameter * 100.0 if diameter else 0.0)
+
+        # Status bits
+        at_home = self.position <= 0.01
+        self._set("servo.servo_ready", enabled and self.alarm != 2)
+        self._set("servo.servo_error", self.alarm == 2)
+        self._set("servo.at_home", at_home)
+        self._set("servo.mc_power", enabled)
+        self._set("servo.mc_busy", self.velocity != 0.0)
+        self._set("servo.mc_error", False)
+        self._set("servo.estop_active", False)
+        self._set("servo.upper_limit", at_home)
+        self._set("servo.lower_limit", self.position >= max_stroke)
+        self._set("servo.home_position", at_home)
+        self._set("servo.safety_ok", safety_ok)
+        self._set("servo.motion_allowed", motion_allowed)
+        self._set("servo.mode_change_ok", not running)
+        self._set("servo.step_active", self.step_moving)
+        self._set("results.test_status", self.status)
+        self._set("results.test_stage", self.stage)
+        self._set("results.data_point_count", self.data_points)
+        self._set("hmi.alarm_active", self.alarm != 0)
+        self._set("hmi.alarm_code", self.alarm)
+        self._set("hmi.lamp_ready", enabled and not running and self.alarm == 0)
+        self._set("hmi.lamp_running", running)
+        self._set("hmi.lamp_error", self.alarm not in (0, 7))
+
+    def _start_test(self) -> None:
+        self.alarm = 0
+        self.status, self.stage = self.STATUS_STARTING, 1
+        self.stage_time = self.record_time = 0.0
+        self.data_points = self.samples_logged = 0
+        self.contact = 0.0
+        for key in ("results.preload_reached", "results.test_passed", "results.recording_active"):
+            self._set(key, False)
+        for key in ("results.force_at_target", "results.ring_stiffness", "results.contact_position"):
+            self._set(key, 0.0)
+        self._set("results.sn_class", 0)
+        self._set("hmi.test_progress", 0)
+
+    def _run_test(self, dt: float, target: float, diameter: float, length: float) -> None:
+        """Test sequence, stages 1..8 (status 1 starting .. 5 complete)"""
+        self.stage_time += dt
+        if self.stage == 1:
+            self.stage = 2
+        if self.stage == 2:                                   # move home
+            self._move_towards(0.0, self._get("params.return_speed"), dt)
+            if self.position == 0.0:
+                self.stage = 3
+        elif self.stage == 3:                                 # approach sample
+            self.velocity = self._get("params.approach_speed")
+            if self.position >= self.model.contact_position - 2.0:
+                self.stage = 4
+        elif self.stage == 4:                                 # establish contact (preload)
+            self.velocity = self._get("params.contact_speed")
+            if self.model.force(self.position, diameter, length) * 1000.0 >= self._get("params.preload_force"):
+                self.contact = self.position
+                self._set("results.preload_reached", True)
+                self._set("results.contact_position", self.contact)
+                self._set("results.recording_active", True)
+                self.status, self.stage = self.STATUS_TESTING, 5
+        elif self.stage == 5:                                 # compression at test speed
+            self.velocity = self._get("params.test_speed")
+            deflection = self.position - self.contact
+            self.record_time += dt
+            while self.record_time >= self.DATA_POINT_INTERVAL:
+                self.record_time -= self.DATA_POINT_INTERVAL
+                self._log_sample(diameter, length)
+            self._set("hmi.test_progress", int(min(100.0, deflection / target * 100.0)) if target else 0)
+            if deflection >= target:
+                self._finish_compression(target, diameter, length)
+        elif self.stage == 6:                                 # recording results
+            self.velocity = 0.0
+            if self.stage_time >= self.HOLD_AT_TARGET:
+                self.status, self.stage = self.STATUS_RETURNING, 7
+        elif self.stage == 7:                                 # return home
+            self._move_towards(0.0, self._get("params.return_speed"), dt)
+            if self.position == 0.0:
+                self.status, self.stage = self.STATUS_COMPLETE, 8
+
+    def _log_sample(self, diameter: float, length: float) -> None:
+        """Write the next DB5 ring slot, then advance the count (INT, wraps)"""
+        force = self.model.force(self.position, diameter, length) - self.force_offset
+        force += random.gauss(0.0, self.model.noise)
+        slot = self.data_points % CurveBuffer.CAPACITY
+        CurveBuffer.SAMPLE.pack_into(
+            self.dbs[DB_CURVE], slot * CurveBuffer.SAMPLE.size,
+            self.samples_logged * self.DATA_POINT_INTERVAL, force,
+            self.position - self.contact, self.position - self.position_offset,
+        )
+        self.samples_logged += 1
+        self.data_points = (self.data_points + 1) & CurveBuffer.COUNTER_MASK
+
+    def _finish_compression(self, target: float, diameter: float, length: float) -> None:
+        force = self.model.force(self.contact + target, diameter, length)
+        stiffness = self.model.ring_stiffness(force, target, diameter, length)
+        sn_class = max((sn for sn in self.SN_CLASSES if sn <= stiffness * 1000.0), default=0)
+        self._set("results.force_at_target", force)
+        self._set("results.ring_stiffness", stiffness)
+        self._set("results.sn_class", sn_class)
+        self._set("results.test_passed", sn_class >= self._get("params.target_sn_class"))
+        self._set("results.recording_active", False)
+        self._set("hmi.test_progress", 100)
+        self.velocity = 0.0
+        self.status, self.stage = self.STATUS_AT_TARGET, 6
+        self.stage_time = 0.0
+
+    def _move_towards(self, target: float, speed: float, dt: float) -> None:
+        """Set velocity towards target; snaps onto it in the last cycle"""
+        step = speed / 60.0 * dt
+        if abs(target - self.position) <= step:
+            self.position = target
+            self.velocity = 0.0
+        else:
+            self.velocity = speed if target > self.position else -speed
+
+    def _halt(self) -> None:
+        self.velocity = 0.0
+        self.move_target = None
+        self.step_moving = False
+        if self.STATUS_STARTING <= self.status <= self.STATUS_RETURNING:
+            self.status, self.stage = self.STATUS_IDLE, 0
+            self._set("results.recording_active", False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="S7-1214C test machine simulator")
+    parser.add_argument("--port", type=int, default=1102, help="ISO-on-TCP port (102 needs root)")
+    parser.add_argument("--stiffness", type=float, default=5000.0, help="pipe ring stiffness in N/m²")
+    parser.add_argument("--contact", type=float, default=80.0, help="pipe crown position in mm from home")
+    parser.add_argument("--noise", type=float, default=0.002, help="load cell noise in kN (1 sigma)")
+    parser.add_argument("--latency", type=float, default=3.0, help="response latency in ms")
+    parser.add_argument("--jitter", type=float, default=1.0, help="response latency jitter in ms")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="run the machine N times faster")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    simulator = PLCSimulator(
+        port=args.port,
+        model=PipeModel(args.stiffness, args.contact, args.noise),
+        latency=args.latency / 1000.0,
+        jitter=args.jitter / 1000.0,
+        time_scale=args.time_scale,
+    )
+    simulator.start()
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import asyncio
+import inspect
+import logging
+import random
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+from .connector import PLCConnector
+from .scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+
+class LinkState(str, Enum):
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+
+
+class ConnectionSupervisor:
+    """Keeps the PLC links (poll + command) connected
+
+    Links report their health as a cached flag (PLCConnector.connected);
+    an idle link is probed with a heartbeat every PLC_HEARTBEAT_INTERVAL.
+
+    Runs as an asyncio task; connect attempts execute in a worker thread
+    and are bounded by PLC_CONNECT_TIMEOUT, so the event loop never blocks
+    on a dead PLC. Failed attempts back off exponentially
+    (PLC_RECONNECT_MIN .. PLC_RECONNECT_MAX) with jitter, so several
+    clients restarting together do not hammer the CPU in lockstep.
+
+    Every state change is published to listeners as
+    listener(link_name, old_state, new_state); async listeners are awaited.
+    """
+
+    CHECK_INTERVAL = 0.5  # seconds between link state checks
+
+    def __init__(
+        self,
+        plc: PLCConnector,
+        backoff_min: float = settings.PLC_RECONNECT_MIN,
+        backoff_max: float = settings.PLC_RECONNECT_MAX,
+    ):
+        self.plc = plc
+        self.links: List[PLCConnector] = [plc] if plc.commands is plc else [plc, plc.commands]
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self._state: Dict[str, LinkState] = {link.name: LinkState.DISCONNECTED for link in self.links}
+        self._backoff: Dict[str, float] = {link.name: backoff_min for link in self.links}
+        self._next_attempt: Dict[str, float] = {link.name: 0.0 for link in self.links}
+        self._attempts: Dict[str, int] = {link.name: 0 for link in self.links}
+        self._failures: Dict[str, int] = {link.name: 0 for link in self.links}
+        self._listeners: List[Callable] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._cycle_done: Optional[asyncio.Event] = None
+        self._cycles = 0
+
+    @property
+    def state(self) -> LinkState:
+        """State of the poll link (the one the UI reports)"""
+        return self._state[self.plc.name]
+
+    def add_listener(self, listener: Callable) -> None:
+        """Register listener(link_name, old_state, new_state)"""
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        """Start the supervisor task (idempotent, needs a running loop)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._cycle_done = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("PLC connection supervisor started")
+
+    async def stop(self) -> None:
+        if self._task is None or self._task.done():
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        logger.info("PLC connection supervisor stopped")
+
+    async def reconnect(self, timeout: float = settings.PLC_CONNECT_TIMEOUT + 1.0) -> bool:
+        """Drop the links and reconnect now, waiting at most `timeout` seconds"""
+        await asyncio.to_thread(self.plc.disconnect)
+        for link in self.links:
+            self._backoff[link.name] = self.backoff_min
+            self._next_attempt[link.name] = 0.0
+        if self._task is None or self._task.done():
+            return await asyncio.to_thread(self.plc.connect)
+        # The cycle in progress may predate the disconnect: wait for the next one
+        target = self._cycles + 2
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._wait_cycles(target), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.plc.connected
+
+    async def _wait_cycles(self, target: int) -> None:
+        while self._cycles < target:
+            self._cycle_done.clear()
+            await self._cycle_done.wait()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                for link in self.links:
+                    await self._supervise(link)
+            except Exception as e:
+                logger.error(f"Connection supervisor error: {e}")
+            self._cycles += 1
+            self._cycle_done.set()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _supervise(self, link: PLCConnector) -> None:
+        name = link.name
+        if link.connected and link.heartbeat_due():
+            await link.run("heartbeat", link.heartbeat, level=Priority.BACKGROUND)
+        if link.connected:
+            await self._set_state(link, LinkState.CONNECTED)
+            self._backoff[name] = self.backoff_min
+            return
+        if time.monotonic() < self._next_attempt[name]:
+            await self._set_state(link, LinkState.DISCONNECTED)
+            return
+
+        await self._set_state(link, LinkState.CONNECTING)
+        self._attempts[name] += 1
+        if await asyncio.to_thread(link._connect_link):
+            self._backoff[name] = self.backoff_min
+            await self._set_state(link, LinkState.CONNECTED)
+            return
+
+        # Equal jitter: half the delay fixed, half random
+        self._failures[name] += 1
+        delay = self._backoff[name]
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        self._next_attempt[name] = time.monotonic() + delay
+        self._backoff[name] = min(self._backoff[name] * 2, self.backoff_max)
+        logger.info(f"PLC link [{name}] reconnect failed, next attempt in {delay:.1f}s")
+        await self._set_state(link, LinkState.DISCONNECTED)
+
+    async def _set_state(self, link: PLCConnector, new: LinkState) -> None:
+        old = self._state[link.name]
+        if old == new:
+            return
+        self._state[link.name] = new
+        logger.info(f"PLC link [{link.name}] {old.value} -> {new.value}")
+        for listener in self._listeners:
+            try:
+                result = listener(link.name, old, new)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Connection state listener error: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            name: {
+                "state": state.value,
+                "attempts": self._attempts[name],
+                "failures": self._failures[name],
+                "next_attempt_in": round(max(0.0, self._next_attempt[name] - now), 1)
+                if state != LinkState.CONNECTED else 0.0,
+            }
+            for name, state in self._state.items()
+        }
@@ -0,0 +1,294 @@
+"""
+PLC Tag Map - single source of truth for DB1..DB4 addresses
+
+Each tag is declared once as (key, DB, offset, type, bit). At import time
+the table is compiled into big-endian struct.Struct decoders, so a whole
+block is decoded with one unpack_from() plus bit masks for the Bools.
+"""
+
+import struct
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+# DB Numbers
+DB_PARAMS = 1    # DB1 - Test Parameters (Read/Write)
+DB_RESULTS = 2   # DB2 - Test Results
+DB_SERVO = 3     # DB3 - Servo Control (commands + status)
+DB_HMI = 4       # DB4 - HMI Interface
+DB_CURVE = 5     # DB5 - Curve sample ring (optional, see plc/curve_buffer.py)
+
+# Tag types
+REAL = "real"    # 4 bytes, IEEE float
+INT = "int"      # 2 bytes, signed
+BOOL = "bool"    # 1 bit
+
+_FORMATS = {REAL: "f", INT: "h"}
+_SIZES = {REAL: 4, INT: 2, BOOL: 1}
+
+
+class Tag(NamedTuple):
+    key: str        # "<block>.<field>", e.g. "servo.enable"
+    db: int
+    offset: int     # byte offset
+    type: str
+    bit: int = 0
+
+    @property
+    def field(self) -> str:
+        return self.key.split(".", 1)[1]
+
+    @property
+    def size(self) -> int:
+        return _SIZES[self.type]
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+    def pack_into(self, buffer: bytearray, base: int, value: Any) -> None:
+        """Encode value into a buffer whose first byte is DB offset `base`"""
+        position = self.offset - base
+        if self.type == BOOL:
+            mask = 1 << self.bit
+            buffer[position] = buffer[position] | mask if value else buffer[position] & ~mask
+        elif self.type == INT:
+            struct.pack_into(">h", buffer, position, int(value))
+        else:
+            struct.pack_into(">f", buffer, position, float(value))
+
+    @property
+    def address(self) -> str:
+        """Siemens notation, e.g. DB3.DBX0.0 / DB2.DBD42 / DB2.DBW22"""
+        if self.type == BOOL:
+            return f"DB{self.db}.DBX{self.offset}.{self.bit}"
+        kind = "DBD" if self.type == REAL else "DBW"
+        return f"DB{self.db}.{kind}{self.offset}"
+
+
+TAG_TABLE: List[Tag] = [
+    # ═══════════════════════════════════════════════════════════════════
+    # DB1 - TEST PARAMETERS
+    # ═══════════════════════════════════════════════════════════════════
+    Tag("params.pipe_diameter", DB_PARAMS, 0, REAL),
+    Tag("params.pipe_length", DB_PARAMS, 4, REAL),
+    Tag("params.deflection_percent", DB_PARAMS, 8, REAL),
+    Tag("params.deflection_target", DB_PARAMS, 12, REAL),
+    Tag("params.test_speed", DB_PARAMS, 16, REAL),
+    Tag("params.max_stroke", DB_PARAMS, 20, REAL),
+    Tag("params.max_force", DB_PARAMS, 24, REAL),
+    Tag("params.preload_force", DB_PARAMS, 38, REAL),
+    Tag("params.approach_speed", DB_PARAMS, 42, REAL),
+    Tag("params.contact_speed", DB_PARAMS, 46, REAL),
+    Tag("params.return_speed", DB_PARAMS, 50, REAL),
+    Tag("params.target_sn_class", DB_PARAMS, 58, INT),       # Target SN class for pass/fail
+
+    # ═══════════════════════════════════════════════════════════════════
+    # DB2 - TEST RESULTS
+    # ═══════════════════════════════════════════════════════════════════
+    Tag("results.actual_force", DB_RESULTS, 0, REAL),
+    Tag("results.actual_deflection", DB_RESULTS, 4, REAL),
+    Tag("results.deflection_percent", DB_RESULTS, 8, REAL),
+    Tag("results.force_at_target", DB_RESULTS, 12, REAL),
+    Tag("results.ring_stiffness", DB_RESULTS, 16, REAL),
+    Tag("results.sn_class", DB_RESULTS, 20, INT),
+    Tag("results.test_status", DB_RESULTS, 22, INT),
+    Tag("results.test_passed", DB_RESULTS, 24, BOOL, 0),
+    Tag("results.force_filtered", DB_RESULTS, 34, REAL),
+    Tag("results.force_kn", DB_RESULTS, 42, REAL),
+    Tag("results.load_cell_raw", DB_RESULTS, 46, REAL),
+    Tag("results.load_cell_actual", DB_RESULTS, 54, REAL),
+    Tag("results.tare_command", DB_RESULTS, 58, BOOL, 0),
+    Tag("results.position_raw", DB_RESULTS, 60, REAL),
+    Tag("results.position_actual", DB_RESULTS, 68, REAL),
+    Tag("results.test_stage", DB_RESULTS, 72, INT),
+    Tag("results.preload_reached", DB_RESULTS, 74, BOOL, 0),
+    Tag("results.contact_position", DB_RESULTS, 76, REAL),
+    Tag("results.data_point_count", DB_RESULTS, 80, INT),
+    Tag("results.recording_active", DB_RESULTS, 82, BOOL, 0),
+
+    # ═══════════════════════════════════════════════════════════════════
+    # DB3 - SERVO CONTROL (Byte 0 = motion commands, PLC reads these)
+    # ═══════════════════════════════════════════════════════════════════
+    Tag("servo.enable", DB_SERVO, 0, BOOL, 0),                # Enable Servo
+    Tag("servo.jog_forward", DB_SERVO, 0, BOOL, 1),           # Jog Forward (down)
+    Tag("servo.jog_backward", DB_SERVO, 0, BOOL, 2),          # Jog Backward (up)
+    Tag("servo.start_test", DB_SERVO, 0, BOOL, 3),            # Start Test
+    Tag("servo.stop", DB_SERVO, 0, BOOL, 4),                  # Stop
+    Tag("servo.reset", DB_SERVO, 0, BOOL, 5),                 # Reset
+    Tag("servo.home", DB_SERVO, 0, BOOL, 6),                  # Home
+    Tag("servo.servo_ready", DB_SERVO, 0, BOOL, 7),
+    Tag("servo.servo_error", DB_SERVO, 1, BOOL, 0),
+    Tag("servo.at_home", DB_SERVO, 1, BOOL, 1),
+    Tag("servo.actual_position", DB_SERVO, 2, REAL),
+    Tag("servo.actual_speed", DB_SERVO, 10, REAL),
+    Tag("servo.lock_upper", DB_SERVO, 14, BOOL, 0),           # Clamps - disabled in PLC (always True)
+    Tag("servo.lock_lower", DB_SERVO, 14, BOOL, 1),
+    Tag("servo.mc_power", DB_SERVO, 20, BOOL, 0),
+    Tag("servo.mc_busy", DB_SERVO, 20, BOOL, 1),
+    Tag("servo.mc_error", DB_SERVO, 20, BOOL, 2),
+    Tag("servo.remote_mode", DB_SERVO, 25, BOOL, 0),          # Remote Mode (R/W)
+    Tag("servo.estop_active", DB_SERVO, 25, BOOL, 1),
+    Tag("servo.upper_limit", DB_SERVO, 25, BOOL, 2),
+    Tag("servo.lower_limit", DB_SERVO, 25, BOOL, 3),
+    Tag("servo.home_position", DB_SERVO, 25, BOOL, 4),
+    Tag("servo.safety_ok", DB_SERVO, 25, BOOL, 5),
+    Tag("servo.motion_allowed", DB_SERVO, 25, BOOL, 6),
+    Tag("servo.jog_velocity_sp", DB_SERVO, 26, REAL),         # Jog Speed (mm/min)
+    Tag("servo.mode_change_ok", DB_SERVO, 30, BOOL, 0),
+    Tag("servo.step_distance", DB_SERVO, 32, REAL),
+    Tag("servo.step_forward", DB_SERVO, 36, BOOL, 0),
+    Tag("servo.step_backward", DB_SERVO, 36, BOOL, 1),
+    Tag("servo.step_active", DB_SERVO, 36, BOOL, 2),
+    Tag("servo.step_done", DB_SERVO, 36, BOOL, 3),
+
+    # ═══════════════════════════════════════════════════════════════════
+    # DB4 - HMI INTERFACE
+    # ═══════════════════════════════════════════════════════════════════
+    Tag("hmi.alarm_active", DB_HMI, 2, BOOL, 2),
+    Tag("hmi.alarm_code", DB_HMI, 4, INT),
+    Tag("hmi.lamp_ready", DB_HMI, 59, BOOL, 3),
+    Tag("hmi.lamp_running", DB_HMI, 59, BOOL, 4),
+    Tag("hmi.lamp_error", DB_HMI, 59, BOOL, 5),
+    Tag("hmi.tare_loadcell", DB_HMI, 59, BOOL, 6),            # Tare_LoadCell (pulse)
+    Tag("hmi.tare_position", DB_HMI, 59, BOOL, 7),            # Zero position (pulse)
+    Tag("hmi.test_progress", DB_HMI, 62, INT),
+]
+
+
+# Bytes holding command bits written by the backend (shadowed for bit writes)
+COMMAND_BYTES: List[Tuple[int, int]] = [
+    (DB_SERVO, 0),    # enable / jog / start / stop / reset / home
+    (DB_SERVO, 14),   # clamps
+    (DB_SERVO, 25),   # remote mode
+    (DB_SERVO, 36),   # step forward / backward
+    (DB_HMI, 59),     # tare load cell / zero position
+]
+
+# Pulse (edge-triggered) command bits in those bytes, as (db, byte, bit).
+# Never taken over from the shadow or a read into another bit write: that
+# would write a pulse still pending in the PLC back to 1, a new rising edge.
+PULSE_BITS: List[Tuple[int, int, int]] = [
+    (DB_SERVO, 0, 3),   # start test
+    (DB_SERVO, 0, 4),   # stop
+    (DB_SERVO, 0, 5),   # reset
+    (DB_SERVO, 0, 6),   # home
+    (DB_SERVO, 36, 0),  # step forward
+    (DB_SERVO, 36, 1),  # step backward
+    (DB_HMI, 59, 6),    # tare load cell
+    (DB_HMI, 59, 7),    # zero position
+]
+
+
+class BlockDecoder:
+    """Precompiled decoder for a set of tags within one DB
+
+    Numeric tags and every byte holding Bool tags are laid out in a single
+    big-endian struct (gaps become pad bytes), so decode() costs one
+    unpack_from() and one mask per Bool.
+    """
+
+    def __init__(self, tags: Iterable[Tag], full_keys: bool = False):
+        tags = list(tags)
+        if not tags:
+            raise ValueError("BlockDecoder needs at least one tag")
+        dbs = {t.db for t in tags}
+        if len(dbs) != 1:
+            raise ValueError(f"Tags span several DBs: {sorted(dbs)}")
+        self.db = dbs.pop()
+        self.tags = tags
+
+        # One struct slot per numeric tag and per Bool byte
+        slots: Dict[int, Tuple[str, int]] = {}
+        for t in tags:
+            if t.type == BOOL:
+                slots.setdefault(t.offset, ("B", 1))
+            else:
+                if t.offset in slots:
+                    raise ValueError(f"Overlapping tag {t.key} at {t.address}")
+                slots[t.offset] = (_FORMATS[t.type], t.size)
+
+        fmt = [">"]
+        slot_index: Dict[int, int] = {}
+        position = self.start = min(slots)
+        for index, offset in enumerate(sorted(slots)):
+            if offset < position:
+                raise ValueError(f"Overlapping tags at DB{self.db}.{offset}")
+            code, size = slots[offset]
+            if offset > position:
+                fmt.append(f"{offset - position}x")
+            fmt.append(code)
+            slot_index[offset] = index
+            position = offset + size
+
+        self.struct = struct.Struct("".join(fmt))
+        self.end = position
+        self.size = self.end - self.start
+
+        # Output names: "field" within one block, or full "block.field" keys
+        name = (lambda t: t.key) if full_keys else (lambda t: t.field)
+        numeric = [t for t in tags if t.type != BOOL]
+        self._numeric_fields = [name(t) for t in numeric]
+        self._numeric_getter = _tuple_getter([slot_index[t.offset] for t in numeric])
+        self._bits = [(name(t), slot_index[t.offset], 1 << t.bit) for t in tags if t.type == BOOL]
+
+    def decode(self, data: bytes, base: int = 0) -> Dict[str, Any]:
+        """Decode tags from a buffer whose first byte is DB offset `base`"""
+        values = self.struct.unpack_from(data, self.start - base)
+        out = dict(zip(self._numeric_fields, self._numeric_getter(values)))
+        out.update({field: bool(values[index] & mask) for field, index, mask in self._bits})
+        return out
+
+
+def _tuple_getter(indexes: List[int]):
+    """itemgetter that always returns a tuple (even for 0 or 1 index)"""
+    if not indexes:
+        return lambda values: ()
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda values: (values[index],)
+    return itemgetter(*indexes)
+
+
+class TagMap:
+    """Lookup and compiled decoders over TAG_TABLE"""
+
+    def __init__(self, tags: Iterable[Tag]):
+        self._tags: Dict[str, Tag] = {}
+        for t in tags:
+            if t.key in self._tags:
+                raise ValueError(f"Duplicate tag {t.key}")
+            self._tags[t.key] = t
+        self._decoders: Dict[Tuple[Tuple[str, ...], bool], BlockDecoder] = {}
+
+    def __getitem__(self, key: str) -> Tag:
+        return self._tags[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._tags
+
+    def bit(self, key: str) -> Tuple[int, int]:
+        """(byte, bit) of a Bool tag"""
+        t = self._tags[key]
+        return t.offset, t.bit
+
+    def offset(self, key: str) -> int:
+        return self._tags[key].offset
+
+    def block_tags(self, db: int) -> List[Tag]:
+        return [t for t in self._tags.values() if t.db == db]
+
+    def decoder(self, keys: Iterable[str], full_keys: bool = False) -> BlockDecoder:
+        """Compiled decoder for the given tags (cached)"""
+        keys = tuple(keys)
+        decoder = self._decoders.get((keys, full_keys))
+        if decoder is None:
+            decoder = BlockDecoder((self._tags[k] for k in keys), full_keys)
+            self._decoders[(keys, full_keys)] = decoder
+        return decoder
+
+    def block_decoder(self, db: int) -> BlockDecoder:
+        """Compiled decoder for every tag in a DB"""
+        return self.decoder(t.key for t in self.block_tags(db))
+
+
+TAGS = TagMap(TAG_TABLE)
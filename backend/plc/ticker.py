@@ -0,0 +1,76 @@
+import asyncio
+import bisect
+import time
+from typing import Any, Dict, Optional
+
+
+class Ticker:
+    """Fixed-rate ticks scheduled against absolute monotonic deadlines
+
+    Tick n is due at start + n * interval, whatever the work between ticks
+    took, so the period does not drift by the work time. A wait() entered
+    after its deadline is an overrun: the tick fires immediately, and
+    when more than one whole interval was missed the missed ticks are
+    dropped (counted in `skipped`) instead of fired back to back.
+
+    The lateness of every wake-up (wake time - deadline) is collected in a
+    histogram: on a tick that was not overrun it is the event loop lag.
+    """
+
+    BUCKETS_MS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0)  # upper bounds, last bucket is "more"
+
+    def __init__(self, interval: float, name: str = "ticker"):
+        self.interval = interval
+        self.name = name
+        self.deadline: Optional[float] = None  # scheduled time of the last tick
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.lag_max = 0.0
+        self.lag_total = 0.0
+        self.histogram = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def reset(self) -> None:
+        """Restart the schedule at the next wait()"""
+        self.deadline = None
+
+    async def wait(self) -> float:
+        """Sleep until the next tick, return its scheduled (monotonic) time"""
+        now = time.monotonic()
+        if self.deadline is None:
+            deadline = now
+        else:
+            deadline = self.deadline + self.interval
+            if now > deadline:
+                self.overruns += 1
+                missed = int((now - deadline) / self.interval) if self.interval > 0 else 0
+                if missed:
+                    self.skipped += missed
+                    deadline += missed * self.interval
+        if deadline > now:
+            await asyncio.sleep(deadline - now)
+        else:
+            await asyncio.sleep(0)
+        self._record(time.monotonic() - deadline)
+        self.deadline = deadline
+        self.ticks += 1
+        return deadline
+
+    def _record(self, lag: float) -> None:
+        lag_ms = lag * 1000
+        self.histogram[bisect.bisect_left(self.BUCKETS_MS, lag_ms)] += 1
+        self.lag_total += lag
+        if lag > self.lag_max:
+            self.lag_max = lag
+
+    def get_stats(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}ms" for b in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]:g}ms"]
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "lag_avg_ms": round(self.lag_total / self.ticks * 1000, 3) if self.ticks else 0.0,
+            "lag_max_ms": round(self.lag_max * 1000, 3),
+            "lag_histogram": dict(zip(labels, self.histogram)),
+        }
@@ -7,6 +7,7 @@ from typing import List
 import logging
 
 from db.models import Test
+from db.curves import curve_columns
 
 logger = logging.getLogger(__name__)
 
@@ -200,7 +201,8 @@ class ExcelExporter:
         ws_info.column_dimensions['B'].width = 20
 
         # Data points sheet
-        if test.data_points:
+        curve = curve_columns(test)
+        if len(curve["timestamp"]):
             ws_data = wb.create_sheet("Data Points")
 
             headers = ['Time (s)', f'Force ({fu})', 'Deflection (mm)', 'Position (mm)']
@@ -210,11 +212,13 @@ class ExcelExporter:
                 cell.fill = self.header_fill
                 cell.alignment = self.center_align
 
-            for row_num, dp in enumerate(sorted(test.data_points, key=lambda x: x.timestamp), 2):
-                ws_data.cell(row=row_num, column=1, value=round(dp.timestamp, 3))
-                ws_data.cell(row=row_num, column=2, value=self._convert_force(dp.force, force_unit))
-                ws_data.cell(row=row_num, column=3, value=round(dp.deflection, 3))
-                ws_data.cell(row=row_num, column=4, value=round(dp.position, 3) if dp.position else '')
+            # Stored in capture (= time) order
+            samples = zip(curve["timestamp"], curve["force"], curve["deflection"], curve["position"])
+            for row_num, (timestamp, force, deflection, position) in enumerate(samples, 2):
+                ws_data.cell(row=row_num, column=1, value=round(timestamp, 3))
+                ws_data.cell(row=row_num, column=2, value=self._convert_force(force, force_unit))
+                ws_data.cell(row=row_num, column=3, value=round(deflection, 3))
+                ws_data.cell(row=row_num, column=4, value=round(position, 3) if position else '')
 
             for col in range(1, 5):
                 ws_data.column_dimensions[get_column_letter(col)].width = 15
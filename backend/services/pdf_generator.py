@@ -8,10 +8,12 @@ from reportlab.graphics.charts.lineplots import LinePlot
 from reportlab.graphics.widgets.markers import makeMarker
 from io import BytesIO
 from datetime import datetime
-from typing import List, Optional
+from array import array
+from typing import Dict, Optional
 import logging
 
-from db.models import Test, TestDataPoint
+from db.models import Test
+from db.curves import curve_columns
 
 logger = logging.getLogger(__name__)
 
@@ -213,9 +215,10 @@ class PDFGenerator:
         story.append(Spacer(1, 20))
 
         # Force-Deflection Chart (if data points available)
-        if test.data_points and len(test.data_points) > 1:
+        curve = curve_columns(test)
+        if len(curve["force"]) > 1:
             story.append(Paragraph("Force-Deflection Curve", self.styles['Heading_Custom']))
-            chart = self._create_chart(test.data_points)
+            chart = self._create_chart(curve)
             story.append(chart)
             story.append(Spacer(1, 12))
 
@@ -229,12 +232,12 @@ class PDFGenerator:
         buffer.seek(0)
         return buffer.read()
 
-    def _create_chart(self, data_points: List[TestDataPoint]) -> Drawing:
+    def _create_chart(self, curve: Dict[str, array]) -> Drawing:
         """Create force-deflection chart"""
         drawing = Drawing(450, 250)
 
         # Prepare data
-        data = [(dp.deflection, dp.force) for dp in sorted(data_points, key=lambda x: x.deflection)]
+        data = sorted(zip(curve["deflection"], curve["force"]))
 
         if not data:
             return drawing
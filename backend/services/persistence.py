@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PersistenceWorker:
+    """Single background writer fed through a bounded queue
+
+    Producers (the live broadcast loop) hand over an immutable capture with
+    submit() and carry on; the worker runs `handler` on one item at a time,
+    in submission order. A full queue makes submit() wait (backpressure)
+    rather than drop a result.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        maxsize: int = settings.PERSIST_QUEUE_SIZE,
+        name: str = "persistence",
+    ):
+        self.handler = handler
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the worker task (idempotent, needs a running loop)"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"{self.name} worker started (queue {self.queue.maxsize})")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Finish the queued items (up to `timeout`), then stop"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{self.name} worker stopped with {self.queue.qsize()} items unsaved")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        logger.info(f"{self.name} worker stopped")
+
+    async def submit(self, item: Any) -> None:
+        """Queue an item for the worker (waits only if the queue is full)"""
+        if not self.running:
+            self.start()
+        if self.queue.full():
+            logger.warning(f"{self.name} queue full ({self.queue.maxsize}), waiting for the writer")
+        await self.queue.put(item)
+        self.submitted += 1
+
+    async def join(self) -> None:
+        """Wait until every submitted item is handled"""
+        await self.queue.join()
+
+    async def _run(self) -> None:
+        while True:
+            item = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                await self.handler(item)
+                self.completed += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"{self.name} worker error: {e}")
+            finally:
+                self.last_ms = (time.perf_counter() - started) * 1000
+                self.max_ms = max(self.max_ms, self.last_ms)
+                self.queue.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "errors": self.errors,
+            "last_ms": round(self.last_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+        }
@@ -1,13 +1,17 @@
 import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from db.models import Test, TestDataPoint, Alarm
+from db.models import Test, Alarm
+from db.curves import save_curve
 from db.database import SessionLocal
 from plc.data_service import DataService
 from plc.command_service import CommandService
+from plc.capture_buffer import CaptureBuffer
+from plc.live_bus import LiveBus
+from plc.ticker import Ticker
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +19,13 @@ logger = logging.getLogger(__name__)
 class TestService:
     """Service for managing test execution and data recording"""
 
-    def __init__(self, data_service: DataService, command_service: CommandService):
+    def __init__(self, data_service: DataService, command_service: CommandService, live_bus: Optional[LiveBus] = None):
         self.data_service = data_service
         self.command_service = command_service
+        self.live_bus = live_bus or LiveBus(data_service)
         self.current_test: Optional[Test] = None
         self.is_recording = False
-        self.data_points: List[Dict[str, float]] = []
+        self.data_points = CaptureBuffer()
         self.test_start_time: Optional[float] = None
         self._recording_task: Optional[asyncio.Task] = None
 
@@ -56,23 +61,23 @@ class TestService:
             test_id = self.current_test.id
 
             # Set parameters on PLC
-            self.data_service.set_parameters(
-                diameter=pipe_diameter,
-                length=pipe_length,
-                deflection_pct=deflection_percent,
+            await self.data_service.aset_parameters(
+                pipe_diameter=pipe_diameter,
+                pipe_length=pipe_length,
+                deflection_percent=deflection_percent,
                 test_speed=test_speed,
             )
 
             # Start recording
             self.is_recording = True
-            self.data_points = []
-            self.test_start_time = asyncio.get_event_loop().time()
+            self.data_points = CaptureBuffer()
+            self.test_start_time = time.monotonic()
 
             # Start data recording task
             self._recording_task = asyncio.create_task(self._record_data())
 
             # Send start command to PLC
-            self.command_service.start_test()
+            await self.command_service.astart_test()
 
             logger.info(f"Test {test_id} started")
             return test_id
@@ -86,28 +91,26 @@ class TestService:
 
     async def _record_data(self):
         """Background task to record test data points"""
+        ticker = Ticker(0.1, "test_record")  # Record at 10 Hz, drift-free
         while self.is_recording:
+            tick = await ticker.wait()
             try:
-                data = self.data_service.get_live_data()
-                current_time = asyncio.get_event_loop().time()
+                data = await self.live_bus.aget_live_data()
 
-                self.data_points.append({
-                    'timestamp': current_time - self.test_start_time,
-                    'force': data.get('actual_force', 0),
-                    'deflection': data.get('actual_deflection', 0),
-                    'position': data.get('actual_position', 0),
-                })
+                self.data_points.append(
+                    tick - self.test_start_time,
+                    data.get('actual_force', 0),
+                    data.get('actual_deflection', 0),
+                    data.get('actual_position', 0),
+                )
 
                 # Check if test is complete (status == 5)
                 if data.get('test_status') == 5:
                     await self.complete_test()
                     break
 
-                await asyncio.sleep(0.1)  # Record at 10 Hz
-
             except Exception as e:
                 logger.error(f"Error recording data: {e}")
-                await asyncio.sleep(0.1)
 
     async def complete_test(self):
         """Complete the current test and save results"""
@@ -115,12 +118,12 @@ class TestService:
             return None
 
         self.is_recording = False
-        test_end_time = asyncio.get_event_loop().time()
+        test_end_time = time.monotonic()
 
         db = SessionLocal()
         try:
             # Get final results from PLC
-            result = self.data_service.get_test_result()
+            result = await self.data_service.aget_test_results()
 
             # Update test record
             test = db.query(Test).filter(Test.id == self.current_test.id).first()
@@ -130,18 +133,10 @@ class TestService:
                 test.sn_class = result.get('sn_class', 0)
                 test.passed = result.get('test_passed', False)
                 test.duration = test_end_time - self.test_start_time
-                test.max_force = max((dp['force'] for dp in self.data_points), default=0)
+                test.max_force = self.data_points.max('force', default=0)
 
                 # Save data points
-                for dp in self.data_points:
-                    data_point = TestDataPoint(
-                        test_id=test.id,
-                        timestamp=dp['timestamp'],
-                        force=dp['force'],
-                        deflection=dp['deflection'],
-                        position=dp['position'],
-                    )
-                    db.add(data_point)
+                save_curve(db, test.id, self.data_points.columns())
 
                 db.commit()
                 logger.info(f"Test {test.id} completed: {'PASS' if test.passed else 'FAIL'}")
@@ -160,14 +155,15 @@ class TestService:
         finally:
             db.close()
             self.current_test = None
-            self.data_points = []
+            self.data_points.close()
+            self.data_points = CaptureBuffer()
 
-    def stop_test(self):
+    async def stop_test(self):
         """Stop the current test (emergency stop)"""
         self.is_recording = False
         if self._recording_task:
             self._recording_task.cancel()
-        self.command_service.stop()
+        await self.command_service.astop()
         logger.warning("Test stopped by user")
 
     def add_alarm(self, alarm_code: str, message: str, severity: str = 'warning'):
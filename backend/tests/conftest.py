@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests import the backend modules the way main.py does (run from backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DEBUG", "false")  # no SQL echo
@@ -0,0 +1,47 @@
+import time
+
+from plc.blackbox import BlackBoxRecorder
+
+RANGES = [(2, 0, 8), (3, 0, 4)]
+
+
+def _recorder(tmp_path, records: int) -> BlackBoxRecorder:
+    recorder = BlackBoxRecorder(str(tmp_path / "ring.bin"), 4096 + 5 * (24 + 12), RANGES)
+    for index in range(records):
+        recorder.append([bytes([index]) * 8, bytes([index]) * 4])
+    return recorder
+
+
+def test_ring_keeps_the_newest_records(tmp_path):
+    recorder = _recorder(tmp_path, 7)
+    assert recorder.capacity == 5
+    assert [(seq, raw[0]) for seq, _, _, raw in recorder.records()] == [(s, s - 1) for s in range(3, 8)]
+    recorder.close()
+
+
+def test_dump_reads_back(tmp_path):
+    recorder = _recorder(tmp_path, 7)
+    dump = tmp_path / "dump.bin"
+    dump.write_bytes(recorder.dump())
+    recorder.close()
+
+    copy = BlackBoxRecorder.from_file(str(dump))
+    assert copy.ranges == RANGES
+    assert [(seq, raw) for seq, _, _, raw in copy.records()] == [
+        (seq, bytes([index]) * 12) for seq, index in enumerate(range(2, 7), 1)
+    ]
+    copy.close()
+
+
+def test_empty_window_dump_reads_back(tmp_path):
+    recorder = _recorder(tmp_path, 3)
+    dump = tmp_path / "empty.bin"
+    dump.write_bytes(recorder.dump(since=time.time() + 60))
+    recorder.close()
+
+    copy = BlackBoxRecorder.from_file(str(dump))
+    assert copy.capacity == 0 and copy.ranges == RANGES
+    assert list(copy.records()) == []
+    assert list(copy.records(since=0.0)) == []
+    assert copy.dump() == dump.read_bytes()
+    copy.close()
@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+
+from plc.capture_buffer import CaptureBuffer
+
+
+def _samples(first: int, last: int):
+    """(timestamp, force, deflection, position) rows first..last-1, 10 ms apart"""
+    return [(i * 0.01, i * 0.5, i * 0.002, 80.0 + i * 0.002) for i in range(first, last)]
+
+
+def test_spills_above_max_memory_and_reads_back_in_order():
+    buffer = CaptureBuffer(max_memory=10 * CaptureBuffer.SAMPLE_BYTES)
+    rows = _samples(0, 25)
+    assert buffer.extend(rows) == 25
+    assert buffer.spilled == 20 and len(buffer) == 25
+    assert list(buffer.rows()) == rows
+    assert list(buffer.columns()["force"]) == [r[1] for r in rows]
+    assert buffer.max("force") == rows[-1][1]
+
+    spill = buffer._file.name
+    buffer.freeze()
+    with pytest.raises(RuntimeError):
+        buffer.append(*rows[0])
+    buffer.close()
+    assert not os.path.exists(spill)
+
+
+def test_checkpoint_due_by_samples_or_interval(tmp_path):
+    buffer = CaptureBuffer(journal=str(tmp_path / "due.jnl"))
+    buffer.checkpoint_samples, buffer.checkpoint_interval = 10, 3600.0
+    buffer.extend(_samples(0, 9))
+    assert not buffer.checkpoint_due()
+    buffer.append(*_samples(9, 10)[0])
+    assert buffer.checkpoint_due()
+    assert buffer.checkpoint() == 10
+    assert not buffer.checkpoint_due()
+
+    buffer.append(*_samples(10, 11)[0])
+    buffer.checkpointed_at = time.monotonic() - 3600.0
+    assert buffer.checkpoint_due()
+    buffer.close()
+    assert not (tmp_path / "due.jnl").exists()
+
+
+def test_torn_tail_is_cut_and_resume_skips_journaled_samples(tmp_path):
+    path = tmp_path / "test.jnl"
+    context = {"started_at": "2026-01-01T12:00:00+03:00", "params": {"pipe_diameter": 300.0}}
+    buffer = CaptureBuffer(journal=str(path), context=context)
+    buffer.extend(_samples(0, 100))
+    assert buffer.checkpoint() == 100
+    buffer.extend(_samples(100, 150))
+    assert buffer.checkpoint() == 50
+    buffer.record({"duration": 1.5})
+    buffer.extend(_samples(150, 180))  # never checkpointed: lost in the crash
+
+    # Crash in the middle of the next record write
+    buffer._file.close()
+    intact = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(CaptureBuffer.RECORD.pack(CaptureBuffer.SAMPLES, 30, 0) + bytes(100))
+
+    recovered = CaptureBuffer.open_journal(str(path))
+    assert path.stat().st_size == intact
+    assert len(recovered) == 150
+    assert recovered.context == {**context, "duration": 1.5}
+    assert recovered.resume_after == _samples(149, 150)[0][0]
+
+    # The PLC ring still holds samples from before the restart
+    assert recovered.extend(_samples(140, 200)) == 50
+    assert list(recovered.rows()) == _samples(0, 200)
+
+    recovered.release()
+    again = CaptureBuffer.open_journal(str(path))
+    assert len(again) == 200
+    again.close()
+    assert not path.exists()
+
+
+def test_corrupt_record_ends_the_journal(tmp_path):
+    path = tmp_path / "crc.jnl"
+    buffer = CaptureBuffer(journal=str(path))
+    buffer.extend(_samples(0, 10))
+    buffer.checkpoint()
+    first_end = path.stat().st_size
+    buffer.extend(_samples(10, 20))
+    buffer.checkpoint()
+    buffer.extend(_samples(20, 30))
+    buffer.release()
+
+    with open(path, "r+b") as f:
+        f.seek(first_end + CaptureBuffer.RECORD.size + 3)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    recovered = CaptureBuffer.open_journal(str(path))
+    assert len(recovered) == 10
+    assert list(recovered.rows()) == _samples(0, 10)
+    assert path.stat().st_size == first_end
+    recovered.close()
+
+
+def test_open_journal_rejects_other_files(tmp_path):
+    path = tmp_path / "other.jnl"
+    path.write_bytes(b"not a journal")
+    with pytest.raises(ValueError):
+        CaptureBuffer.open_journal(str(path))
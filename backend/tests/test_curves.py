@@ -0,0 +1,137 @@
+import random
+import struct
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from db import database, migrate_curves
+from db.curves import COLUMNS, decode_curve, encode_curve, load_curve, read_header, save_curve
+from db.database import Base
+from db import models
+
+
+def _curve(samples: int, seed: int = 0):
+    rng = random.Random(seed)
+    return {
+        "timestamp": [i * 0.0123456789 for i in range(samples)],
+        "force": [rng.uniform(0.0, 50.0) for _ in range(samples)],
+        "deflection": [i / 3.0 for i in range(samples)],
+        "position": [100.0 - i * 1e-7 for i in range(samples)],
+    }
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'curves.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _add_test(session: Session) -> int:
+    test = models.Test(pipe_diameter=300.0, pipe_length=300.0, deflection_percent=3.0)
+    session.add(test)
+    session.flush()
+    return test.id
+
+
+def test_float64_round_trip_is_exact():
+    columns = _curve(5000)
+    curve = decode_curve(encode_curve(columns))
+    assert [name for name, _ in read_header(encode_curve(columns)).columns] == [name for name, _ in COLUMNS]
+    for name, values in columns.items():
+        assert curve[name].typecode == "d"
+        assert list(curve[name]) == values
+
+
+def test_only_float64_curves_decode():
+    blob = encode_curve(_curve(10))
+    with pytest.raises(ValueError):
+        decode_curve(blob[:5] + b"f" + blob[6:])
+
+
+def test_empty_and_missing_columns():
+    curve = decode_curve(encode_curve({"timestamp": []}))
+    assert all(len(curve[name]) == 0 for name, _ in COLUMNS)
+
+    curve = decode_curve(encode_curve({"timestamp": [0.0, 0.1], "force": [1.0, 2.0]}))
+    assert list(curve["deflection"]) == [0.0, 0.0]
+    assert list(curve["position"]) == [0.0, 0.0]
+
+
+def test_invalid_input_raises():
+    with pytest.raises(ValueError):
+        encode_curve({"timestamp": [0.0, 0.1], "force": [1.0]})
+
+    blob = encode_curve(_curve(10))
+    with pytest.raises(ValueError):
+        decode_curve(b"XXXX" + blob[4:])
+    with pytest.raises(ValueError):
+        decode_curve(struct.pack("<4sB", b"GRPC", 99) + blob[5:])
+
+
+def test_save_and_load(engine):
+    columns = _curve(200)
+    with Session(engine) as session:
+        test_id = _add_test(session)
+        save_curve(session, test_id, columns)
+        session.commit()
+        assert load_curve(session, test_id)["force"].tolist() == columns["force"]
+        assert load_curve(session, test_id + 1) is None
+
+
+def _add_points(session: Session, test_id: int, columns) -> None:
+    session.add_all(
+        models.TestDataPoint(test_id=test_id, timestamp=t, force=f, deflection=d, position=p)
+        for t, f, d, p in zip(*(columns[name] for name, _ in COLUMNS))
+    )
+
+
+def _count(engine, model) -> int:
+    with Session(engine) as session:
+        return session.scalar(select(func.count()).select_from(model))
+
+
+def test_migration_converts_keeps_rows_and_purges_verified(engine):
+    with Session(engine) as session:
+        old = [_add_test(session) for _ in range(3)]
+        current = _add_test(session)
+        save_curve(session, current, _curve(5, seed=9))
+        expected = {}
+        for index, test_id in enumerate(old + [current]):
+            expected[test_id] = _curve(50 + index, seed=index)
+            _add_points(session, test_id, expected[test_id])
+        session.commit()
+    rows = _count(engine, models.TestDataPoint)
+
+    assert migrate_curves.convert(engine) == 3
+    assert _count(engine, models.TestDataPoint) == rows
+    assert _count(engine, models.TestCurve) == 4
+    with Session(engine) as session:
+        for test_id in old:
+            curve = load_curve(session, test_id)
+            for name, values in expected[test_id].items():
+                assert curve[name].tolist() == values
+            assert session.get(models.TestCurve, test_id).samples == len(expected[test_id]["timestamp"])
+        # An existing curve is never overwritten
+        assert load_curve(session, current)["force"].tolist() == _curve(5, seed=9)["force"]
+    assert migrate_curves.convert(engine) == 0
+
+    matching, mismatched = migrate_curves.verify(engine)
+    assert matching == old and mismatched == [current]
+    assert migrate_curves.purge(engine, matching) == sum(len(expected[i]["timestamp"]) for i in old)
+    assert _count(engine, models.TestDataPoint) == len(expected[current]["timestamp"])
+    assert migrate_curves.verify(engine) == ([], [current])
+
+
+def test_init_db_leaves_data_points_alone(engine, monkeypatch):
+    with Session(engine) as session:
+        _add_points(session, _add_test(session), _curve(10))
+        session.commit()
+    monkeypatch.setattr(database, "engine", engine)
+
+    database.init_db()
+
+    assert _count(engine, models.TestDataPoint) == 10
+    assert _count(engine, models.TestCurve) == 0
@@ -0,0 +1,117 @@
+import math
+import random
+
+import pytest
+from snap7.util import get_bool, get_int, get_real
+
+from plc.read_planner import ReadPlanner, ReadRange
+from plc.tags import BOOL, DB_HMI, DB_PARAMS, DB_RESULTS, DB_SERVO, INT, REAL, TAGS, BlockDecoder, Tag, TagMap
+
+
+def _planner(tags, max_gap: int) -> ReadPlanner:
+    return ReadPlanner(plc=None, tags=TagMap(tags), max_gap=max_gap)
+
+
+def _legacy(tag: Tag, image: bytearray):
+    """Value as the per-tag snap7.util getters read it from a whole-DB image"""
+    if tag.type == REAL:
+        return get_real(image, tag.offset)
+    if tag.type == INT:
+        return get_int(image, tag.offset)
+    return get_bool(image, tag.offset, tag.bit)
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+# ══════════════════════════════════════════════════════════════════════
+# PLAN
+# ══════════════════════════════════════════════════════════════════════
+
+@pytest.mark.parametrize("gap, ranges", [(7, 1), (8, 1), (9, 2)])
+def test_merge_boundary_is_max_gap(gap, ranges):
+    planner = _planner([Tag("a.x", 1, 0, REAL), Tag("a.y", 1, 4 + gap, REAL)], max_gap=8)
+    plan = planner.plan(["a.x", "a.y"])
+    assert len(plan) == ranges
+    if ranges == 1:
+        assert plan == [ReadRange(1, 0, 8 + gap, ("a.x", "a.y"))]
+    else:
+        assert plan == [ReadRange(1, 0, 4, ("a.x",)), ReadRange(1, 4 + gap, 4, ("a.y",))]
+
+
+def test_zero_gap_merges_only_adjacent_tags():
+    planner = _planner([
+        Tag("a.x", 1, 0, REAL), Tag("a.y", 1, 4, INT), Tag("a.z", 1, 7, INT),
+    ], max_gap=0)
+    assert planner.plan(["a.z", "a.x", "a.y"]) == [
+        ReadRange(1, 0, 6, ("a.x", "a.y")),
+        ReadRange(1, 7, 2, ("a.z",)),
+    ]
+
+
+def test_bools_of_one_byte_share_a_range_and_dbs_stay_apart():
+    planner = _planner([
+        Tag("s.b1", 3, 0, BOOL, 1), Tag("s.b0", 3, 0, BOOL, 0), Tag("s.r", 3, 2, REAL),
+        Tag("p.r", 1, 2, REAL),
+    ], max_gap=16)
+    assert planner.plan(["s.b1", "p.r", "s.r", "s.b0", "s.b1"]) == [
+        ReadRange(1, 2, 4, ("p.r",)),
+        ReadRange(3, 0, 6, ("s.b0", "s.b1", "s.r")),
+    ]
+
+
+def test_overlapping_tag_extends_but_does_not_shrink_the_range():
+    planner = _planner([Tag("a.r", 1, 0, REAL), Tag("a.b", 1, 1, BOOL, 3)], max_gap=0)
+    assert planner.plan(["a.r", "a.b"]) == [ReadRange(1, 0, 4, ("a.r", "a.b"))]
+
+
+def test_plans_are_cached_per_key_set():
+    planner = ReadPlanner(plc=None)
+    keys = ("servo.safety_ok", "servo.estop_active", "results.ring_stiffness")
+    assert planner.plan(keys) is planner.plan(keys)
+
+
+# ══════════════════════════════════════════════════════════════════════
+# DECODE
+# ══════════════════════════════════════════════════════════════════════
+
+@pytest.mark.parametrize("db", [DB_PARAMS, DB_RESULTS, DB_SERVO, DB_HMI])
+def test_block_decoder_matches_snap7_getters(db):
+    tags = TAGS.block_tags(db)
+    size = max(t.end for t in tags)
+    decoder = TAGS.block_decoder(db)
+    rnd = random.Random(db)
+    for _ in range(50):
+        image = bytearray(rnd.getrandbits(8) for _ in range(size))
+        values = decoder.decode(image)
+        for tag in tags:
+            assert _same(values[tag.field], _legacy(tag, image)), tag.key
+
+
+def test_planned_reads_decode_like_per_tag_reads():
+    keys = [t.key for db in (DB_RESULTS, DB_SERVO, DB_HMI) for t in TAGS.block_tags(db)]
+    planner = ReadPlanner(plc=None, max_gap=4)
+    plan = planner.plan(keys)
+    assert len(plan) > 3  # gaps split the blocks
+
+    rnd = random.Random(1)
+    images = {db: bytearray(rnd.getrandbits(8) for _ in range(128)) for db in (DB_RESULTS, DB_SERVO, DB_HMI)}
+    blocks = [images[r.db][r.start:r.start + r.size] for r in plan]
+    values = planner.decode(plan, blocks)
+
+    assert set(values) == set(keys)
+    for key in keys:
+        tag = TAGS[key]
+        assert _same(values[key], _legacy(tag, images[tag.db])), key
+
+
+def test_block_decoder_rejects_bad_tag_sets():
+    with pytest.raises(ValueError):
+        BlockDecoder([])
+    with pytest.raises(ValueError):
+        BlockDecoder([Tag("a.x", 1, 0, REAL), Tag("b.x", 2, 0, REAL)])
+    with pytest.raises(ValueError):
+        BlockDecoder([Tag("a.x", 1, 0, REAL), Tag("a.y", 1, 2, REAL)])
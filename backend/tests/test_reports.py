@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.routes import reports
+from db import database, models
+from db.database import Base
+
+DAY = datetime(2026, 3, 2, 9, 0)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "reports.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Batches saved within the same second share a test_date; ids are not
+        # in date order (edited or imported rows)
+        for index in range(23):
+            session.add(models.Test(
+                test_date=DAY + timedelta(minutes=index * 5 % 6),
+                sample_id=f"P{index % 2}-{index:03d}", operator=("Ahmed", "ahmed", "Sara")[index % 3],
+                pipe_diameter=300.0, pipe_length=300.0, deflection_percent=3.0,
+                passed=index % 3 != 0,
+            ))
+        for index in range(7):
+            session.add(models.TestGroup(
+                test_date=DAY + timedelta(hours=index * 2 % 3),
+                pipe_diameter=300.0, pipe_length=300.0, deflection_percent=3.0,
+            ))
+        session.commit()
+    engine.dispose()
+    return path
+
+
+def _run(db_path, walk):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        try:
+            async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+                return await walk(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+
+def _expected(db_path, model, *filters):
+    engine = create_engine(f"sqlite:///{db_path}")
+    with Session(engine) as session:
+        rows = session.query(model.id, model.test_date).filter(*filters).all()
+    engine.dispose()
+    return [row.id for row in sorted(rows, key=lambda r: (r.test_date, r.id), reverse=True)]
+
+
+async def _walk_tests(db, page_size, passed=None, sample_id=None, operator=None):
+    ids, totals, cursor = [], set(), {"before_date": None, "before_id": None}
+    while True:
+        before_date = datetime.fromisoformat(cursor["before_date"]) if cursor["before_date"] else None
+        page = await reports.get_tests(
+            page=1, page_size=page_size, sample_id=sample_id, operator=operator, passed=passed,
+            before_date=before_date, before_id=cursor["before_id"], db=db,
+        )
+        ids += [test["id"] for test in page["tests"]]
+        totals.add(page["total"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, totals
+
+
+@pytest.mark.parametrize("page_size", [1, 3, 4, 5, 23, 100])
+def test_cursor_walk_visits_every_test_once(db_path, page_size):
+    ids, totals = _run(db_path, lambda db: _walk_tests(db, page_size))
+    assert ids == _expected(db_path, models.Test)
+    assert totals == {23}
+
+
+def test_cursor_walk_with_filter(db_path):
+    ids, totals = _run(db_path, lambda db: _walk_tests(db, 2, passed=False))
+    assert ids == _expected(db_path, models.Test, models.Test.passed.is_(False))
+    assert totals == {len(ids)} == {8}
+
+
+def test_prefix_filters_seek_their_index(db_path):
+    ids, totals = _run(db_path, lambda db: _walk_tests(db, 3, sample_id="P1"))
+    assert ids == _expected(db_path, models.Test, models.Test.sample_id.like("P1-%"))
+    assert totals == {11}
+
+    ids, totals = _run(db_path, lambda db: _walk_tests(db, 3, operator="Ah"))
+    assert ids == _expected(db_path, models.Test, models.Test.operator == "Ahmed")
+    assert totals == {8}
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    query = reports._page(models.Test, [reports._prefix(models.Test.operator, "Ah")], 1, 20, DAY, 5)
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+        ).all()
+    engine.dispose()
+    assert "USING INDEX ix_tests_operator_test_date" in plan[0][-1]
+
+
+def test_offset_pages_match_the_cursor_order(db_path):
+    async def walk(db):
+        pages = [
+            await reports.get_tests(
+                page=page, page_size=5, sample_id=None, operator=None, passed=None,
+                before_date=None, before_id=None, db=db,
+            )
+            for page in range(1, 6)
+        ]
+        return [test["id"] for page in pages for test in page["tests"]], pages[0]["total_pages"]
+
+    ids, total_pages = _run(db_path, walk)
+    assert ids == _expected(db_path, models.Test)
+    assert total_pages == 5
+
+
+def test_group_cursor_walk(db_path):
+    async def walk(db):
+        ids, before_date, before_id = [], None, None
+        while True:
+            page = await reports.get_groups(page=1, page_size=2, before_date=before_date, before_id=before_id, db=db)
+            ids += [group["id"] for group in page["groups"]]
+            if page["next_cursor"] is None:
+                return ids
+            before_date = datetime.fromisoformat(page["next_cursor"]["before_date"])
+            before_id = page["next_cursor"]["before_id"]
+
+    assert _run(db_path, walk) == _expected(db_path, models.TestGroup)
+
+
+def test_init_db_replaces_the_retired_sample_id_index(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_tests_sample_id_test_date"))
+        conn.execute(text("CREATE INDEX ix_tests_sample_id ON tests (sample_id)"))
+    monkeypatch.setattr(database, "engine", engine)
+
+    database.init_db()
+
+    names = {index["name"] for index in inspect(engine).get_indexes("tests")}
+    assert "ix_tests_sample_id_test_date" in names
+    assert "ix_tests_sample_id" not in names
+    engine.dispose()
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from plc.scheduler import Priority, PriorityLock, priority
+
+
+def _queue(lock: PriorityLock, level: Priority, name: str, order: list) -> threading.Thread:
+    """Start a thread that waits for `lock` at `level`, return once it is queued"""
+    queued = len(lock._waiters)
+
+    def worker():
+        with priority(level):
+            with lock:
+                order.append(name)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    deadline = time.monotonic() + 2
+    while len(lock._waiters) == queued:
+        assert time.monotonic() < deadline, f"{name} never queued"
+        time.sleep(0.001)
+    return thread
+
+
+def test_waiters_served_by_priority_then_fifo():
+    lock = PriorityLock()
+    order: list = []
+    lock.acquire()
+    threads = [
+        _queue(lock, Priority.BACKGROUND, "background", order),
+        _queue(lock, Priority.POLL, "poll-1", order),
+        _queue(lock, Priority.COMMAND, "command", order),
+        _queue(lock, Priority.POLL, "poll-2", order),
+        _queue(lock, Priority.SAFETY, "safety", order),
+    ]
+    lock.release()
+    for thread in threads:
+        thread.join(2)
+
+    assert order == ["safety", "command", "poll-1", "poll-2", "background"]
+    assert not lock.locked()
+
+
+def test_uncontended_acquire_and_deadline_stats():
+    lock = PriorityLock(budgets={p: 10.0 for p in Priority})
+    with priority(Priority.SAFETY):
+        with lock:
+            assert lock.locked()
+    assert not lock.locked()
+
+    stats = lock.get_stats()
+    assert stats["waiting"] == 0
+    assert stats["classes"]["safety"]["count"] == 1
+    assert stats["classes"]["safety"]["misses"] == 0
+
+
+def test_priority_context_is_restored():
+    lock = PriorityLock()
+    with priority(Priority.BACKGROUND):
+        with priority(Priority.SAFETY):
+            with lock:
+                pass
+        with lock:
+            pass
+    classes = lock.get_stats()["classes"]
+    assert classes["safety"]["count"] == 1
+    assert classes["background"]["count"] == 1